@@ -1,6 +1,7 @@
 from src.resources import auth_resources, car_resources, community_resources, refuel_resources, tour_resources, \
     payoff_resources, user_resources, hello_world_resources, task_resources, task_instance_resources, \
-    geocoding_resources, event_resources, account_settings_resources, statistics_resources
+    geocoding_resources, event_resources, account_settings_resources, statistics_resources, stream_resources, \
+    instrumentation_resources, metrics_resources
 
 
 def configure_api(api):
@@ -81,6 +82,14 @@ def configure_api(api):
     api.add_resource(event_resources.GetEvent, '/events/<int:event_id>')
     api.add_resource(event_resources.DeleteEvent, '/events/<int:event_id>')
 
+    api.add_resource(stream_resources.CommunityStream, '/communities/<int:community_id>/stream')
+
     api.add_resource(geocoding_resources.Geocode, '/geocode/<query>')
 
+    api.add_resource(instrumentation_resources.InstrumentationStatistics, '/instrumentation')
+    api.add_resource(instrumentation_resources.InstrumentationPoolStatistics, '/instrumentation/pools')
+    api.add_resource(instrumentation_resources.InstrumentationUserStatistics, '/instrumentation/users')
+    api.add_resource(instrumentation_resources.InstrumentationRevokedTokenStatistics, '/instrumentation/revoked-tokens')
+    api.add_resource(metrics_resources.PrometheusMetrics, '/metrics')
+
     api.add_resource(hello_world_resources.HelloWorld, '/hello')
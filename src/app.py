@@ -6,6 +6,9 @@ from flask_sqlalchemy import SQLAlchemy
 from jinja2 import Environment, PackageLoader, select_autoescape
 
 from src.exception_aware_api.exception_aware_api import ExceptionAwareApi
+from src.util.database import configure_engine_options
+from src.util.metrics import metrics
+from src.util.replica import RoutingSession, replica_routing
 
 app = Flask(__name__)
 cors = CORS(app, resources={
@@ -13,6 +16,11 @@ cors = CORS(app, resources={
         "origins": [
             "http://localhost:4300",
             "https://carbulator.net"
+        ],
+        "expose_headers": [
+            "X-Next-Cursor",
+            "ETag",
+            "X-Read-Your-Writes"
         ]
     }
 })
@@ -20,18 +28,22 @@ api = ExceptionAwareApi(app, prefix='/api')
 
 app.config.from_object('src.config.default.DefaultConfig')
 app.config.from_envvar('CARBULATOR_CONFIG')
+configure_engine_options(app)
+metrics.init_app(app)
+replica_routing.init_app(app)
 
 jwt = JWTManager(app)
 
-db = SQLAlchemy(app)
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
 
 env = Environment(
     loader=PackageLoader('src', 'templates'),
     autoescape=select_autoescape(['html', 'xml'])
 )
 
-from src.models.revoked_token import RevokedTokenModel
 from src.models.tour_passenger_link import TourPassengerLinkModel
+from src.util.current_user import load_current_user
+from src.util.revoked_tokens import revoked_token_store
 
 __all__ = ['TourPassengerLinkModel']  # prevents pycharm from removing predictor as unused import
 
@@ -39,14 +51,24 @@ __all__ = ['TourPassengerLinkModel']  # prevents pycharm from removing predictor
 @jwt.token_in_blocklist_loader
 def check_if_token_in_blacklist(jwt_header, jwt_payload: dict):
     jti = jwt_payload['jti']
-    return RevokedTokenModel.is_jti_blacklisted(jti)
+    return revoked_token_store.is_revoked(jti)
+
+
+@jwt.user_lookup_loader
+def load_user(jwt_header, jwt_payload: dict):
+    return load_current_user(jwt_payload[app.config['JWT_IDENTITY_CLAIM']])
 
 
 from src.api import configure_api
-from src.util.scheduler import Scheduler
+from src.cli import configure_cli
+from src.util.instrumentation import instrumentation
+from src.util.scheduler import scheduler
 
 configure_api(api)
+configure_cli(app)
+instrumentation.init_app(app, db)
 
 migrate = Migrate(app, db, compare_type=False)
 
-scheduler = Scheduler()
+if app.config['SCHEDULER_ENABLED']:
+    scheduler.start()
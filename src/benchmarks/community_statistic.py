@@ -0,0 +1,154 @@
+"""
+Checks that the community statistic modes (`COMMUNITY_STATISTIC_MODE` config option) produce the same statistics for
+randomized tours and refuels and times them for communities with thousands of tours. Half of the tours and refuels
+are booked into the daily statistics by rebuilding them, the other half incrementally like the resources do.
+
+Run from the repository root against a migrated database, e.g.
+`CARBULATOR_CONFIG=... python -m src.benchmarks.community_statistic`. The fixture data is created in a transaction that
+is rolled back afterwards.
+"""
+import argparse
+import datetime
+import math
+import random
+import sys
+import time
+
+import pytz
+
+from src.app import app, db
+from src.models.car import CarModel
+from src.models.community import CommunityModel
+from src.models.community_user_link import CommunityUserLinkModel
+from src.models.refuel import RefuelModel
+from src.models.tour import TourModel
+from src.models.user import UserModel
+from src.util.bookkeeping import rebuild_community_daily_statistics, book_tour, book_refuel
+from src.util.community_statistic import create_empty_statistic, add_community_statistic, STATISTIC_MODE_ROLLUP, \
+    STATISTIC_MODE_SQL, STATISTIC_MODE_PYTHON
+
+MODES = [STATISTIC_MODE_PYTHON, STATISTIC_MODE_SQL, STATISTIC_MODE_ROLLUP]
+
+
+def create_community(number_of_users: int, number_of_tours: int, rng: random.Random, start: datetime.datetime):
+    """
+    Creates a community with random finished tours and refuels within a year and fills its daily statistics. The first
+    half of the tours and refuels is booked by rebuilding the daily statistics, the second half is booked one by one.
+    Those tours are finished with aware end times like in `FinishTour`. Doesn't commit the session.
+    :return: Community.
+    """
+    suffix = rng.getrandbits(32)
+    users = [UserModel(username='benchmark-{}-{}'.format(suffix, i), password='-', email='-')
+             for i in range(number_of_users)]
+    car = CarModel(name='Benchmark', make='Benchmark', model='Benchmark', owner=users[0])
+    community = CommunityModel(name='Benchmark', car=car)
+    db.session.add_all(users + [car, community])
+    db.session.flush()
+    db.session.add_all([CommunityUserLinkModel(community_id=community.id, user_id=user.id, invitation_accepted=True,
+                                               is_owner=user is users[0]) for user in users])
+
+    km = 0
+    booked_tours = []
+    booked_refuels = []
+    for i in range(number_of_tours):
+        end_time = start + datetime.timedelta(minutes=rng.randrange(365 * 24 * 60))
+        start_km = round(km, 1)
+        km += rng.uniform(1, 300)
+        tour = TourModel(owner=rng.choice(users), community=community, start_km=start_km, start_time=end_time,
+                         passengers=rng.sample(users, rng.randrange(min(4, number_of_users))))
+        refuel = None
+        if rng.random() < 0.2:
+            refuel = RefuelModel(owner=rng.choice(users), community=community, costs=round(rng.uniform(20, 90), 2),
+                                 time_created=end_time)
+        if i < number_of_tours // 2:
+            tour.end_km = round(km, 1)
+            tour.end_time = end_time
+            db.session.add_all([tour] + ([refuel] if refuel else []))
+        else:
+            db.session.add(tour)
+            booked_tours.append((tour, round(km, 1), pytz.utc.localize(end_time)))
+            if refuel:
+                booked_refuels.append(refuel)
+    db.session.flush()
+    rebuild_community_daily_statistics(community.id)
+    for tour, end_km, end_time in booked_tours:
+        tour.end_km = end_km
+        tour.end_time = end_time
+        book_tour(tour)
+    for refuel in booked_refuels:
+        book_refuel(refuel)
+    db.session.flush()
+    # Reload the tours and refuels with the column types of the database
+    db.session.expire_all()
+    return community
+
+
+def create_statistic(community, from_datetime, to_datetime, mode):
+    """
+    Creates the statistic of the community with the given mode.
+    :return: Tuple of (user id, km, km accounted for passengers, costs) tuples.
+    """
+    statistic, km_per_user_dict, costs_per_user_dict = create_empty_statistic(community, from_datetime, to_datetime)
+    add_community_statistic(community.id, km_per_user_dict, costs_per_user_dict, from_datetime, to_datetime, mode)
+    return tuple((user_id, float(km_per_user_dict[user_id].km),
+                  float(km_per_user_dict[user_id].km_accounted_for_passengers),
+                  float(costs_per_user_dict[user_id].costs)) for user_id in sorted(km_per_user_dict))
+
+
+def is_equal(statistic, other_statistic, rel_tol):
+    """
+    Compares two statistics within the given relative tolerance.
+    """
+    return all(user_id == other_user_id and all(math.isclose(value, other_value, rel_tol=rel_tol)
+                                                for value, other_value in zip(values, other_values))
+               for (user_id, *values), (other_user_id, *other_values) in zip(statistic, other_statistic))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--tours', type=int, nargs='+', default=[1000, 10000, 20000])
+    parser.add_argument('--intervals', type=int, default=20, help='Number of random intervals to compare.')
+    parser.add_argument('--rel-tol', type=float, default=1e-12,
+                        help='Relative tolerance for the km and costs. The modes round km accounted for passengers '
+                             'differently and SQLite does not store decimals exactly.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    start = datetime.datetime(2019, 1, 1)
+    failed = False
+    print('{:>6} {:>10} {:>14} {:>14} {:>14}'.format('tours', 'intervals', *['{} [ms]'.format(mode) for mode in MODES]))
+    with app.app_context():
+        try:
+            for tours in args.tours:
+                community = create_community(args.users, tours, rng, start)
+                intervals = [sorted(start + datetime.timedelta(minutes=rng.randrange(366 * 24 * 60))
+                                    for _ in range(2)) for _ in range(args.intervals)]
+                # Whole year and exact day boundaries
+                intervals += [[start, start + datetime.timedelta(days=366)],
+                              [start + datetime.timedelta(days=10), start + datetime.timedelta(days=20)]]
+                times = {mode: 0.0 for mode in MODES}
+                for from_time, to_time in intervals:
+                    from_datetime = pytz.utc.localize(from_time)
+                    to_datetime = pytz.utc.localize(to_time)
+                    statistics = {}
+                    for mode in MODES:
+                        started = time.perf_counter()
+                        statistics[mode] = create_statistic(community, from_datetime, to_datetime, mode)
+                        times[mode] += time.perf_counter() - started
+                    for mode in MODES[1:]:
+                        if not is_equal(statistics[STATISTIC_MODE_PYTHON], statistics[mode], args.rel_tol):
+                            failed = True
+                            print('{} statistic differs for {} - {}'.format(mode, from_datetime, to_datetime))
+                print('{:>6} {:>10} {:>14.2f} {:>14.2f} {:>14.2f}'.format(
+                    tours, len(intervals), *[times[mode] / len(intervals) * 1000 for mode in MODES]))
+        finally:
+            db.session.rollback()
+
+    if failed:
+        sys.exit('At least one statistic mode produced a different statistic')
+
+
+if __name__ == '__main__':
+    main()
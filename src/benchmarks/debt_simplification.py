@@ -0,0 +1,68 @@
+"""
+Benchmarks the debt simplification modes on payoff shaped debt matrices.
+
+Run from the repository root with `python -m src.benchmarks.debt_simplification`.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.util.simplify_debt_matrix import simplify_debt_matrix, SIMPLIFICATION_MODE_NET_BALANCE, \
+    SIMPLIFICATION_MODE_CYCLES
+
+
+def create_payoff_debt_matrix(number_of_users: int, seed: int = 0) -> np.ndarray:
+    """
+    Creates a debt matrix like the one `AllPayoffs.post` builds: every user owes every refueling user a share of the
+    refuel costs according to his km fraction, minus some already existing debts from previous payoffs.
+    :param number_of_users: Number of community members.
+    :param seed: Seed for the random number generator.
+    :return: Debt matrix (debtee on y axis, recipient on x axis).
+    """
+    rng = np.random.default_rng(seed)
+    km_fractions = rng.random(number_of_users)
+    km_fractions /= km_fractions.sum()
+    costs_per_user = np.where(rng.random(number_of_users) < 0.3, rng.uniform(20, 400, number_of_users), 0)
+    debt_matrix = np.outer(km_fractions, costs_per_user)
+    np.fill_diagonal(debt_matrix, 0)
+    previous_debts = np.where(rng.random(debt_matrix.shape) < 0.05, rng.uniform(0, 50, debt_matrix.shape), 0)
+    np.fill_diagonal(previous_debts, 0)
+    return debt_matrix - previous_debts
+
+
+def time_simplification(debt_matrix: np.ndarray, mode: str, repetitions: int) -> float:
+    """
+    Times the simplification of the given debt matrix.
+    :return: Best run time in milliseconds.
+    """
+    best = float('inf')
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        simplify_debt_matrix(debt_matrix, mode)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 10, 20, 50, 100, 200, 500])
+    parser.add_argument('--max-cycle-users', type=int, default=100,
+                        help='Largest community size the cycle cancelling mode is benchmarked for.')
+    parser.add_argument('--repetitions', type=int, default=3)
+    args = parser.parse_args()
+
+    print('{:>6} {:>18} {:>18} {:>12}'.format('users', 'net_balance [ms]', 'cycles [ms]', 'transfers'))
+    for size in args.sizes:
+        debt_matrix = create_payoff_debt_matrix(size)
+        net_balance_ms = time_simplification(debt_matrix, SIMPLIFICATION_MODE_NET_BALANCE, args.repetitions)
+        if size <= args.max_cycle_users:
+            cycles_ms = '{:.2f}'.format(time_simplification(debt_matrix, SIMPLIFICATION_MODE_CYCLES, 1))
+        else:
+            cycles_ms = 'skipped'
+        transfers = np.count_nonzero(simplify_debt_matrix(debt_matrix, SIMPLIFICATION_MODE_NET_BALANCE))
+        print('{:>6} {:>18.2f} {:>18} {:>12}'.format(size, net_balance_ms, cycles_ms, transfers))
+
+
+if __name__ == '__main__':
+    main()
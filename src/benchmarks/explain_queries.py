@@ -0,0 +1,263 @@
+"""
+Runs `EXPLAIN` on the queries of the `find_*` and `exists_*` methods of the models for a seeded community and fails if
+one of them scans a whole table instead of using an index. On Postgres sequential scans are disabled for the check, so
+small tables can't hide a missing index.
+
+Not checked are the methods that list or search whole tables on purpose: the `return_all` methods,
+`UserModel.search_by_username` (`LIKE '%...%'` can't use a b-tree index) and the scheduled jobs, of which there are only
+a handful.
+
+Run from the repository root against a migrated database, e.g.
+`CARBULATOR_CONFIG=... python -m src.benchmarks.explain_queries`. The fixture data is created in a transaction that is
+rolled back afterwards.
+"""
+import argparse
+import datetime
+import re
+import sys
+
+from sqlalchemy import event
+
+from src.app import app, db
+from src.models.acount_settings import AccountSettingsModel
+from src.models.car import CarModel
+from src.models.community import CommunityModel
+from src.models.community_daily_statistic import CommunityDailyStatisticModel
+from src.models.community_ledger import CommunityLedgerModel
+from src.models.community_user_link import CommunityUserLinkModel
+from src.models.debt import DebtModel
+from src.models.event import EventModel
+from src.models.payoff import PayoffModel
+from src.models.refuel import RefuelModel
+from src.models.revoked_token import RevokedTokenModel
+from src.models.task import TaskModel
+from src.models.task_instance import TaskInstanceModel
+from src.models.tour import TourModel
+from src.models.tour_passenger_link import TourPassengerLinkModel
+from src.models.user import UserModel
+
+
+def create_community(now: datetime.datetime):
+    """
+    Creates a community with an entry in every table. Doesn't commit the session.
+    :return: Dict of the created instances.
+    """
+    suffix = int(now.timestamp())
+    users = [UserModel(username='explain-{}-{}'.format(suffix, i), password='-',
+                       email='explain-{}-{}@example.com'.format(suffix, i)) for i in range(3)]
+    users[2].reset_password_hash = 'explain-{}'.format(suffix)
+    car = CarModel(name='Explain', make='Explain', model='Explain', owner=users[0])
+    community = CommunityModel(name='Explain', car=car)
+    db.session.add_all(users + [car, community])
+    db.session.flush()
+    db.session.add_all([AccountSettingsModel(user_id=user.id) for user in users])
+    db.session.add_all([CommunityUserLinkModel(community_id=community.id, user_id=user.id, is_owner=user is users[0],
+                                               invitation_accepted=user is not users[2]) for user in users])
+
+    payoff = PayoffModel(community_id=community.id)
+    db.session.add(payoff)
+    db.session.flush()
+    tours = [TourModel(owner=users[i % 2], community=community, start_km=100 * i, end_km=100 * i + 50,
+                       start_time=now - datetime.timedelta(days=10 - i),
+                       end_time=now - datetime.timedelta(days=10 - i), passengers=[users[(i + 1) % 2]],
+                       payoff_id=payoff.id if i < 2 else None, is_open=i >= 2) for i in range(4)]
+    running_tour = TourModel(owner=users[0], community=community, start_km=400, start_time=now)
+    refuels = [RefuelModel(owner=users[i % 2], community=community, costs=50,
+                           time_created=now - datetime.timedelta(days=i), payoff_id=payoff.id if i < 2 else None,
+                           is_open=i >= 2) for i in range(4)]
+    debt = DebtModel(debtee_id=users[1].id, recepient_id=users[0].id, amount=10, payoff_id=payoff.id,
+                     community_id=community.id)
+    event = EventModel(owner=users[0], community=community, title='Explain', start=now + datetime.timedelta(days=1),
+                       end=now + datetime.timedelta(days=2))
+    km_task = TaskModel(owner=users[0], community=community, name='Explain km', km_interval=1000, km_next_instance=1000)
+    time_task = TaskModel(owner=users[0], community=community, name='Explain time',
+                          time_interval=datetime.timedelta(days=30),
+                          time_next_instance=now + datetime.timedelta(days=1))
+    db.session.add_all(tours + refuels + [running_tour, debt, event, km_task, time_task])
+    db.session.flush()
+    task_instance = TaskInstanceModel(task_id=km_task.id, community_id=community.id, km_created_at=400, is_open=True)
+    revoked_token = RevokedTokenModel(jti='explain-{}'.format(suffix), time_expires=now)
+    db.session.add_all([task_instance, revoked_token])
+    db.session.flush()
+    return {'users': users, 'car': car, 'community': community, 'payoff': payoff, 'tour': tours[0],
+            'refuel': refuels[0], 'debt': debt, 'event': event, 'task': km_task, 'task_instance': task_instance,
+            'revoked_token': revoked_token}
+
+
+def get_lookups(fixture, now: datetime.datetime):
+    """
+    Returns the lookups to check.
+    :return: List of (name, function) tuples.
+    """
+    user_id = fixture['users'][0].id
+    user_ids = [user.id for user in fixture['users']]
+    community_id = fixture['community'].id
+    payoff_ids = [fixture['payoff'].id]
+    from_time = now - datetime.timedelta(days=30)
+    return [
+        ('AccountSettingsModel.find_by_user_id', lambda: AccountSettingsModel.find_by_user_id(user_id)),
+        ('CarModel.find_by_id', lambda: CarModel.find_by_id(fixture['car'].id)),
+        ('CarModel.return_all_for_user', lambda: CarModel.return_all_for_user(user_id)),
+        ('CommunityModel.find_by_car_id', lambda: CommunityModel.find_by_car_id(fixture['car'].id)),
+        ('CommunityModel.find_by_id', lambda: CommunityModel.find_by_id(community_id)),
+        ('CommunityModel.exists_by_id', lambda: CommunityModel.exists_by_id(community_id)),
+        ('CommunityModel.find_version', lambda: CommunityModel.find_version(community_id)),
+        ('CommunityDailyStatisticModel.find_totals_by_community',
+         lambda: CommunityDailyStatisticModel.find_totals_by_community(community_id, from_time.date(), now.date())),
+        ('CommunityLedgerModel.find_by_community', lambda: CommunityLedgerModel.find_by_community(community_id)),
+        ('CommunityUserLinkModel.find_by_user_and_community',
+         lambda: CommunityUserLinkModel.find_by_user_and_community(user_id, community_id)),
+        ('CommunityUserLinkModel.exists_member', lambda: CommunityUserLinkModel.exists_member(user_id, community_id)),
+        ('CommunityUserLinkModel.find_members_by_user_ids',
+         lambda: CommunityUserLinkModel.find_members_by_user_ids(community_id, user_ids)),
+        ('CommunityUserLinkModel.find_favourite_by_user',
+         lambda: CommunityUserLinkModel.find_favourite_by_user(user_id)),
+        ('CommunityUserLinkModel.find_by_user', lambda: CommunityUserLinkModel.find_by_user(user_id)),
+        ('CommunityUserLinkModel.find_by_community', lambda: CommunityUserLinkModel.find_by_community(community_id)),
+        ('CommunityUserLinkModel.find_open_invitations_by_user',
+         lambda: CommunityUserLinkModel.find_open_invitations_by_user(fixture['users'][2].id)),
+        ('CommunityUserLinkModel.find_open_invitations_by_community',
+         lambda: CommunityUserLinkModel.find_open_invitations_by_community(community_id)),
+        ('DebtModel.find_by_id', lambda: DebtModel.find_by_id(fixture['debt'].id)),
+        ('DebtModel.find_by_community', lambda: DebtModel.find_by_community(community_id)),
+        ('DebtModel.find_amount_sums_by_community', lambda: DebtModel.find_amount_sums_by_community(community_id)),
+        ('DebtModel.find_totals_by_payoffs', lambda: DebtModel.find_totals_by_payoffs(payoff_ids)),
+        ('DebtModel.find_unsettled_by_community', lambda: DebtModel.find_unsettled_by_community(community_id)),
+        ('DebtModel.find_unsettled_by_user', lambda: DebtModel.find_unsettled_by_user(user_id)),
+        ('DebtModel.find_unsettled_by_payoff', lambda: DebtModel.find_unsettled_by_payoff(fixture['payoff'].id)),
+        ('EventModel.find_by_id', lambda: EventModel.find_by_id(fixture['event'].id)),
+        ('EventModel.find_by_community',
+         lambda: EventModel.find_by_community(community_id, now, now + datetime.timedelta(days=30))),
+        ('EventModel.find_next_n_by_community', lambda: EventModel.find_next_n_by_community(community_id, 10)),
+        ('PayoffModel.find_by_id', lambda: PayoffModel.find_by_id(fixture['payoff'].id)),
+        ('PayoffModel.find_by_community', lambda: PayoffModel.find_by_community(community_id)),
+        ('PayoffModel.find_summaries_by_community', lambda: PayoffModel.find_summaries_by_community(community_id)),
+        ('PayoffModel.find_latest_by_community', lambda: PayoffModel.find_latest_by_community(community_id)),
+        ('RefuelModel.find_by_id', lambda: RefuelModel.find_by_id(fixture['refuel'].id)),
+        ('RefuelModel.find_by_community', lambda: RefuelModel.find_by_community(community_id)),
+        ('RefuelModel.find_by_community_and_time_created',
+         lambda: RefuelModel.find_by_community_and_time_created(community_id, from_time, now)),
+        ('RefuelModel.find_cost_totals_by_community_and_time_created',
+         lambda: RefuelModel.find_cost_totals_by_community_and_time_created(community_id, from_time, now)),
+        ('RefuelModel.find_costs_by_community', lambda: RefuelModel.find_costs_by_community(community_id)),
+        ('RefuelModel.find_open_by_community', lambda: RefuelModel.find_open_by_community(community_id)),
+        ('RefuelModel.exists_open_by_community', lambda: RefuelModel.exists_open_by_community(community_id)),
+        ('RefuelModel.find_totals_by_payoffs', lambda: RefuelModel.find_totals_by_payoffs(payoff_ids)),
+        ('RefuelModel.find_by_user', lambda: RefuelModel.find_by_user(user_id)),
+        ('RevokedTokenModel.is_jti_blacklisted',
+         lambda: RevokedTokenModel.is_jti_blacklisted(fixture['revoked_token'].jti)),
+        ('RevokedTokenModel.find_jtis_since', lambda: RevokedTokenModel.find_jtis_since(now)),
+        ('TaskModel.find_by_id', lambda: TaskModel.find_by_id(fixture['task'].id)),
+        ('TaskModel.find_by_community', lambda: TaskModel.find_by_community(community_id)),
+        ('TaskModel.find_due_time_triggered', lambda: TaskModel.find_due_time_triggered(now)),
+        ('TaskModel.find_due_km_triggered', lambda: TaskModel.find_due_km_triggered(community_id, 1000)),
+        ('TaskInstanceModel.find_by_id', lambda: TaskInstanceModel.find_by_id(fixture['task_instance'].id)),
+        ('TaskInstanceModel.find_by_task', lambda: TaskInstanceModel.find_by_task(fixture['task'].id)),
+        ('TaskInstanceModel.find_by_community', lambda: TaskInstanceModel.find_by_community(community_id)),
+        ('TaskInstanceModel.find_open_by_community', lambda: TaskInstanceModel.find_open_by_community(community_id)),
+        ('TaskInstanceModel.find_open_by_user', lambda: TaskInstanceModel.find_open_by_user(user_id)),
+        ('TourModel.find_by_id', lambda: TourModel.find_by_id(fixture['tour'].id)),
+        ('TourModel.find_finished_by_community', lambda: TourModel.find_finished_by_community(community_id)),
+        ('TourModel.find_finished_by_community_and_end_time',
+         lambda: TourModel.find_finished_by_community_and_end_time(community_id, from_time, now)),
+        ('TourModel.find_finished_km_by_community', lambda: TourModel.find_finished_km_by_community(community_id)),
+        ('TourModel.find_finished_and_open_by_community',
+         lambda: TourModel.find_finished_and_open_by_community(community_id)),
+        ('TourModel.exists_finished_and_open_by_community',
+         lambda: TourModel.exists_finished_and_open_by_community(community_id)),
+        ('TourModel.find_totals_by_payoffs', lambda: TourModel.find_totals_by_payoffs(payoff_ids)),
+        ('TourModel.find_finished_by_user', lambda: TourModel.find_finished_by_user(user_id)),
+        ('TourModel.find_running_by_community', lambda: TourModel.find_running_by_community(community_id)),
+        ('TourModel.find_running_by_user', lambda: TourModel.find_running_by_user(user_id)),
+        ('TourModel.find_newest_tour_for_community', lambda: TourModel.find_newest_tour_for_community(community_id)),
+        ('TourPassengerLinkModel.find_by_finished_tours_of_community',
+         lambda: TourPassengerLinkModel.find_by_finished_tours_of_community(community_id)),
+        ('TourPassengerLinkModel.find_km_totals_by_community_and_end_time',
+         lambda: TourPassengerLinkModel.find_km_totals_by_community_and_end_time(community_id, from_time, now)),
+        ('UserModel.find_by_username', lambda: UserModel.find_by_username(fixture['users'][0].username)),
+        ('UserModel.find_by_email', lambda: UserModel.find_by_email(fixture['users'][0].email)),
+        ('UserModel.find_by_id', lambda: UserModel.find_by_id(user_id)),
+        ('UserModel.find_by_reset_password_hash',
+         lambda: UserModel.find_by_reset_password_hash(fixture['users'][2].reset_password_hash)),
+    ]
+
+
+def capture_statements(function):
+    """
+    Calls the function and captures the executed SQL statements.
+    :return: List of (statement, parameters) tuples.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        function()
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+
+def explain(statement, parameters):
+    """
+    Explains a statement in the current transaction.
+    :return: List of the lines of the query plan.
+    """
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        rows = connection.exec_driver_sql('EXPLAIN ' + statement, parameters).all()
+        return [row[0] for row in rows]
+    rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+    return [row[-1] for row in rows]
+
+
+def find_table_scans(plan, table_names):
+    """
+    Returns the tables of the models the plan reads without an index.
+    :return: List of table names.
+    """
+    scanned_tables = []
+    for line in plan:
+        match = re.search(r'Seq Scan on (\w+)', line) or re.match(r'\s*SCAN (\w+)(?! USING)(?:\s|$)', line)
+        if match and match.group(1) in table_names:
+            scanned_tables.append(match.group(1))
+    return scanned_tables
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--verbose', action='store_true', help='print the query plans')
+    args = parser.parse_args()
+
+    failed = False
+    table_names = set(db.metadata.tables)
+    with app.app_context():
+        try:
+            if db.session.connection().dialect.name == 'postgresql':
+                db.session.execute(db.text('SET LOCAL enable_seqscan = off'))
+            now = datetime.datetime.utcnow()
+            fixture = create_community(now)
+            for name, function in get_lookups(fixture, now):
+                scanned_tables = []
+                statements = capture_statements(function)
+                for statement, parameters in statements:
+                    plan = explain(statement, parameters)
+                    if args.verbose:
+                        print('\n'.join([statement] + plan + ['']))
+                    scanned_tables.extend(find_table_scans(plan, table_names))
+                failed = failed or bool(scanned_tables)
+                print('{:<64} {:>3} queries  {}'.format(
+                    name, len(statements), 'scans ' + ', '.join(scanned_tables) if scanned_tables else 'ok'))
+        finally:
+            db.session.rollback()
+
+    if failed:
+        sys.exit('Some queries scan whole tables')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""
+Requests every GET route registered in `configure_api` with the Flask test client and reports the latency percentiles,
+SQL queries and response bytes per request. Path parameters are filled with data of the given community, so run it
+against a database filled by `src.benchmarks.seed_data`. Routes that change data, stream or call external services
+are skipped and listed in the results.
+
+The results are written as JSON to `--output`. Pass the results of an earlier run as `--baseline` to print the changes
+of the median latency and the number of queries.
+
+Run from the repository root, e.g.
+`CARBULATOR_CONFIG=... python -m src.benchmarks.load_test --username seed-0-0 --password carbulator`.
+"""
+import argparse
+import datetime
+import json
+import re
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import event
+
+from src.app import app, db
+from src.models.community_user_link import CommunityUserLinkModel
+from src.models.debt import DebtModel
+from src.models.event import EventModel
+from src.models.payoff import PayoffModel
+from src.models.refuel import RefuelModel
+from src.models.task import TaskModel
+from src.models.task_instance import TaskInstanceModel
+from src.models.tour import TourModel
+from src.models.user import UserModel
+from src.resources import geocoding_resources, stream_resources, user_resources
+
+# Resources that are not requested: they stream until the client disconnects or call external services
+SKIPPED_RESOURCES = {
+    stream_resources.CommunityStream: 'streams server-sent events',
+    geocoding_resources.Geocode: 'calls an external geocoding service',
+}
+
+# Query strings of resources with required arguments
+QUERY_STRINGS = {
+    user_resources.UserSearch: 'q=seed',
+}
+
+# Matches the path parameters of a route together with the path segment before them, e.g. `tours/<int:id>`
+PATH_PARAMETER_REGEX = re.compile(r'([\w-]+)/<(?:\w+:)?(\w+)>')
+
+
+def get_path_values(user_id, community_id, now: datetime.datetime) -> dict:
+    """
+    Collects the ids of the given community to fill the path parameters of the routes with. Parameters are identified
+    by the path segment before them, as `id` refers to different models in different routes.
+    :return: Dict of path segment to value.
+    """
+    car_id = CommunityUserLinkModel.find_by_user_and_community(user_id, community_id).community.car_id
+    tour = TourModel.find_finished_by_community(community_id, limit=1)
+    refuel = RefuelModel.find_by_community(community_id, limit=1)
+    payoff = PayoffModel.find_latest_by_community(community_id)
+    debts = DebtModel.find_by_community(community_id)
+    tasks = TaskModel.find_by_community(community_id)
+    task_instances = TaskInstanceModel.find_by_community(community_id)
+    events = EventModel.find_next_n_by_community(community_id, 1)
+    return {
+        'cars': car_id,
+        'communities': community_id,
+        'invitations': community_id,
+        'tours': tour[0].id if tour else None,
+        'refuels': refuel[0].id if refuel else None,
+        'payoffs': payoff.id if payoff else None,
+        'debts': debts[0].id if debts else None,
+        'tasks': tasks[0].id if tasks else None,
+        'instances': task_instances[0].id if task_instances else None,
+        'events': events[0].id if events else None,
+        'next': 50,
+        'from': (now - datetime.timedelta(days=365)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'to': now.strftime('%Y-%m-%dT%H:%M:%SZ'),
+    }
+
+
+def get_routes(path_values):
+    """
+    Returns the GET routes of the api resources.
+    :return: Tuple of a list of (route, resource name, url) tuples and a list of skipped routes with the reason.
+    """
+    routes = []
+    skipped_routes = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        resource = getattr(app.view_functions[rule.endpoint], 'view_class', None)
+        if resource is None or not rule.rule.startswith('/api/'):
+            continue
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            reason = None
+            if method != 'GET':
+                reason = 'changes data'
+            elif resource in SKIPPED_RESOURCES:
+                reason = SKIPPED_RESOURCES[resource]
+            url = rule.rule
+            for segment, parameter in PATH_PARAMETER_REGEX.findall(rule.rule):
+                if reason is None and path_values.get(segment) is None:
+                    reason = 'no value for path parameter {}'.format(parameter)
+                url = re.sub(r'<(?:\w+:)?{}>'.format(parameter), str(path_values.get(segment)), url, count=1)
+            if reason:
+                skipped_routes.append({'route': rule.rule, 'resource': resource.__name__, 'method': method,
+                                       'reason': reason})
+            else:
+                if resource in QUERY_STRINGS:
+                    url += '?' + QUERY_STRINGS[resource]
+                routes.append((rule.rule, resource.__name__, url))
+    return routes, skipped_routes
+
+
+def measure(client, url, headers, number_of_requests, number_of_warmup_requests):
+    """
+    Requests the url and measures the latencies, queries and response sizes.
+    :return: Dict of the results.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    for _ in range(number_of_warmup_requests):
+        client.get(url, headers=headers)
+
+    with app.app_context():
+        engine = db.engine
+    latencies = []
+    status_codes = set()
+    number_of_bytes = 0
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        for _ in range(number_of_requests):
+            started = time.perf_counter()
+            response = client.get(url, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            status_codes.add(response.status_code)
+            number_of_bytes += len(response.get_data())
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return {
+        'status': sorted(status_codes),
+        'requests': number_of_requests,
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'queries_per_request': len(statements) / number_of_requests,
+        'bytes_per_response': number_of_bytes // number_of_requests,
+    }
+
+
+def print_changes(results, baseline):
+    """
+    Prints the changes of the median latency and the number of queries compared to an earlier run.
+    """
+    baseline_results = {(r['route'], r['resource']): r for r in baseline['routes']}
+    print('\n{:<90} {:>10} {:>10}'.format('route (compared to baseline)', 'p50', 'queries'))
+    for result in results:
+        baseline_result = baseline_results.get((result['route'], result['resource']))
+        if baseline_result is None:
+            print('{:<90} {:>10}'.format(result['route'], 'new'))
+            continue
+        p50_change = (result['p50_ms'] / baseline_result['p50_ms'] - 1) * 100 if baseline_result['p50_ms'] else 0
+        print('{:<90} {:>+9.1f}% {:>+10g}'.format(
+            result['route'], p50_change, result['queries_per_request'] - baseline_result['queries_per_request']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--community', type=int, help='community to request, defaults to the first of the user')
+    parser.add_argument('--requests', type=int, default=50, help='measured requests per route')
+    parser.add_argument('--warmup', type=int, default=5, help='unmeasured requests per route')
+    parser.add_argument('--output', default='load_test.json')
+    parser.add_argument('--baseline', help='results of an earlier run to compare with')
+    args = parser.parse_args()
+
+    client = app.test_client()
+    response = client.post('/api/login', json={'username': args.username, 'password': args.password})
+    if response.status_code != 202:
+        sys.exit('Login failed: {}'.format(response.json))
+    headers = {'Authorization': 'Bearer ' + response.json['access_token']}
+
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    with app.app_context():
+        user_id = UserModel.find_by_username(args.username).id
+        community_id = args.community
+        if community_id is None:
+            communities = CommunityUserLinkModel.find_by_user(user_id)
+            if not communities:
+                sys.exit('{} is no member of a community'.format(args.username))
+            community_id = communities[0].community_id
+        routes, skipped_routes = get_routes(get_path_values(user_id, community_id, now))
+
+    results = []
+    print('{:<90} {:>6} {:>9} {:>9} {:>9} {:>8} {:>9}'.format(
+        'route', 'status', 'p50 [ms]', 'p95 [ms]', 'p99 [ms]', 'queries', 'bytes'))
+    for route, resource_name, url in routes:
+        result = {'route': route, 'resource': resource_name, 'url': url}
+        result.update(measure(client, url, headers, args.requests, args.warmup))
+        results.append(result)
+        print('{:<90} {:>6} {:>9.2f} {:>9.2f} {:>9.2f} {:>8g} {:>9}'.format(
+            route, ','.join(str(s) for s in result['status']), result['p50_ms'], result['p95_ms'], result['p99_ms'],
+            result['queries_per_request'], result['bytes_per_response']))
+    for skipped_route in skipped_routes:
+        print('{:<90} skipped {} ({})'.format(skipped_route['route'], skipped_route['method'], skipped_route['reason']))
+
+    with app.app_context():
+        database = db.engine.dialect.name
+    with open(args.output, 'w') as output:
+        json.dump({
+            'time': now.isoformat(),
+            'database': database,
+            'community_id': community_id,
+            'requests': args.requests,
+            'routes': results,
+            'skipped_routes': skipped_routes,
+        }, output, indent=2, sort_keys=True)
+    print('\nWrote results to {}'.format(args.output))
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            print_changes(results, json.load(baseline))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Compares the compiled marshallers of `src.util.fast_marshal` with `flask_restful.marshal` for tours, refuels and
+payoffs. Both variants are timed including the JSON encoding and their outputs are checked for equality.
+
+Run from the repository root with `python -m src.benchmarks.marshalling`.
+"""
+import argparse
+import datetime
+import json
+import sys
+import time
+from decimal import Decimal
+
+from flask_restful import marshal
+
+from src.app import app
+from src.models.car import CarModel
+from src.models.community import CommunityModel
+from src.models.debt import DebtModel
+from src.models.payoff import PayoffModel
+from src.models.refuel import RefuelModel
+from src.models.tour import TourModel
+from src.models.user import UserModel
+from src.util.fast_marshal import compile_marshaller, orjson
+
+
+def create_objects(number_of_items: int, number_of_users: int = 10) -> dict:
+    """
+    Creates transient tours, refuels and payoffs of one community.
+    :return: Dict of object lists by name.
+    """
+    now = datetime.datetime(2020, 1, 1, 12)
+    users = [UserModel(id=i, username='user{}'.format(i), email='user{}@example.com'.format(i), time_created=now)
+             for i in range(number_of_users)]
+    car = CarModel(id=1, name='Car', make='Make', model='Model', owner=users[0], time_created=now)
+    community = CommunityModel(id=1, name='Community', car=car, users=users, time_created=now)
+    tours = [TourModel(id=i, start_time=now, end_time=now + datetime.timedelta(hours=1),
+                       owner=users[i % number_of_users], community=community, start_km=Decimal(i * 10),
+                       end_km=Decimal(i * 10 + 10), comment='Tour', is_force_finished=False, is_open=False,
+                       passengers=users[:i % 3], time_created=now)
+             for i in range(number_of_items)]
+    refuels = [RefuelModel(id=i, owner=users[i % number_of_users], community=community, costs=Decimal('55.10'),
+                           liters=Decimal('40.50'), gas_station_name='Station', is_open=False, time_created=now)
+               for i in range(number_of_items)]
+    payoffs = []
+    for i in range(max(1, number_of_items // 50)):
+        debts = [DebtModel(id=j, amount=Decimal('12.34'), debtee=users[j % number_of_users],
+                           recepient=users[(j + 1) % number_of_users], is_settled=False, time_created=now)
+                 for j in range(number_of_users)]
+        payoffs.append(PayoffModel(id=i, debts=debts, tours=tours[:50], refuels=refuels[:10], is_settled=False,
+                                   time_created=now))
+    return {
+        'tours': (tours, TourModel.get_marshaller()),
+        'refuels': (refuels, RefuelModel.get_marshaller()),
+        'payoffs': (payoffs, PayoffModel.get_marshaller())
+    }
+
+
+def best_time(fn, repetitions: int) -> float:
+    """
+    Returns the best run time of the function in milliseconds.
+    """
+    best = float('inf')
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, nargs='+', default=[50, 500, 5000])
+    parser.add_argument('--repetitions', type=int, default=5)
+    args = parser.parse_args()
+
+    encode = orjson.dumps if orjson else json.dumps
+    failed = False
+    print('{:<8} {:>6} {:>18} {:>18} {:>8}'.format('type', 'items', 'flask_restful [ms]', 'compiled [ms]',
+                                                  'speedup'))
+    with app.app_context():
+        for items in args.items:
+            for name, (objects, marshaller) in create_objects(items).items():
+                serialize = compile_marshaller(marshaller)
+                if json.loads(encode(serialize(objects))) != json.loads(json.dumps(marshal(objects, marshaller))):
+                    failed = True
+                    print('{:<8} {:>6} output differs'.format(name, len(objects)))
+                    continue
+                baseline = best_time(lambda: json.dumps(marshal(objects, marshaller)), args.repetitions)
+                compiled = best_time(lambda: encode(serialize(objects)), args.repetitions)
+                print('{:<8} {:>6} {:>18.2f} {:>18.2f} {:>7.1f}x'.format(name, len(objects), baseline, compiled,
+                                                                         baseline / compiled))
+
+    if failed:
+        sys.exit('The compiled marshallers produced different output')
+
+
+if __name__ == '__main__':
+    main()
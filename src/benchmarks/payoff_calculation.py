@@ -0,0 +1,56 @@
+"""
+Benchmarks the payoff debt matrix calculation for communities with many tours and refuels.
+
+Run from the repository root with `python -m src.benchmarks.payoff_calculation`.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.util.payoff_calculation import calculate_payoff_debt_matrix
+
+
+def create_payoff_arrays(number_of_users: int, number_of_tours: int, number_of_refuels: int, seed: int = 0) -> dict:
+    """
+    Creates random flat payoff input arrays.
+    :return: Keyword arguments for `calculate_payoff_debt_matrix`.
+    """
+    rng = np.random.default_rng(seed)
+    passengers_per_tour = rng.integers(0, min(3, number_of_users), number_of_tours)
+    number_of_debts = number_of_users * 2
+    return {
+        'number_of_users': number_of_users,
+        'tour_km': rng.uniform(1, 300, number_of_tours),
+        'participant_tour_indices': np.concatenate([np.arange(number_of_tours),
+                                                    np.repeat(np.arange(number_of_tours), passengers_per_tour)]),
+        'participant_user_indices': rng.integers(0, number_of_users, number_of_tours + passengers_per_tour.sum()),
+        'refuel_costs': rng.uniform(20, 90, number_of_refuels),
+        'refuel_owner_indices': rng.integers(0, number_of_users, number_of_refuels),
+        'debtee_indices': rng.integers(0, number_of_users, number_of_debts),
+        'recipient_indices': rng.integers(0, number_of_users, number_of_debts),
+        'debt_amounts': rng.uniform(0, 50, number_of_debts)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, nargs='+', default=[5, 50, 500])
+    parser.add_argument('--tours', type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    parser.add_argument('--repetitions', type=int, default=5)
+    args = parser.parse_args()
+
+    print('{:>6} {:>8} {:>8} {:>10}'.format('users', 'tours', 'refuels', 'time [ms]'))
+    for users in args.users:
+        for tours in args.tours:
+            arrays = create_payoff_arrays(users, tours, tours // 5)
+            best = float('inf')
+            for _ in range(args.repetitions):
+                start = time.perf_counter()
+                calculate_payoff_debt_matrix(**arrays)
+                best = min(best, time.perf_counter() - start)
+            print('{:>6} {:>8} {:>8} {:>10.2f}'.format(users, tours, tours // 5, best * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Sends concurrent requests from many threads to the GET routes of a community to check the connection pool settings
+(`DATABASE_POOL_SIZE`, `DATABASE_MAX_OVERFLOW`, `DATABASE_POOL_TIMEOUT`, ...) against the configured database. Reports
+the throughput, latency percentiles, status codes, exceptions like pool timeouts and the peak number of checked out
+connections, and fails if a request failed. With `DATABASE_STATEMENT_TIMEOUT` set on Postgres it also checks that a
+longer statement is canceled.
+
+Run from the repository root against a database filled by `src.benchmarks.seed_data`, e.g.
+`CARBULATOR_CONFIG=... python -m src.benchmarks.pool_stress --username seed-0-0 --password carbulator --threads 30`.
+"""
+import argparse
+import collections
+import datetime
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from flask import got_request_exception
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+from werkzeug.exceptions import HTTPException
+
+from src.app import app, db
+from src.benchmarks.load_test import get_path_values, get_routes
+from src.models.community_user_link import CommunityUserLinkModel
+from src.models.user import UserModel
+from src.util.database import get_pool_status
+
+
+class PoolUsage:
+    """
+    Counts the checkouts and the peak number of checked out connections of the pool of an engine.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.checkouts = 0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+        self._lock = threading.Lock()
+
+    def checkout(self, dbapi_connection, connection_record, connection_proxy):
+        status = get_pool_status(self.engine)
+        with self._lock:
+            self.checkouts += 1
+            self.peak_checked_out = max(self.peak_checked_out, status.get('checked_out', 0))
+            self.peak_overflow = max(self.peak_overflow, status.get('overflow', 0))
+
+
+def send_requests(urls, headers, number_of_requests, offset):
+    """
+    Requests the urls in turns, starting with the url at the given offset.
+    :return: List of (latency, status code) tuples.
+    """
+    client = app.test_client()
+    results = []
+    for i in range(number_of_requests):
+        started = time.perf_counter()
+        response = client.get(urls[(offset + i) % len(urls)], headers=headers)
+        results.append((time.perf_counter() - started, response.status_code))
+    return results
+
+
+def check_statement_timeout():
+    """
+    Runs a statement that takes twice as long as the statement timeout.
+    :return: True if the statement was canceled.
+    """
+    timeout = app.config['DATABASE_STATEMENT_TIMEOUT']
+    with app.app_context():
+        try:
+            db.session.execute(text('SELECT pg_sleep(:seconds)'), {'seconds': timeout * 2})
+        except OperationalError:
+            return True
+        finally:
+            db.session.rollback()
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--community', type=int, help='community to request, defaults to the first of the user')
+    parser.add_argument('--threads', type=int, default=20, help='concurrent clients')
+    parser.add_argument('--requests', type=int, default=50, help='requests per client')
+    args = parser.parse_args()
+
+    client = app.test_client()
+    response = client.post('/api/login', json={'username': args.username, 'password': args.password})
+    if response.status_code != 202:
+        sys.exit('Login failed: {}'.format(response.json))
+    headers = {'Authorization': 'Bearer ' + response.json['access_token']}
+
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    with app.app_context():
+        user_id = UserModel.find_by_username(args.username).id
+        community_id = args.community
+        if community_id is None:
+            communities = CommunityUserLinkModel.find_by_user(user_id)
+            if not communities:
+                sys.exit('{} is no member of a community'.format(args.username))
+            community_id = communities[0].community_id
+        routes, _ = get_routes(get_path_values(user_id, community_id, now))
+        engine = db.engine
+    urls = [url for _, _, url in routes]
+
+    exceptions = collections.Counter()
+
+    def count_exception(sender, exception, **extra):
+        if not isinstance(exception, HTTPException):
+            exceptions[type(exception).__name__] += 1
+
+    pool_usage = PoolUsage(engine)
+    event.listen(engine, 'checkout', pool_usage.checkout)
+    got_request_exception.connect(count_exception, app)
+    print('Pool settings: {}, pool_timeout={}, pool_pre_ping={}, pool_recycle={}'.format(
+        get_pool_status(engine), engine.pool.timeout() if hasattr(engine.pool, 'timeout') else None,
+        engine.pool._pre_ping, engine.pool._recycle))
+    print('Sending {} requests from {} threads to {} routes'.format(args.threads * args.requests, args.threads,
+                                                                    len(urls)))
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            futures = [executor.submit(send_requests, urls, headers, args.requests, i) for i in range(args.threads)]
+            results = [result for future in futures for result in future.result()]
+    finally:
+        duration = time.perf_counter() - started
+        got_request_exception.disconnect(count_exception, app)
+        event.remove(engine, 'checkout', pool_usage.checkout)
+
+    latencies = np.array([latency for latency, _ in results]) * 1000
+    status_codes = collections.Counter(status_code for _, status_code in results)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print('{:.1f} requests/s, p50 {:.2f} ms, p95 {:.2f} ms, p99 {:.2f} ms, max {:.2f} ms'.format(
+        len(results) / duration, p50, p95, p99, latencies.max()))
+    print('Status codes: {}'.format(dict(sorted(status_codes.items()))))
+    print('Exceptions: {}'.format(dict(exceptions) or 'none'))
+    print('Pool: {} checkouts, peak {} checked out, peak overflow {}, now {}'.format(
+        pool_usage.checkouts, pool_usage.peak_checked_out, pool_usage.peak_overflow, get_pool_status(engine)))
+
+    failed = bool(exceptions) or any(status_code >= 500 for status_code in status_codes)
+    status = get_pool_status(engine)
+    if 'size' in status and status['max_overflow'] >= 0 \
+            and pool_usage.peak_checked_out >= status['size'] + status['max_overflow']:
+        print('The pool was exhausted, requests waited for free connections')
+
+    if engine.dialect.name == 'postgresql' and app.config['DATABASE_STATEMENT_TIMEOUT']:
+        if check_statement_timeout():
+            print('Statement timeout: a statement running longer than {} s was canceled'.format(
+                app.config['DATABASE_STATEMENT_TIMEOUT']))
+        else:
+            print('Statement timeout: a statement running longer than {} s was not canceled'.format(
+                app.config['DATABASE_STATEMENT_TIMEOUT']))
+            failed = True
+
+    if failed:
+        sys.exit('Failed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Counts the SQL queries of the list endpoints for a community and fails if an endpoint exceeds the allowed number. The
+count must not grow with the number of rows returned - use it to check that the loader options of the models match
+their marshallers.
+
+Run from the repository root against a database with data, e.g.
+`CARBULATOR_CONFIG=... python -m src.benchmarks.query_counts --username USER --password PASSWORD --community ID`.
+"""
+import argparse
+import sys
+
+from sqlalchemy import event
+
+from src.app import app, db
+
+LIST_ENDPOINTS = [
+    '/api/communities/{community_id}/tours',
+    '/api/communities/{community_id}/tours/running',
+    '/api/communities/{community_id}/refuels',
+    '/api/communities/{community_id}/payoffs',
+    '/api/communities/{community_id}/debts/open',
+    '/api/communities/{community_id}/tasks',
+    '/api/communities/{community_id}/tasks/instances/open',
+    '/api/communities/{community_id}/events/next/50',
+    '/api/account/tours/',
+    '/api/account/tours/running',
+    '/api/account/refuels',
+    '/api/account/debts/open',
+    '/api/account/tasks/instances/open',
+    '/api/account/communities',
+    '/api/account/invitations',
+    '/api/account/cars',
+]
+
+
+def count_queries(client, url, headers):
+    """
+    Requests the url and counts the executed SQL statements.
+    :return: Tuple of status code, number of queries and number of returned items.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    items = len(response.json) if isinstance(response.json, list) else 1
+    return response.status_code, len(statements), items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--community', type=int, required=True)
+    parser.add_argument('--max-queries', type=int, default=15)
+    args = parser.parse_args()
+
+    client = app.test_client()
+    response = client.post('/api/login', json={'username': args.username, 'password': args.password})
+    if response.status_code != 202:
+        sys.exit('Login failed: {}'.format(response.json))
+    headers = {'Authorization': 'Bearer ' + response.json['access_token']}
+
+    failed = False
+    print('{:<60} {:>6} {:>7} {:>7}'.format('endpoint', 'status', 'items', 'queries'))
+    for endpoint in LIST_ENDPOINTS:
+        url = endpoint.format(community_id=args.community)
+        status, queries, items = count_queries(client, url, headers)
+        exceeded = queries > args.max_queries
+        failed = failed or exceeded
+        print('{:<60} {:>6} {:>7} {:>7}{}'.format(url, status, items, queries, ' TOO MANY' if exceeded else ''))
+
+    if failed:
+        sys.exit('At least one endpoint exceeded {} queries'.format(args.max_queries))
+
+
+if __name__ == '__main__':
+    main()
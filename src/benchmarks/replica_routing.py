@@ -0,0 +1,168 @@
+"""
+Checks the read replica routing against the configured primary and `REPLICA_DATABASE_URI`: the GET routes decorated
+with `read_from_replica` have to query the replica, all other GET routes only the primary. After the user created an
+event, the event routes have to read from the primary until `REPLICA_READ_YOUR_WRITES_WINDOW` is over and from the
+replica afterwards, both with the read-your-writes cookie and the echoed `X-Read-Your-Writes` header. The event is
+deleted again at the end.
+
+The replica can be a copy of the primary, e.g. for SQLite `cp carbulator.db replica.db` and
+`REPLICA_DATABASE_URI = 'sqlite:////path/to/replica.db'` in the config. Run from the repository root against a database
+filled by `src.benchmarks.seed_data`, e.g.
+`CARBULATOR_CONFIG=... python -m src.benchmarks.replica_routing --username seed-0-0 --password carbulator`.
+"""
+import argparse
+import datetime
+import sys
+import time
+
+from sqlalchemy import event
+
+from src.app import app, db
+from src.benchmarks.load_test import get_path_values, get_routes
+from src.models.community_user_link import CommunityUserLinkModel
+from src.models.user import UserModel
+from src.util.database import REPLICA_BIND_KEY
+from src.util.replica import READ_YOUR_WRITES_HEADER, replica_routing
+
+
+class QueryCounter:
+    """
+    Counts the queries of every database bind.
+    """
+
+    def __init__(self, engines):
+        self.engines = engines
+        self.counts = {bind_key: 0 for bind_key in engines}
+        self._listeners = {}
+
+    def __enter__(self):
+        for bind_key, engine in self.engines.items():
+            self._listeners[bind_key] = self._create_listener(bind_key)
+            event.listen(engine, 'before_cursor_execute', self._listeners[bind_key])
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        for bind_key, engine in self.engines.items():
+            event.remove(engine, 'before_cursor_execute', self._listeners[bind_key])
+
+    def _create_listener(self, bind_key):
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            self.counts[bind_key] += 1
+
+        return before_cursor_execute
+
+
+def request(client, engines, method, url, headers, json=None):
+    """
+    Sends a request and counts its queries.
+    :return: Tuple of the response, the queries of the primary and the queries of the replica.
+    """
+    with QueryCounter(engines) as counter:
+        response = client.open(url, method=method, headers=headers, json=json)
+    return response, counter.counts[None], counter.counts[REPLICA_BIND_KEY]
+
+
+def check_routes(client, engines, headers, routes):
+    """
+    Requests the routes and checks that only the decorated resources query the replica.
+    :return: Number of failed routes.
+    """
+    resources = {view_function.view_class.__name__: view_function.view_class
+                 for view_function in app.view_functions.values() if hasattr(view_function, 'view_class')}
+    failures = 0
+    for route, resource_name, url in routes:
+        reads_from_replica = getattr(resources[resource_name].get, 'reads_from_replica', False)
+        response, primary_queries, replica_queries = request(client, engines, 'GET', url, headers)
+        failed = response.status_code >= 500 or (replica_queries > 0) != reads_from_replica
+        failures += failed
+        print('{:<90} {:>6} {:>8} {:>8} {:>8} {}'.format(
+            route, response.status_code, 'replica' if reads_from_replica else 'primary', primary_queries,
+            replica_queries, 'FAILED' if failed else 'ok'))
+    return failures
+
+
+def check_read_your_writes(client, engines, headers, community_id, now):
+    """
+    Creates an event and checks that the event routes read from the primary within the read-your-writes window and
+    from the replica afterwards, once with the cookie set by the write and once with the `X-Read-Your-Writes` header
+    echoed by a client without cookies.
+    :return: Number of failed checks.
+    """
+    failures = 0
+    events_url = '/api/communities/{}/events/from/{}/to/{}'.format(
+        community_id, (now - datetime.timedelta(days=1)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        (now + datetime.timedelta(days=2)).strftime('%Y-%m-%dT%H:%M:%SZ'))
+    response = client.post('/api/communities/{}/events'.format(community_id), headers=headers, json={
+        'title': 'Replica routing check',
+        'start': (now + datetime.timedelta(days=1)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'end': (now + datetime.timedelta(days=1, hours=1)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+    })
+    if response.status_code != 201:
+        sys.exit('Creating the event failed: {}'.format(response.json))
+    event_id = response.json['id']
+    clients = [
+        ('cookie', client, headers),
+        ('header', app.test_client(use_cookies=False),
+         dict(headers, **{READ_YOUR_WRITES_HEADER: response.headers[READ_YOUR_WRITES_HEADER]})),
+    ]
+
+    try:
+        for description, expect_primary in [('within the window', True), ('after the window', False)]:
+            if not expect_primary:
+                # The token stores the time in whole seconds, so it may stay valid up to a second longer
+                time.sleep(replica_routing.window + 1)
+            for token_source, token_client, token_headers in clients:
+                for url in [events_url, '/api/events/{}'.format(event_id)]:
+                    response, primary_queries, replica_queries = request(token_client, engines, 'GET', url,
+                                                                         token_headers)
+                    found = response.status_code == 200 and (not isinstance(response.json, list) or any(
+                        e['id'] == event_id for e in response.json))
+                    failed = (replica_queries == 0) != expect_primary or (expect_primary and not found)
+                    failures += failed
+                    print('{:<50} {:<20} {:<6} {:>6} {:>8} {:>8} new event {} {}'.format(
+                        url, description, token_source, response.status_code, primary_queries, replica_queries,
+                        'found' if found else 'not found', 'FAILED' if failed else 'ok'))
+    finally:
+        client.delete('/api/events/{}'.format(event_id), headers=headers)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--community', type=int, help='community to request, defaults to the first of the user')
+    args = parser.parse_args()
+
+    if not replica_routing.enabled:
+        sys.exit('REPLICA_DATABASE_URI is not configured')
+
+    client = app.test_client()
+    response = client.post('/api/login', json={'username': args.username, 'password': args.password})
+    if response.status_code != 202:
+        sys.exit('Login failed: {}'.format(response.json))
+    headers = {'Authorization': 'Bearer ' + response.json['access_token']}
+
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    with app.app_context():
+        user_id = UserModel.find_by_username(args.username).id
+        community_id = args.community
+        if community_id is None:
+            communities = CommunityUserLinkModel.find_by_user(user_id)
+            if not communities:
+                sys.exit('{} is no member of a community'.format(args.username))
+            community_id = communities[0].community_id
+        routes, _ = get_routes(get_path_values(user_id, community_id, now))
+        engines = dict(db.engines)
+
+    print('{:<90} {:>6} {:>8} {:>8} {:>8}'.format('route', 'status', 'expected', 'primary', 'replica'))
+    failures = check_routes(client, engines, headers, routes)
+    print('\nRead-your-writes window of {} s'.format(replica_routing.window))
+    failures += check_read_your_writes(client, engines, headers, community_id, now)
+
+    if failures:
+        sys.exit('{} checks failed'.format(failures))
+
+
+if __name__ == '__main__':
+    main()
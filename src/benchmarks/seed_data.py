@@ -0,0 +1,223 @@
+"""
+Fills the configured database with a reproducible synthetic dataset for load tests: users with account settings,
+communities with their car, members and open invitations, finished tours with passengers, refuels, payoffs with
+(partly settled) debts, km and time triggered tasks with instances and events. Payoffs, the ledger and the daily
+statistics are created by the same code as in production, so the derived data matches the tours and refuels.
+
+All users get the same password. Usernames are `seed-<seed>-<n>`, user 0 owns the first community.
+
+Run from the repository root against a migrated database, e.g.
+`CARBULATOR_CONFIG=... python -m src.benchmarks.seed_data --users 100 --communities 20`. Every community is committed
+separately.
+"""
+import argparse
+import datetime
+import random
+import sys
+import time
+
+from src.app import app, db
+from src.models.acount_settings import AccountSettingsModel
+from src.models.car import CarModel
+from src.models.community import CommunityModel
+from src.models.community_user_link import CommunityUserLinkModel
+from src.models.debt import DebtModel
+from src.models.event import EventModel
+from src.models.refuel import RefuelModel
+from src.models.task import TaskModel
+from src.models.task_instance import TaskInstanceModel
+from src.models.tour import TourModel
+from src.models.user import UserModel
+from src.resources.payoff_resources import create_payoff
+from src.util.bookkeeping import rebuild_community_ledger, rebuild_community_daily_statistics
+
+GAS_STATIONS = ['Aral', 'Shell', 'Esso', 'Jet', 'Total']
+
+
+def create_users(args, password_hash):
+    """
+    Creates the users and their account settings. Doesn't commit the session.
+    :return: List of the users.
+    """
+    users = [UserModel(username='seed-{}-{}'.format(args.seed, i), password=password_hash,
+                       email='seed-{}-{}@example.com'.format(args.seed, i)) for i in range(args.users)]
+    db.session.add_all(users)
+    db.session.flush()
+    db.session.add_all([AccountSettingsModel(user_id=user.id) for user in users])
+    return users
+
+
+def create_tours(args, rng: random.Random, community, members, start, end):
+    """
+    Creates finished tours with random passengers, ordered by their end time. They are not added to the session.
+    :return: List of the tours.
+    """
+    end_times = sorted(start + (end - start) * rng.random() for _ in range(args.tours))
+    km = rng.randrange(1000, 100000)
+    tours = []
+    for end_time in end_times:
+        tour_km = round(rng.uniform(2, 300), 1)
+        owner = rng.choice(members)
+        passengers = rng.sample([member for member in members if member is not owner],
+                                rng.randrange(min(4, len(members))))
+        tours.append(TourModel(owner=owner, community=community, start_km=round(km, 1), end_km=round(km + tour_km, 1),
+                               start_time=end_time - datetime.timedelta(hours=tour_km / 50), end_time=end_time,
+                               parking_position=rng.choice([None, 'Parking lot', 'Garage']),
+                               comment=rng.choice([None, 'Seeded tour']), passengers=passengers))
+        km += tour_km
+    return tours
+
+
+def create_refuels(args, rng: random.Random, community, members, start, end):
+    """
+    Creates refuels ordered by their creation time. They are not added to the session.
+    :return: List of the refuels.
+    """
+    times_created = sorted(start + (end - start) * rng.random() for _ in range(args.refuels))
+    return [RefuelModel(owner=rng.choice(members), community=community, costs=round(rng.uniform(20, 90), 2),
+                        liters=round(rng.uniform(15, 60), 2), gas_station_name=rng.choice(GAS_STATIONS),
+                        time_created=time_created) for time_created in times_created]
+
+
+def create_payoffs(args, rng: random.Random, community, tours, refuels, start, end):
+    """
+    Adds the tours and refuels to the session and creates payoffs between them at random times. Most debts of all but
+    the latest payoff are settled. Doesn't commit the session.
+    :return: Number of created payoffs.
+    """
+    payoff_times = sorted(start + (end - start) * rng.random() for _ in range(args.payoffs))
+    payoffs = []
+    for payoff_time in payoff_times + [None]:
+        db.session.add_all([t for t in tours if t.end_time <= (payoff_time or end) and t not in db.session])
+        db.session.add_all([r for r in refuels if r.time_created <= (payoff_time or end) and r not in db.session])
+        db.session.flush()
+        rebuild_community_ledger(community.id)
+        if payoff_time is None or not (TourModel.exists_finished_and_open_by_community(community.id)
+                                       or RefuelModel.exists_open_by_community(community.id)):
+            continue
+        payoff = create_payoff(community.id)
+        payoff.time_created = payoff_time
+        DebtModel.query \
+            .filter_by(payoff_id=payoff.id) \
+            .update({DebtModel.time_created: payoff_time}, synchronize_session=False)
+        payoffs.append(payoff)
+
+    for payoff in payoffs[:-1]:
+        debts = DebtModel.find_unsettled_by_payoff(payoff.id)
+        for debt in debts:
+            debt.is_settled = rng.random() < 0.9
+        payoff.is_settled = all(debt.is_settled for debt in debts)
+    rebuild_community_daily_statistics(community.id)
+    return len(payoffs)
+
+
+def create_tasks(args, rng: random.Random, community, members, km, start, end):
+    """
+    Creates recurring km and time triggered tasks with finished instances and an open instance for every task. Doesn't
+    commit the session.
+    """
+    for i in range(args.tasks):
+        owner = rng.choice(members)
+        if i % 2 == 0:
+            km_interval = rng.choice([5000, 10000, 15000, 30000])
+            task = TaskModel(owner=owner, community=community, name='Seeded km task {}'.format(i),
+                             km_interval=km_interval, km_next_instance=km + rng.randrange(1, km_interval))
+        else:
+            time_interval = datetime.timedelta(days=rng.choice([30, 90, 180, 365]))
+            task = TaskModel(owner=owner, community=community, name='Seeded time task {}'.format(i),
+                             time_interval=time_interval, time_next_instance=end + time_interval * rng.random())
+        db.session.add(task)
+        db.session.flush()
+        instances = []
+        for _ in range(rng.randrange(1, 5)):
+            time_created = start + (end - start) * rng.random()
+            time_finished = time_created + datetime.timedelta(days=rng.randrange(7))
+            instances.append(TaskInstanceModel(task_id=task.id, community_id=community.id, is_open=False,
+                                               time_created=time_created, finished_by=rng.choice(members),
+                                               time_finished=time_finished))
+        instances.append(TaskInstanceModel(task_id=task.id, community_id=community.id, is_open=True,
+                                           time_created=end - datetime.timedelta(days=rng.randrange(30))))
+        db.session.add_all(instances)
+
+
+def create_events(args, rng: random.Random, community, members, start, end):
+    """
+    Creates events in the past and within the next 60 days. Doesn't commit the session.
+    """
+    for i in range(args.events):
+        event_start = start + (end + datetime.timedelta(days=60) - start) * rng.random()
+        db.session.add(EventModel(owner=rng.choice(members), community=community, title='Seeded event {}'.format(i),
+                                  description=rng.choice([None, 'Seeded event']), start=event_start,
+                                  end=event_start + datetime.timedelta(hours=rng.randrange(1, 72))))
+
+
+def create_community(args, rng: random.Random, index, users, start, end):
+    """
+    Creates a community with all its data. Doesn't commit the session.
+    :return: Dict with the number of created tours, refuels and payoffs.
+    """
+    owner = users[index % len(users)]
+    members = [owner] + rng.sample([user for user in users if user is not owner],
+                                   min(args.members, len(users)) - 1)
+    car = CarModel(name='Seeded car {}'.format(index), make=rng.choice(['VW', 'Opel', 'Ford']),
+                   model=rng.choice(['Golf', 'Corsa', 'Fiesta']), owner=owner)
+    community = CommunityModel(name='Seeded community {}'.format(index), car=car)
+    db.session.add_all([car, community])
+    db.session.flush()
+    db.session.add_all([CommunityUserLinkModel(community_id=community.id, user_id=user.id, is_owner=user is owner,
+                                               invitation_accepted=True,
+                                               is_favourite=user is owner and index < len(users))
+                        for user in members])
+    invitees = [user for user in users if user not in members]
+    if invitees:
+        db.session.add(CommunityUserLinkModel(community_id=community.id, user_id=rng.choice(invitees).id,
+                                              is_owner=False, invitation_accepted=False))
+
+    tours = create_tours(args, rng, community, members, start, end)
+    refuels = create_refuels(args, rng, community, members, start, end)
+    number_of_payoffs = create_payoffs(args, rng, community, tours, refuels, start, end)
+    km = tours[-1].end_km if tours else 0
+    if index % 2 == 0:
+        db.session.add(TourModel(owner=owner, community=community, start_km=km,
+                                 start_time=end - datetime.timedelta(minutes=rng.randrange(10, 120))))
+    create_tasks(args, rng, community, members, km, start, end)
+    create_events(args, rng, community, members, start, end)
+    return {'tours': len(tours), 'refuels': len(refuels), 'payoffs': number_of_payoffs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--communities', type=int, default=20)
+    parser.add_argument('--members', type=int, default=6, help='members per community')
+    parser.add_argument('--tours', type=int, default=500, help='finished tours per community')
+    parser.add_argument('--refuels', type=int, default=100, help='refuels per community')
+    parser.add_argument('--payoffs', type=int, default=6, help='payoffs per community')
+    parser.add_argument('--tasks', type=int, default=10, help='tasks per community')
+    parser.add_argument('--events', type=int, default=30, help='events per community')
+    parser.add_argument('--days', type=int, default=365, help='number of past days the data is spread over')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--password', default='carbulator')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    end = datetime.datetime.utcnow().replace(microsecond=0)
+    start = end - datetime.timedelta(days=args.days)
+    started = time.perf_counter()
+    with app.app_context():
+        if UserModel.find_by_username('seed-{}-0'.format(args.seed)):
+            sys.exit('The database already contains the dataset of seed {}'.format(args.seed))
+        users = create_users(args, UserModel.generate_hash(args.password))
+        db.session.commit()
+        for index in range(args.communities):
+            created = create_community(args, rng, index, users, start, end)
+            db.session.commit()
+            print('Community {}/{}: {} tours, {} refuels, {} payoffs'.format(
+                index + 1, args.communities, created['tours'], created['refuels'], created['payoffs']))
+
+    print('Created {} users and {} communities in {:.1f} s, log in as seed-{}-0 with password {}'.format(
+        args.users, args.communities, time.perf_counter() - started, args.seed, args.password))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Checks the set based creation of time triggered task instances for randomized tasks, some of them overdue by multiple
+intervals, and times it for thousands of tasks.
+
+Run from the repository root against a migrated database, e.g.
+`CARBULATOR_CONFIG=... python -m src.benchmarks.time_triggered_tasks`. The fixture data is created in a transaction that
+is rolled back afterwards.
+"""
+import argparse
+import datetime
+import random
+import sys
+import time
+
+from src.app import app, db
+from src.models.car import CarModel
+from src.models.community import CommunityModel
+from src.models.task import TaskModel
+from src.models.task_instance import TaskInstanceModel
+from src.models.user import UserModel
+from src.resources.task_instance_resources import create_due_time_triggered_task_instances
+
+
+def create_tasks(number_of_tasks: int, rng: random.Random, now: datetime.datetime):
+    """
+    Creates a community with recurring time triggered tasks. Most of them are due, some of them by multiple intervals.
+    Doesn't commit the session.
+    :return: List of the tasks.
+    """
+    user = UserModel(username='benchmark-{}'.format(rng.getrandbits(32)), password='-', email='-')
+    car = CarModel(name='Benchmark', make='Benchmark', model='Benchmark', owner=user)
+    community = CommunityModel(name='Benchmark', car=car)
+    tasks = []
+    for i in range(number_of_tasks):
+        time_interval = datetime.timedelta(days=rng.randrange(1, 60))
+        time_next_instance = now - rng.uniform(-1, 5) * time_interval
+        tasks.append(TaskModel(owner=user, community=community, name='Benchmark {}'.format(i), is_reocurrent=True,
+                               time_interval=time_interval, time_next_instance=time_next_instance))
+    db.session.add_all([user, car, community] + tasks)
+    db.session.flush()
+    return tasks
+
+
+def check_tasks(tasks, previous_time_next_instances, now):
+    """
+    Checks that every due task got exactly one instance and was advanced by whole intervals to the first time after
+    now, and that tasks that weren't due are untouched.
+    :return: List of error messages.
+    """
+    task_ids = [task.id for task in tasks]
+    instance_counts = dict(db.session.query(TaskInstanceModel.task_id, db.func.count())
+                           .filter(TaskInstanceModel.task_id.in_(task_ids))
+                           .group_by(TaskInstanceModel.task_id)
+                           .all())
+    # Queried as columns, as the bulk update didn't change the loaded tasks
+    time_next_instances = dict(db.session.query(TaskModel.id, TaskModel.time_next_instance)
+                               .filter(TaskModel.id.in_(task_ids))
+                               .all())
+    errors = []
+    for task in tasks:
+        previous_time_next_instance = previous_time_next_instances[task.id]
+        time_next_instance = time_next_instances[task.id]
+        is_due = previous_time_next_instance <= now
+        if instance_counts.get(task.id, 0) != int(is_due):
+            errors.append('Task {} has {} instances'.format(task.id, instance_counts.get(task.id, 0)))
+        if not is_due:
+            if time_next_instance != previous_time_next_instance:
+                errors.append('Task {} was not due but advanced'.format(task.id))
+        elif not (time_next_instance - task.time_interval <= now < time_next_instance
+                  and (time_next_instance - previous_time_next_instance) % task.time_interval
+                  == datetime.timedelta(0)):
+            errors.append('Task {} was advanced to {}'.format(task.id, time_next_instance))
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    failed = False
+    print('{:>6} {:>10} {:>10} {:>14} {:>14}'.format('tasks', 'instances', 'skipped', 'first [ms]', 'second [ms]'))
+    with app.app_context():
+        try:
+            for number_of_tasks in args.tasks:
+                now = datetime.datetime.utcnow().replace(microsecond=0)
+                tasks = create_tasks(number_of_tasks, rng, now)
+                previous_time_next_instances = {task.id: task.time_next_instance for task in tasks}
+
+                started = time.perf_counter()
+                created_instances, skipped_intervals = create_due_time_triggered_task_instances(now)
+                first_duration = time.perf_counter() - started
+                started = time.perf_counter()
+                created_again, _ = create_due_time_triggered_task_instances(now)
+                second_duration = time.perf_counter() - started
+
+                errors = check_tasks(tasks, previous_time_next_instances, now)
+                if created_again:
+                    errors.append('Second run created {} instances'.format(created_again))
+                for error in errors[:10]:
+                    print(error)
+                failed = failed or bool(errors)
+                print('{:>6} {:>10} {:>10} {:>14.2f} {:>14.2f}'.format(
+                    number_of_tasks, created_instances, skipped_intervals, first_duration * 1000,
+                    second_duration * 1000))
+        finally:
+            db.session.rollback()
+
+    if failed:
+        sys.exit('Time triggered task instances were not created as expected')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+import click
+
+from src.app import db
+from src.models.community import CommunityModel
+from src.util.bookkeeping import rebuild_community_ledger, rebuild_community_daily_statistics
+
+
+def configure_cli(app):
+    @app.cli.command('rebuild-ledger')
+    @click.option('--community', 'community_id', type=int, default=None,
+                  help='Only rebuild the ledger of this community.')
+    def rebuild_ledger(community_id):
+        """
+        Rebuilds the community ledger from all finished tours and refuels.
+        """
+        community_ids = [community_id] if community_id else [c.id for c in CommunityModel.return_all()]
+        for id in community_ids:
+            rebuild_community_ledger(id)
+            db.session.commit()
+        click.echo('Rebuilt ledger of {} communities'.format(len(community_ids)))
+
+    @app.cli.command('rebuild-statistics')
+    @click.option('--community', 'community_id', type=int, default=None,
+                  help='Only rebuild the daily statistics of this community.')
+    def rebuild_statistics(community_id):
+        """
+        Rebuilds the daily community statistics from all finished tours and refuels.
+        """
+        community_ids = [community_id] if community_id else [c.id for c in CommunityModel.return_all()]
+        for id in community_ids:
+            rebuild_community_daily_statistics(id)
+            db.session.commit()
+        click.echo('Rebuilt daily statistics of {} communities'.format(len(community_ids)))
@@ -1,6 +1,14 @@
 class DefaultConfig(object):
     SQLALCHEMY_DATABASE_URI = 'postgresql://felixengelmann:@127.0.0.1/carbulator'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DATABASE_POOL_SIZE = 5
+    DATABASE_MAX_OVERFLOW = 10
+    DATABASE_POOL_TIMEOUT = 30
+    DATABASE_POOL_PRE_PING = True
+    DATABASE_POOL_RECYCLE = 1800
+    DATABASE_STATEMENT_TIMEOUT = None
+    REPLICA_DATABASE_URI = None
+    REPLICA_READ_YOUR_WRITES_WINDOW = 5
     SECRET_KEY = 'thisKeyIsNotSecretChangeIt'
     JWT_SECRET_KEY = 'thisKeyIsNotSecretChangeIt'
     JWT_BLACKLIST_ENABLED = True
@@ -12,3 +20,27 @@ class DefaultConfig(object):
     SMTP_PASSWORD = 'YOUR_SMTP_PASSWORD'
     SMTP_PORT = 'YOUR_SMTP_PORT'
     FRONTEND_HOST = 'https://example.com'
+    DEBT_SIMPLIFICATION_MODE = 'net_balance'
+    COMMUNITY_STATISTIC_MODE = 'rollup'
+    CURRENT_USER_CACHE_TTL = 0
+    REVOKED_TOKEN_REFRESH_INTERVAL = 5
+    REVOKED_TOKEN_REFRESH_OVERLAP = 60
+    REVOKED_TOKEN_REBUILD_INTERVAL = 3600
+    REVOKED_TOKEN_BLOOM_CAPACITY = 100000
+    REVOKED_TOKEN_BLOOM_ERROR_RATE = 0.001
+    REVOKED_TOKEN_LRU_SIZE = 10000
+    PAGINATION_DEFAULT_LIMIT = 50
+    PAGINATION_MAX_LIMIT = 500
+    PUBSUB_BACKEND = 'memory'
+    PUBSUB_QUEUE_SIZE = 100
+    STREAM_KEEPALIVE_INTERVAL = 15
+    STREAM_MAX_DURATION = 300
+    SCHEDULER_ENABLED = True
+    SCHEDULER_POLL_INTERVAL = 30
+    TIME_TRIGGERED_TASKS_TIME = '18:16'
+    KM_TRIGGERED_TASKS_DEFERRED = False
+    INSTRUMENTATION_ENABLED = False
+    INSTRUMENTATION_SLOW_QUERY_THRESHOLD = 0.1
+    INSTRUMENTATION_AUTH_TOKEN = None
+    METRICS_ENABLED = False
+    METRICS_AUTH_TOKEN = None
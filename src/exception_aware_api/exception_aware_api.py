@@ -2,6 +2,7 @@ from flask_restful import Api
 from jwt import ExpiredSignatureError
 
 from src.messages.messages import UNAUTHORIZED
+from src.util.instrumentation import instrumentation
 
 
 class ExceptionAwareApi(Api):
@@ -19,3 +20,10 @@ class ExceptionAwareApi(Api):
             # Did not match a custom exception, continue normally
             return super(ExceptionAwareApi, self).handle_error(e)
         return self.make_response(data, code)
+
+    @instrumentation.time_marshalling
+    def make_response(self, data, *args, **kwargs):
+        """
+        Encodes the data returned by resources with the representation of the requested mimetype.
+        """
+        return super(ExceptionAwareApi, self).make_response(data, *args, **kwargs)
@@ -0,0 +1,36 @@
+"""
+Gunicorn server hooks, use with `gunicorn -c src/gunicorn_config.py src.app:app`.
+"""
+import glob
+import os
+
+
+def on_starting(server):
+    """
+    Removes the metric files of earlier runs from the Prometheus multiprocess directory.
+    """
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        for path in glob.glob(os.path.join(directory, '*.db')):
+            os.remove(path)
+
+
+def post_fork(server, worker):
+    """
+    Drops the database connections a preloaded app opened in the master process, so workers don't share connections.
+    They are left open for the master, the worker opens its own connections when needed.
+    """
+    if server.cfg.preload_app:
+        from src.app import app, db
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    """
+    Marks the metric files of an exited worker as dead, so its gauges aren't reported anymore.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -2,6 +2,9 @@
 INTERNAL_SERVER_ERROR = 'INTERNAL_SERVER_ERROR'
 UNAUTHORIZED_TO_ACCESS_RESOURCE = 'UNAUTHORIZED_TO_ACCESS_RESOURCE'
 UNAUTHORIZED = 'UNAUTHORIZED'
+INVALID_PAGINATION_CURSOR = 'INVALID_PAGINATION_CURSOR'
+INVALID_PAGINATION_LIMIT = 'INVALID_PAGINATION_LIMIT'
+INVALID_FIELD_SELECTION = 'INVALID_FIELD_SELECTION'
 
 # User messages
 USER_ALREADY_EXISTS = 'USER_ALREADY_EXISTS'
@@ -94,3 +97,7 @@ END_MUST_BE_AFTER_START = 'END_MUST_BE_AFTER_START'
 EVENT_DOESNT_EXIST = 'EVENT_DOESNT_EXIST'
 EVENT_DELETED = 'EVENT_DELETED'
 TO_MUST_BE_AFTER_FROM = 'TO_MUST_BE_AFTER_FROM'
+
+# Instrumentation messages
+INSTRUMENTATION_DISABLED = 'INSTRUMENTATION_DISABLED'
+METRICS_DISABLED = 'METRICS_DISABLED'
@@ -11,7 +11,7 @@ class AccountSettingsModel(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     time_created = db.Column(db.DateTime(), default=datetime.datetime.utcnow)
     time_updated = db.Column(db.DateTime(), onupdate=datetime.datetime.utcnow)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     auto_load_parking_place_gps_location = db.Column(db.Boolean, default=False)
     parking_place_required = db.Column(db.Boolean, default=False)
 
@@ -1,6 +1,7 @@
 import datetime
 
 from flask_restful import fields
+from sqlalchemy.orm import joinedload
 
 from src.app import db
 from src.exceptions.no_data import NoData
@@ -16,7 +17,7 @@ class CarModel(db.Model):
     model = db.Column(db.String(120), nullable=False)
     time_created = db.Column(db.DateTime(), default=datetime.datetime.utcnow)
     time_updated = db.Column(db.DateTime(), onupdate=datetime.datetime.utcnow)
-    owner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    owner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     owner = db.relationship('UserModel', back_populates='cars')
 
     def persist(self):
@@ -35,6 +36,13 @@ class CarModel(db.Model):
             'owner': fields.Nested(UserModel.get_marshaller())
         }
 
+    @staticmethod
+    def get_load_options():
+        """
+        Loader options that load everything the marshaller needs along with the cars.
+        """
+        return [joinedload(CarModel.owner)]
+
     @classmethod
     def find_by_id(cls, id):
         return cls.query.filter_by(id=id).first()
@@ -44,8 +52,8 @@ class CarModel(db.Model):
         return CarModel.query.all()
 
     @classmethod
-    def return_all_for_user(cls, user_id):
-        return CarModel.query.filter(cls.owner_id == user_id).all()
+    def return_all_for_user(cls, user_id, options=()):
+        return CarModel.query.options(*options).filter(cls.owner_id == user_id).all()
 
     @classmethod
     def delete_all(cls):
@@ -1,6 +1,7 @@
 import datetime
 
 from flask_restful import fields
+from sqlalchemy.orm import joinedload, selectinload
 
 from src.app import db
 from src.exceptions.no_data import NoData
@@ -20,6 +21,7 @@ class CommunityModel(db.Model):
                                           'CommunityUserLinkModel.invitation_accepted == True)')
     car_id = db.Column(db.Integer, db.ForeignKey('cars.id'), unique=True)
     car = db.relationship("CarModel", backref=db.backref("community", uselist=False))
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     is_favourite = None
 
     def persist(self):
@@ -37,6 +39,16 @@ class CommunityModel(db.Model):
             'car': fields.Nested(CarModel.get_marshaller())
         }
 
+    @staticmethod
+    def get_load_options():
+        """
+        Loader options that load everything the (detailed) marshaller needs along with the communities.
+        """
+        return [
+            selectinload(CommunityModel.users),
+            joinedload(CommunityModel.car).options(*CarModel.get_load_options())
+        ]
+
     @staticmethod
     def get_detailed_marshaller():
         return {
@@ -63,6 +75,19 @@ class CommunityModel(db.Model):
     def find_by_id(cls, id):
         return cls.query.filter_by(id=id).first()
 
+    @classmethod
+    def exists_by_id(cls, id):
+        return db.session.query(cls.query.filter_by(id=id).exists()).scalar()
+
+    @classmethod
+    def find_version(cls, id):
+        """
+        Returns the change version of the community, which is incremented on every write to its data.
+        :param id: ID of the community.
+        :return: Version or None if the community doesn't exist.
+        """
+        return db.session.query(cls.version).filter_by(id=id).scalar()
+
     @classmethod
     def return_all(cls):
         return CommunityModel.query.all()
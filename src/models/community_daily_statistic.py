@@ -0,0 +1,65 @@
+from sqlalchemy import func
+
+from src.app import db
+from src.util.database import get_upsert_insert
+
+
+class CommunityDailyStatisticModel(db.Model):
+    """
+    Km and cost aggregates per user, community and day. Tours are booked on the day they ended, refuels on the day
+    they were created. Days are the dates of the stored (naive) timestamps.
+    """
+    __tablename__ = 'community_daily_statistics'
+    __table_args__ = (
+        db.Index('ix_community_daily_statistics_community_id_day', 'community_id', 'day'),
+    )
+
+    community_id = db.Column(db.Integer, db.ForeignKey('communities.id', ondelete='CASCADE'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date(), primary_key=True)
+    km = db.Column(db.DECIMAL(precision=12, scale=1), nullable=False, default=0)
+    km_accounted_for_passengers = db.Column(db.DECIMAL(precision=32, scale=20), nullable=False, default=0)
+    costs = db.Column(db.DECIMAL(precision=12, scale=2), nullable=False, default=0)
+
+    @classmethod
+    def book(cls, community_id, user_id, day, km=0, km_accounted_for_passengers=0, costs=0):
+        """
+        Adds the given amounts to the entry of the user in the community on the given day. The entry is created if it
+        doesn't exist yet, in the same statement, so concurrent first bookings of the day don't conflict. Doesn't
+        commit the session.
+        """
+        insert = get_upsert_insert(db.engine.dialect)(cls).values(
+            community_id=community_id,
+            user_id=user_id,
+            day=day,
+            km=km,
+            km_accounted_for_passengers=km_accounted_for_passengers,
+            costs=costs
+        )
+        values = {column: getattr(cls, column) + getattr(insert.excluded, column)
+                  for column in ['km', 'km_accounted_for_passengers', 'costs']}
+        db.session.execute(insert.on_conflict_do_update(index_elements=['community_id', 'user_id', 'day'],
+                                                        set_=values))
+
+    @classmethod
+    def find_totals_by_community(cls, community_id, from_day, to_day):
+        """
+        Sums up the entries of the community per user.
+        :param community_id: Community to sum up the entries for.
+        :param from_day: First day to include.
+        :param to_day: First day to exclude.
+        :return: List of (user_id, km, km_accounted_for_passengers, costs) rows.
+        """
+        return db.session.query(cls.user_id,
+                                func.sum(cls.km).label('km'),
+                                func.sum(cls.km_accounted_for_passengers).label('km_accounted_for_passengers'),
+                                func.sum(cls.costs).label('costs')) \
+            .filter(cls.community_id == community_id) \
+            .filter(cls.day >= from_day) \
+            .filter(cls.day < to_day) \
+            .group_by(cls.user_id) \
+            .all()
+
+    @classmethod
+    def delete_by_community(cls, community_id):
+        cls.query.filter_by(community_id=community_id).delete(synchronize_session=False)
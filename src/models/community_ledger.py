@@ -0,0 +1,66 @@
+import datetime
+
+from src.app import db
+from src.util.database import get_upsert_insert
+
+
+class CommunityLedgerModel(db.Model):
+    """
+    Running km and cost aggregates per user and community. The `open_*` columns only contain tours and refuels that
+    are not part of a payoff yet.
+    """
+    __tablename__ = 'community_ledger'
+
+    community_id = db.Column(db.Integer, db.ForeignKey('communities.id', ondelete='CASCADE'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    user = db.relationship('UserModel')
+    km = db.Column(db.DECIMAL(precision=12, scale=1), nullable=False, default=0)
+    km_accounted_for_passengers = db.Column(db.Float, nullable=False, default=0)
+    costs = db.Column(db.DECIMAL(precision=12, scale=2), nullable=False, default=0)
+    open_km = db.Column(db.DECIMAL(precision=12, scale=1), nullable=False, default=0)
+    open_km_accounted_for_passengers = db.Column(db.Float, nullable=False, default=0)
+    open_costs = db.Column(db.DECIMAL(precision=12, scale=2), nullable=False, default=0)
+    time_created = db.Column(db.DateTime(), default=datetime.datetime.utcnow)
+    time_updated = db.Column(db.DateTime(), onupdate=datetime.datetime.utcnow)
+
+    @classmethod
+    def book(cls, community_id, user_id, km=0, km_accounted_for_passengers=0, costs=0, is_open=True):
+        """
+        Adds the given amounts to the ledger entry of the user in the community. The entry is created if it doesn't
+        exist yet, in the same statement, so concurrent first bookings don't conflict. Doesn't commit the session.
+        """
+        insert = get_upsert_insert(db.engine.dialect)(cls).values(
+            community_id=community_id,
+            user_id=user_id,
+            km=km,
+            km_accounted_for_passengers=km_accounted_for_passengers,
+            costs=costs,
+            open_km=km if is_open else 0,
+            open_km_accounted_for_passengers=km_accounted_for_passengers if is_open else 0,
+            open_costs=costs if is_open else 0
+        )
+        booked = ['km', 'km_accounted_for_passengers', 'costs']
+        if is_open:
+            booked += ['open_km', 'open_km_accounted_for_passengers', 'open_costs']
+        values = {column: getattr(cls, column) + getattr(insert.excluded, column) for column in booked}
+        # onupdate defaults are not applied to the update of an upsert
+        values['time_updated'] = datetime.datetime.utcnow()
+        db.session.execute(insert.on_conflict_do_update(index_elements=['community_id', 'user_id'], set_=values))
+
+    @classmethod
+    def close_by_community(cls, community_id):
+        """
+        Resets the open aggregates of the community after a payoff. Doesn't commit the session.
+        """
+        cls.query \
+            .filter_by(community_id=community_id) \
+            .update({cls.open_km: 0, cls.open_km_accounted_for_passengers: 0, cls.open_costs: 0},
+                    synchronize_session=False)
+
+    @classmethod
+    def find_by_community(cls, community_id):
+        return cls.query.filter_by(community_id=community_id).all()
+
+    @classmethod
+    def delete_by_community(cls, community_id):
+        cls.query.filter_by(community_id=community_id).delete(synchronize_session=False)
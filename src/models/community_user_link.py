@@ -1,16 +1,18 @@
 import datetime
 
 from flask_restful import fields
+from sqlalchemy.orm import joinedload
 
 from src.app import db
 from src.models.community import CommunityModel
+from src.models.user import UserModel
 
 
 class CommunityUserLinkModel(db.Model):
     __tablename__ = 'community_user_link'
 
     community_id = db.Column(db.Integer, db.ForeignKey('communities.id'), primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True, index=True)
     is_owner = db.Column(db.Boolean, default=True)
     invitation_accepted = db.Column(db.Boolean, default=True)
     community = db.relationship('CommunityModel')
@@ -34,25 +36,59 @@ class CommunityUserLinkModel(db.Model):
             'time_updated': fields.DateTime,
         }
 
+    @staticmethod
+    def get_load_options():
+        """
+        Loader options that load everything the marshaller needs along with the links.
+        """
+        return [joinedload(CommunityUserLinkModel.community).options(*CommunityModel.get_load_options())]
+
     @classmethod
     def find_by_user_and_community(cls, user_id, community_id):
         return cls.query.filter_by(user_id=user_id, community_id=community_id).first()
 
+    @classmethod
+    def exists_member(cls, user_id, community_id, is_owner=False):
+        """
+        Checks if the user is an accepted member of the community. Uses the primary key index only.
+        :param user_id: User to check.
+        :param community_id: Community to check.
+        :param is_owner: Additionally require the user to be an owner of the community.
+        :return: True if the user is a member.
+        """
+        query = cls.query.filter_by(user_id=user_id, community_id=community_id, invitation_accepted=True)
+        if is_owner:
+            query = query.filter_by(is_owner=True)
+        return db.session.query(query.exists()).scalar()
+
+    @classmethod
+    def find_members_by_user_ids(cls, community_id, user_ids):
+        """
+        Returns the users with the given ids that are accepted members of the community.
+        :param community_id: Community to check.
+        :param user_ids: Ids of the users to load.
+        :return: List of users.
+        """
+        return UserModel.query \
+            .join(cls, cls.user_id == UserModel.id) \
+            .filter(cls.community_id == community_id, cls.invitation_accepted == True, UserModel.id.in_(user_ids)) \
+            .all()
+
     @classmethod
     def find_favourite_by_user(cls, user_id):
         return cls.query.filter_by(user_id=user_id, is_favourite=True).first()
 
     @classmethod
-    def find_by_user(cls, user_id):
-        return cls.query.filter_by(user_id=user_id).all()
+    def find_by_user(cls, user_id, options=()):
+        return cls.query.options(*options).filter_by(user_id=user_id).all()
 
     @classmethod
     def find_by_community(cls, community_id):
         return cls.query.filter_by(community_id=community_id).all()
 
     @classmethod
-    def find_open_invitations_by_user(cls, user_id):
-        return cls.query.filter_by(user_id=user_id, invitation_accepted=False).all()
+    def find_open_invitations_by_user(cls, user_id, options=()):
+        return cls.query.options(*options).filter_by(user_id=user_id, invitation_accepted=False).all()
 
     @classmethod
     def find_open_invitations_by_community(cls, community_id):
@@ -1,13 +1,22 @@
 import datetime
 
 from flask_restful import fields
+from sqlalchemy import func, case
+from sqlalchemy.orm import joinedload
 
 from src.app import db
 from src.models.user import UserModel
+from src.util.pagination import paginate
 
 
 class DebtModel(db.Model):
     __tablename__ = 'debts'
+    __table_args__ = (
+        db.Index('ix_debts_community_id_is_settled_time_created_id', 'community_id', 'is_settled', 'time_created',
+                 'id'),
+        db.Index('ix_debts_debtee_id_is_settled', 'debtee_id', 'is_settled'),
+        db.Index('ix_debts_recepient_id_is_settled', 'recepient_id', 'is_settled'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     is_settled = db.Column(db.Boolean, default=False)
@@ -18,13 +27,17 @@ class DebtModel(db.Model):
     debtee = db.relationship('UserModel', foreign_keys=[debtee_id])
     recepient_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     recepient = db.relationship('UserModel', foreign_keys=[recepient_id])
-    payoff_id = db.Column(db.Integer, db.ForeignKey('payoffs.id'), nullable=False)
+    payoff_id = db.Column(db.Integer, db.ForeignKey('payoffs.id'), nullable=False, index=True)
     community_id = db.Column(db.Integer, db.ForeignKey('communities.id'), nullable=False)
 
     def persist(self):
         db.session.add(self)
         db.session.commit()
 
+    @classmethod
+    def bulk_insert(cls, debts):
+        db.session.bulk_insert_mappings(cls, debts)
+
     @staticmethod
     def get_marshaller():
         return {
@@ -37,6 +50,13 @@ class DebtModel(db.Model):
             'amount': fields.Float
         }
 
+    @staticmethod
+    def get_load_options():
+        """
+        Loader options that load everything the marshaller needs along with the debts.
+        """
+        return [joinedload(DebtModel.debtee), joinedload(DebtModel.recepient)]
+
     @classmethod
     def find_by_id(cls, id):
         return cls.query.filter_by(id=id).first()
@@ -46,13 +66,40 @@ class DebtModel(db.Model):
         return cls.query.filter_by(community_id=community_id).all()
 
     @classmethod
-    def find_unsettled_by_community(cls, community_id):
-        return cls.query.filter_by(community_id=community_id, is_settled=False).all()
+    def find_amount_sums_by_community(cls, community_id):
+        return db.session.query(cls.debtee_id, cls.recepient_id, func.sum(cls.amount).label('amount')) \
+            .filter_by(community_id=community_id) \
+            .group_by(cls.debtee_id, cls.recepient_id) \
+            .all()
+
+    @classmethod
+    def find_totals_by_payoffs(cls, payoff_ids):
+        """
+        Aggregates the debts of the given payoffs.
+        :param payoff_ids: IDs of the payoffs.
+        :return: List of (payoff_id, number_of_debts, number_of_unsettled_debts, debt_amount) rows.
+        """
+        return db.session \
+            .query(cls.payoff_id,
+                   func.count(cls.id).label('number_of_debts'),
+                   func.sum(case((cls.is_settled == False, 1), else_=0)).label('number_of_unsettled_debts'),
+                   func.sum(cls.amount).label('debt_amount')) \
+            .filter(cls.payoff_id.in_(payoff_ids)) \
+            .group_by(cls.payoff_id) \
+            .all()
+
+    @classmethod
+    def find_unsettled_by_community(cls, community_id, options=(), limit=None, cursor=None):
+        query = cls.query.options(*options).filter_by(community_id=community_id, is_settled=False)
+        return paginate(query, cls.time_created, cls.id, limit, cursor).all()
 
     @classmethod
-    def find_unsettled_by_user(cls, user_id):
-        return cls.query.filter(((DebtModel.recepient_id == user_id) | (DebtModel.debtee_id == user_id)),
-                                DebtModel.is_settled == False).all()
+    def find_unsettled_by_user(cls, user_id, options=()):
+        return cls.query \
+            .options(*options) \
+            .filter(((DebtModel.recepient_id == user_id) | (DebtModel.debtee_id == user_id)),
+                    DebtModel.is_settled == False) \
+            .all()
 
     @classmethod
     def find_unsettled_by_payoff(cls, payoff_id):
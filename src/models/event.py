@@ -1,6 +1,7 @@
 import datetime
 
 from flask_restful import fields
+from sqlalchemy.orm import joinedload
 
 from src.app import db
 from src.exceptions.no_data import NoData
@@ -9,6 +10,9 @@ from src.models.user import UserModel
 
 class EventModel(db.Model):
     __tablename__ = 'events'
+    __table_args__ = (
+        db.Index('ix_events_community_id_start_end', 'community_id', 'start', 'end'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     time_created = db.Column(db.DateTime(), default=datetime.datetime.utcnow)
@@ -39,6 +43,13 @@ class EventModel(db.Model):
             'end': fields.DateTime,
         }
 
+    @staticmethod
+    def get_load_options():
+        """
+        Loader options that load everything the marshaller needs along with the events.
+        """
+        return [joinedload(EventModel.owner)]
+
     @classmethod
     def delete_by_id(cls, event_id):
         event = db.session.query(cls).filter(cls.id == event_id).first()
@@ -53,11 +64,11 @@ class EventModel(db.Model):
         return cls.query.filter_by(id=id).first()
 
     @classmethod
-    def find_by_community(cls, community_id, from_datetime, to_datetime):
-        return cls.query.filter_by(community_id=community_id). \
+    def find_by_community(cls, community_id, from_datetime, to_datetime, options=()):
+        return cls.query.options(*options).filter_by(community_id=community_id). \
             filter(EventModel.end >= from_datetime, EventModel.start <= to_datetime).all()
 
     @classmethod
-    def find_next_n_by_community(cls, community_id, n):
-        return cls.query.filter_by(community_id=community_id). \
+    def find_next_n_by_community(cls, community_id, n, options=()):
+        return cls.query.options(*options).filter_by(community_id=community_id). \
             filter(EventModel.end >= datetime.datetime.utcnow()).order_by(EventModel.start.asc()).limit(n).all()
@@ -2,15 +2,20 @@ import datetime
 
 from flask_restful import fields
 from sqlalchemy import desc
+from sqlalchemy.orm import selectinload
 
 from src.app import db
 from src.models.debt import DebtModel
 from src.models.refuel import RefuelModel
 from src.models.tour import TourModel
+from src.util.pagination import paginate
 
 
 class PayoffModel(db.Model):
     __tablename__ = 'payoffs'
+    __table_args__ = (
+        db.Index('ix_payoffs_community_id_time_created_id', 'community_id', 'time_created', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     is_settled = db.Column(db.Boolean, default=False)
@@ -20,6 +25,13 @@ class PayoffModel(db.Model):
     refuels = db.relationship("RefuelModel")
     tours = db.relationship("TourModel")
     community_id = db.Column(db.Integer, db.ForeignKey('communities.id'), nullable=False)
+    number_of_debts = None
+    number_of_unsettled_debts = None
+    debt_amount = None
+    number_of_tours = None
+    km = None
+    number_of_refuels = None
+    costs = None
 
     def persist(self):
         db.session.add(self)
@@ -37,13 +49,72 @@ class PayoffModel(db.Model):
             'is_settled': fields.Boolean
         }
 
+    @staticmethod
+    def get_summary_marshaller():
+        return {
+            'id': fields.Integer,
+            'time_created': fields.DateTime,
+            'time_updated': fields.DateTime,
+            'is_settled': fields.Boolean,
+            'number_of_debts': fields.Integer,
+            'number_of_unsettled_debts': fields.Integer,
+            'debt_amount': fields.Float,
+            'number_of_tours': fields.Integer,
+            'km': fields.Float,
+            'number_of_refuels': fields.Integer,
+            'costs': fields.Float
+        }
+
+    @staticmethod
+    def get_load_options():
+        """
+        Loader options that load everything the marshaller needs along with the payoffs.
+        """
+        return [
+            selectinload(PayoffModel.debts).options(*DebtModel.get_load_options()),
+            selectinload(PayoffModel.tours).options(*TourModel.get_load_options()),
+            selectinload(PayoffModel.refuels).options(*RefuelModel.get_load_options())
+        ]
+
+    @classmethod
+    def find_by_id(cls, id, options=()):
+        return cls.query.options(*options).filter_by(id=id).first()
+
     @classmethod
-    def find_by_id(cls, id):
-        return cls.query.filter_by(id=id).first()
+    def find_by_community(cls, community_id, options=(), limit=None, cursor=None):
+        query = cls.query.options(*options).filter_by(community_id=community_id)
+        return paginate(query, cls.time_created, cls.id, limit, cursor).all()
 
     @classmethod
-    def find_by_community(cls, community_id):
-        return cls.query.filter_by(community_id=community_id).all()
+    def find_summaries_by_community(cls, community_id, limit=None, cursor=None):
+        """
+        Returns the payoffs of the community with the debt, tour and refuel totals of the summary marshaller. The
+        totals are aggregated in SQL, no debts, tours or refuels are loaded.
+        :param community_id: Community to find the payoffs for.
+        :param limit: Page size.
+        :param cursor: Decoded cursor of the previous page.
+        :return: List of payoffs.
+        """
+        payoffs = paginate(cls.query.filter_by(community_id=community_id), cls.time_created, cls.id, limit,
+                           cursor).all()
+        payoff_ids = [p.id for p in payoffs]
+        debt_totals = {t.payoff_id: t for t in DebtModel.find_totals_by_payoffs(payoff_ids)}
+        tour_totals = {t.payoff_id: t for t in TourModel.find_totals_by_payoffs(payoff_ids)}
+        refuel_totals = {t.payoff_id: t for t in RefuelModel.find_totals_by_payoffs(payoff_ids)}
+
+        for payoff in payoffs:
+            debt_total = debt_totals.get(payoff.id)
+            tour_total = tour_totals.get(payoff.id)
+            refuel_total = refuel_totals.get(payoff.id)
+            payoff.number_of_debts = debt_total.number_of_debts if debt_total else 0
+            payoff.number_of_unsettled_debts = debt_total.number_of_unsettled_debts if debt_total else 0
+            payoff.debt_amount = debt_total.debt_amount if debt_total else 0
+            payoff.number_of_tours = tour_total.number_of_tours if tour_total else 0
+            payoff.km = tour_total.km if tour_total else 0
+            payoff.number_of_refuels = refuel_total.number_of_refuels if refuel_total else 0
+            payoff.costs = refuel_total.costs if refuel_total else 0
+
+        return payoffs
 
     @classmethod
     def find_latest_by_community(cls, community_id):
@@ -1,14 +1,21 @@
 import datetime
 
 from flask_restful import fields
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 
 from src.app import db
 from src.exceptions.no_data import NoData
 from src.models.user import UserModel
+from src.util.pagination import paginate
 
 
 class RefuelModel(db.Model):
     __tablename__ = 'refuels'
+    __table_args__ = (
+        db.Index('ix_refuels_community_id_time_created_id', 'community_id', 'time_created', 'id'),
+        db.Index('ix_refuels_owner_id_time_created_id', 'owner_id', 'time_created', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     costs = db.Column(db.DECIMAL(10,2), nullable=False)
@@ -20,7 +27,7 @@ class RefuelModel(db.Model):
     owner = db.relationship('UserModel')
     community_id = db.Column(db.Integer, db.ForeignKey('communities.id'), nullable=False)
     community = db.relationship('CommunityModel')
-    payoff_id = db.Column(db.Integer, db.ForeignKey('payoffs.id'))
+    payoff_id = db.Column(db.Integer, db.ForeignKey('payoffs.id'), index=True)
     is_open = db.Column(db.Boolean, default=True)
 
     def persist(self):
@@ -41,6 +48,13 @@ class RefuelModel(db.Model):
             'owner': fields.Nested(UserModel.get_marshaller())
         }
 
+    @staticmethod
+    def get_load_options():
+        """
+        Loader options that load everything the marshaller needs along with the refuels.
+        """
+        return [joinedload(RefuelModel.owner)]
+
     @classmethod
     def delete_by_id(cls, id):
         refuel = db.session.query(cls).filter(cls.id == id).first()
@@ -55,13 +69,76 @@ class RefuelModel(db.Model):
         return cls.query.filter_by(id=id).first()
 
     @classmethod
-    def find_by_community(cls, community_id):
-        return cls.query.filter_by(community_id=community_id).order_by(RefuelModel.time_created.desc()).all()
+    def find_by_community(cls, community_id, options=(), limit=None, cursor=None):
+        query = cls.query.options(*options).filter_by(community_id=community_id)
+        return paginate(query, cls.time_created, cls.id, limit, cursor).all()
+
+    @classmethod
+    def find_by_community_and_time_created(cls, community_id, from_time, to_time, include_to_time=True):
+        """
+        Returns the refuels of the community that were created in the given interval.
+        :param from_time: Start of the interval (inclusive).
+        :param to_time: End of the interval.
+        :param include_to_time: Include refuels that were created exactly at the end of the interval.
+        """
+        return cls.query \
+            .filter_by(community_id=community_id) \
+            .filter(cls.time_created >= from_time) \
+            .filter(cls.time_created <= to_time if include_to_time else cls.time_created < to_time) \
+            .all()
+
+    @classmethod
+    def find_cost_totals_by_community_and_time_created(cls, community_id, from_time, to_time, include_to_time=True):
+        """
+        Sums up the costs of the refuels of the community that were created in the given interval per user.
+        :param from_time: Start of the interval (inclusive).
+        :param to_time: End of the interval.
+        :param include_to_time: Include refuels that were created exactly at the end of the interval.
+        :return: List of (owner_id, costs) rows.
+        """
+        costs = func.sum(cls.costs, type_=db.DECIMAL(precision=12, scale=2)).label('costs')
+        return db.session.query(cls.owner_id, costs) \
+            .filter(cls.community_id == community_id) \
+            .filter(cls.time_created >= from_time) \
+            .filter(cls.time_created <= to_time if include_to_time else cls.time_created < to_time) \
+            .group_by(cls.owner_id) \
+            .all()
+
+    @classmethod
+    def find_costs_by_community(cls, community_id):
+        return db.session.query(cls.owner_id, cls.costs, cls.is_open, cls.time_created) \
+            .filter_by(community_id=community_id) \
+            .all()
 
     @classmethod
     def find_open_by_community(cls, community_id):
         return cls.query.filter_by(community_id=community_id, is_open=True).all()
 
     @classmethod
-    def find_by_user(cls, user_id):
-        return cls.query.filter_by(owner_id=user_id).all()
+    def exists_open_by_community(cls, community_id):
+        return db.session.query(cls.query.filter_by(community_id=community_id, is_open=True).exists()).scalar()
+
+    @classmethod
+    def close_open_by_community(cls, community_id, payoff_id):
+        cls.query \
+            .filter_by(community_id=community_id, is_open=True) \
+            .update({cls.is_open: False, cls.payoff_id: payoff_id}, synchronize_session=False)
+
+    @classmethod
+    def find_totals_by_payoffs(cls, payoff_ids):
+        """
+        Aggregates the refuels of the given payoffs.
+        :param payoff_ids: IDs of the payoffs.
+        :return: List of (payoff_id, number_of_refuels, costs) rows.
+        """
+        return db.session.query(cls.payoff_id,
+                                func.count(cls.id).label('number_of_refuels'),
+                                func.sum(cls.costs).label('costs')) \
+            .filter(cls.payoff_id.in_(payoff_ids)) \
+            .group_by(cls.payoff_id) \
+            .all()
+
+    @classmethod
+    def find_by_user(cls, user_id, options=(), limit=None, cursor=None):
+        query = cls.query.options(*options).filter_by(owner_id=user_id)
+        return paginate(query, cls.time_created, cls.id, limit, cursor).all()
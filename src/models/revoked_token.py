@@ -4,7 +4,10 @@ from src.app import db
 class RevokedTokenModel(db.Model):
     __tablename__ = 'revoked_tokens'
     id = db.Column(db.Integer, primary_key=True)
-    jti = db.Column(db.String(120))
+    jti = db.Column(db.String(120), unique=True, index=True)
+    time_expires = db.Column(db.DateTime(), index=True)
+    # Set by the database, so the refresh of the revoked token store compares times of the same clock
+    time_created = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), nullable=False, index=True)
 
     def persist(self):
         db.session.add(self)
@@ -14,3 +17,26 @@ class RevokedTokenModel(db.Model):
     def is_jti_blacklisted(cls, jti):
         query = cls.query.filter_by(jti=jti).first()
         return bool(query)
+
+    @classmethod
+    def find_jtis_since(cls, time):
+        """
+        Returns creation time and jti of all tokens that were revoked since the given time.
+        :param time: Creation time to start from, None for all tokens.
+        :return: List of (time_created, jti) rows.
+        """
+        query = db.session.query(cls.time_created, cls.jti)
+        if time is not None:
+            query = query.filter(cls.time_created >= time)
+        return query.all()
+
+    @classmethod
+    def delete_expired(cls, now):
+        """
+        Deletes all revoked tokens that are expired anyways. Tokens without expiry date are kept.
+        :param now: Current UTC time.
+        :return: Number of deleted tokens.
+        """
+        deleted_rows = cls.query.filter(cls.time_expires < now).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted_rows
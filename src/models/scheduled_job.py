@@ -0,0 +1,68 @@
+from src.app import db
+
+
+class ScheduledJobModel(db.Model):
+    """
+    Run state of a job of the scheduler. The jobs themselves are defined in code, rows are created when a job is seen
+    the first time.
+    """
+    __tablename__ = 'scheduled_jobs'
+
+    name = db.Column(db.String(120), primary_key=True)
+    next_run_time = db.Column(db.DateTime(), nullable=False)
+    last_run_time = db.Column(db.DateTime())
+    last_run_duration = db.Column(db.Float)
+    last_error = db.Column(db.Text)
+    last_result = db.Column(db.Text)
+
+    def persist(self):
+        db.session.add(self)
+        db.session.commit()
+
+    @classmethod
+    def find_all(cls):
+        return cls.query.all()
+
+    @classmethod
+    def find_due(cls, now):
+        """
+        Returns all jobs whose next run time has been reached.
+        :param now: Current UTC time.
+        :return: List of jobs ordered by next run time.
+        """
+        return cls.query \
+            .filter(cls.next_run_time <= now) \
+            .order_by(cls.next_run_time) \
+            .all()
+
+    @classmethod
+    def claim(cls, name, next_run_time, new_next_run_time) -> bool:
+        """
+        Moves the next run time of a job forward if it wasn't changed in the meantime, so every run is claimed only
+        once even if multiple schedulers see the job as due. Commits the session.
+        :param name: Name of the job.
+        :param next_run_time: Next run time the job was found due with.
+        :param new_next_run_time: Time of the run after the claimed one.
+        :return: True if the run was claimed.
+        """
+        updated_rows = cls.query \
+            .filter_by(name=name, next_run_time=next_run_time) \
+            .update({cls.next_run_time: new_next_run_time}, synchronize_session=False)
+        db.session.commit()
+        return updated_rows == 1
+
+    @classmethod
+    def finish(cls, name, run_time, duration, error=None, result=None):
+        """
+        Stores the result of a run. Commits the session.
+        :param name: Name of the job.
+        :param run_time: UTC time the run was started.
+        :param duration: Duration of the run in seconds.
+        :param error: Traceback if the run failed.
+        :param result: Serialized return value of the job.
+        """
+        cls.query \
+            .filter_by(name=name) \
+            .update({cls.last_run_time: run_time, cls.last_run_duration: duration, cls.last_error: error,
+                     cls.last_result: result}, synchronize_session=False)
+        db.session.commit()
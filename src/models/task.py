@@ -1,6 +1,8 @@
 import datetime
 
 from flask_restful import fields
+from sqlalchemy import update
+from sqlalchemy.orm import joinedload
 
 from src.app import db
 from src.exceptions.no_data import NoData
@@ -11,6 +13,9 @@ from src.models.user import UserModel
 
 class TaskModel(db.Model):
     __tablename__ = 'tasks'
+    __table_args__ = (
+        db.Index('ix_tasks_community_id_km_next_instance', 'community_id', 'km_next_instance'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     time_created = db.Column(db.DateTime(), default=datetime.datetime.utcnow)
@@ -22,7 +27,7 @@ class TaskModel(db.Model):
     km_interval = db.Column(db.Integer, nullable=True)
     km_next_instance = db.Column(db.DECIMAL(precision=10, scale=1), nullable=True)
     time_interval = db.Column(db.Interval, nullable=True)
-    time_next_instance = db.Column(db.DateTime(), nullable=True)
+    time_next_instance = db.Column(db.DateTime(), nullable=True, index=True)
     name = db.Column(db.String(120))
     description = db.Column(db.String(120))
     instances = db.relationship("TaskInstanceModel", cascade="all, delete")
@@ -50,6 +55,16 @@ class TaskModel(db.Model):
             'is_reocurrent': fields.Boolean
         }
 
+    @staticmethod
+    def get_load_options():
+        """
+        Loader options that load everything the marshaller needs along with the tasks.
+        """
+        return [
+            joinedload(TaskModel.owner),
+            joinedload(TaskModel.community).options(*CommunityModel.get_load_options())
+        ]
+
     @classmethod
     def delete_by_id(cls, task_id):
         task = db.session.query(cls).filter(cls.id == task_id).first()
@@ -72,8 +87,63 @@ class TaskModel(db.Model):
             .all()
 
     @classmethod
-    def find_by_community(cls, community_id):
+    def find_by_community(cls, community_id, options=()):
         return cls.query \
+            .options(*options) \
             .filter_by(community_id=community_id) \
             .filter_by(is_reocurrent=True) \
             .all()
+
+    @classmethod
+    def find_due_time_triggered(cls, now):
+        """
+        Selects the recurring time triggered tasks whose next instance is due and locks them until the end of the
+        transaction.
+        :param now: Current UTC time.
+        :return: List of (id, community_id, time_interval, time_next_instance) rows.
+        """
+        return db.session.query(cls.id, cls.community_id, cls.time_interval, cls.time_next_instance) \
+            .filter(cls.time_next_instance <= now) \
+            .filter(cls.time_interval > datetime.timedelta(0)) \
+            .filter(cls.is_reocurrent.is_(True)) \
+            .order_by(cls.time_next_instance, cls.id) \
+            .with_for_update() \
+            .all()
+
+    @classmethod
+    def find_due_km_triggered(cls, community_id, km):
+        """
+        Selects the recurring km triggered tasks of the community whose next instance is due at the given km clock and
+        locks them until the end of the transaction.
+        :param community_id: Community to select the tasks of.
+        :param km: Current km clock.
+        :return: List of (id, km_interval, km_next_instance) rows.
+        """
+        return db.session.query(cls.id, cls.km_interval, cls.km_next_instance) \
+            .filter(cls.community_id == community_id) \
+            .filter(cls.km_next_instance <= km) \
+            .filter(cls.km_interval != 0) \
+            .filter(cls.is_reocurrent.is_(True)) \
+            .order_by(cls.km_next_instance, cls.id) \
+            .with_for_update() \
+            .all()
+
+    @classmethod
+    def update_km_next_instances(cls, km_next_instances):
+        """
+        Sets the next instance km of multiple tasks with a single executemany UPDATE. Doesn't commit the session.
+        :param km_next_instances: Dict of task id to next instance km.
+        """
+        if km_next_instances:
+            db.session.execute(update(cls), [{'id': task_id, 'km_next_instance': km_next_instance}
+                                             for task_id, km_next_instance in km_next_instances.items()])
+
+    @classmethod
+    def update_time_next_instances(cls, time_next_instances):
+        """
+        Sets the next instance times of multiple tasks with a single executemany UPDATE. Doesn't commit the session.
+        :param time_next_instances: Dict of task id to next instance time.
+        """
+        if time_next_instances:
+            db.session.execute(update(cls), [{'id': task_id, 'time_next_instance': time_next_instance}
+                                             for task_id, time_next_instance in time_next_instances.items()])
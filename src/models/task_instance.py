@@ -1,20 +1,25 @@
 import datetime
 
 from flask_restful import fields
+from sqlalchemy.orm import joinedload
 
 from src.app import db
 from src.exceptions.no_data import NoData
+from src.models.community_user_link import CommunityUserLinkModel
 from src.models.task import TaskModel
 from src.models.user import UserModel
 
 
 class TaskInstanceModel(db.Model):
     __tablename__ = 'task_instances'
+    __table_args__ = (
+        db.Index('ix_task_instances_community_id_is_open', 'community_id', 'is_open'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     time_created = db.Column(db.DateTime(), default=datetime.datetime.utcnow)
     time_updated = db.Column(db.DateTime(), onupdate=datetime.datetime.utcnow)
-    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=False)
+    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=False, index=True)
     task = db.relationship('TaskModel', foreign_keys=[task_id])
     km_created_at = db.Column(db.DECIMAL(precision=10, scale=1), nullable=True)
     is_open = db.Column(db.Boolean)
@@ -42,6 +47,16 @@ class TaskInstanceModel(db.Model):
             'finished_by': fields.Nested(UserModel.get_marshaller(), allow_null=True)
         }
 
+    @staticmethod
+    def get_load_options():
+        """
+        Loader options that load everything the marshaller needs along with the task instances.
+        """
+        return [
+            joinedload(TaskInstanceModel.task).options(*TaskModel.get_load_options()),
+            joinedload(TaskInstanceModel.finished_by)
+        ]
+
     @classmethod
     def delete_by_id(cls, task_instance_id):
         task = db.session.query(cls).filter(cls.id == task_instance_id).first()
@@ -66,3 +81,26 @@ class TaskInstanceModel(db.Model):
         return cls.query \
             .filter_by(community_id=community_id) \
             .all()
+
+    @classmethod
+    def find_open_by_community(cls, community_id, options=()):
+        return cls.query \
+            .options(*options) \
+            .filter_by(community_id=community_id, is_open=True) \
+            .all()
+
+    @classmethod
+    def find_open_by_user(cls, user_id, options=()):
+        """
+        Returns the open task instances of all communities the user is an accepted member of.
+        :param user_id: User to find the task instances for.
+        :return: List of task instances.
+        """
+        return cls.query \
+            .options(*options) \
+            .join(CommunityUserLinkModel, CommunityUserLinkModel.community_id == cls.community_id) \
+            .filter(CommunityUserLinkModel.user_id == user_id,
+                    CommunityUserLinkModel.invitation_accepted == True,
+                    cls.is_open == True) \
+            .order_by(cls.community_id, cls.id) \
+            .all()
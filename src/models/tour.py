@@ -1,15 +1,28 @@
 import datetime
 
 from flask_restful import fields
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, selectinload
 
 from src.app import db
 from src.exceptions.no_data import NoData
 from src.models.community import CommunityModel
 from src.models.user import UserModel
+from src.util.pagination import paginate
 
 
 class TourModel(db.Model):
     __tablename__ = 'tours'
+    __table_args__ = (
+        db.Index('ix_tours_community_id_end_time_id', 'community_id', 'end_time', 'id'),
+        db.Index('ix_tours_owner_id_end_time_id', 'owner_id', 'end_time', 'id'),
+        db.Index('ix_tours_community_id_end_km', 'community_id', 'end_km'),
+        # Partial indexes of the running tours
+        db.Index('ix_tours_community_id_running', 'community_id', postgresql_where=db.text('end_km IS NULL'),
+                 sqlite_where=db.text('end_km IS NULL')),
+        db.Index('ix_tours_owner_id_running', 'owner_id', postgresql_where=db.text('end_km IS NULL'),
+                 sqlite_where=db.text('end_km IS NULL')),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     time_created = db.Column(db.DateTime(), default=datetime.datetime.utcnow)
@@ -27,7 +40,7 @@ class TourModel(db.Model):
     is_force_finished = db.Column(db.Boolean)
     force_finished_by_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     force_finished_by = db.relationship('UserModel', foreign_keys=[force_finished_by_id])
-    payoff_id = db.Column(db.Integer, db.ForeignKey('payoffs.id'))
+    payoff_id = db.Column(db.Integer, db.ForeignKey('payoffs.id'), index=True)
     is_open = db.Column(db.Boolean, default=True)
     passengers = db.relationship('UserModel', secondary='tour_passenger_link')
 
@@ -55,6 +68,18 @@ class TourModel(db.Model):
             'passengers': fields.Nested(UserModel.get_marshaller())
         }
 
+    @staticmethod
+    def get_load_options():
+        """
+        Loader options that load everything the marshaller needs along with the tours.
+        """
+        return [
+            joinedload(TourModel.owner),
+            joinedload(TourModel.community).options(*CommunityModel.get_load_options()),
+            joinedload(TourModel.force_finished_by),
+            selectinload(TourModel.passengers)
+        ]
+
     @classmethod
     def delete_by_id(cls, id):
         tour = db.session.query(cls).filter(cls.id == id).first()
@@ -69,11 +94,45 @@ class TourModel(db.Model):
         return cls.query.filter_by(id=id).first()
 
     @classmethod
-    def find_finished_by_community(cls, community_id):
+    def find_end_time(cls, id):
+        """
+        Returns the end time of a tour as it is stored in the database, which may differ from an assigned aware value.
+        :param id: ID of the tour.
+        :return: Naive end time.
+        """
+        return db.session.query(cls.end_time).filter_by(id=id).scalar()
+
+    @classmethod
+    def find_finished_by_community(cls, community_id, options=(), limit=None, cursor=None):
+        query = cls.query \
+            .options(*options) \
+            .filter_by(community_id=community_id) \
+            .filter(TourModel.end_km.isnot(None))
+        return paginate(query, cls.end_time, cls.id, limit, cursor).all()
+
+    @classmethod
+    def find_finished_by_community_and_end_time(cls, community_id, from_time, to_time, include_to_time=True,
+                                                options=()):
+        """
+        Returns the finished tours of the community that ended in the given interval.
+        :param from_time: Start of the interval (inclusive).
+        :param to_time: End of the interval.
+        :param include_to_time: Include tours that ended exactly at the end of the interval.
+        """
         return cls.query \
+            .options(*options) \
             .filter_by(community_id=community_id) \
-            .filter(TourModel.end_km.isnot(None)) \
-            .order_by(TourModel.end_time.desc()) \
+            .filter(cls.end_km.isnot(None)) \
+            .filter(cls.end_time >= from_time) \
+            .filter(cls.end_time <= to_time if include_to_time else cls.end_time < to_time) \
+            .all()
+
+    @classmethod
+    def find_finished_km_by_community(cls, community_id):
+        return db.session.query(cls.id, cls.owner_id, (cls.end_km - cls.start_km).label('km'), cls.is_open,
+                                cls.end_time) \
+            .filter(cls.community_id == community_id) \
+            .filter(cls.end_km.isnot(None)) \
             .all()
 
     @classmethod
@@ -81,16 +140,43 @@ class TourModel(db.Model):
         return cls.query.filter_by(community_id=community_id, is_open=True).filter(TourModel.end_km.isnot(None)).all()
 
     @classmethod
-    def find_finished_by_user(cls, user_id):
-        return cls.query.filter_by(owner_id=user_id).filter(TourModel.end_km.isnot(None)).all()
+    def exists_finished_and_open_by_community(cls, community_id):
+        query = cls.query.filter_by(community_id=community_id, is_open=True).filter(TourModel.end_km.isnot(None))
+        return db.session.query(query.exists()).scalar()
+
+    @classmethod
+    def close_finished_and_open_by_community(cls, community_id, payoff_id):
+        cls.query \
+            .filter_by(community_id=community_id, is_open=True) \
+            .filter(TourModel.end_km.isnot(None)) \
+            .update({cls.is_open: False, cls.payoff_id: payoff_id}, synchronize_session=False)
+
+    @classmethod
+    def find_totals_by_payoffs(cls, payoff_ids):
+        """
+        Aggregates the tours of the given payoffs.
+        :param payoff_ids: IDs of the payoffs.
+        :return: List of (payoff_id, number_of_tours, km) rows.
+        """
+        return db.session.query(cls.payoff_id,
+                                func.count(cls.id).label('number_of_tours'),
+                                func.sum(cls.end_km - cls.start_km).label('km')) \
+            .filter(cls.payoff_id.in_(payoff_ids)) \
+            .group_by(cls.payoff_id) \
+            .all()
+
+    @classmethod
+    def find_finished_by_user(cls, user_id, options=(), limit=None, cursor=None):
+        query = cls.query.options(*options).filter_by(owner_id=user_id).filter(TourModel.end_km.isnot(None))
+        return paginate(query, cls.end_time, cls.id, limit, cursor).all()
 
     @classmethod
-    def find_running_by_community(cls, community_id):
-        return cls.query.filter_by(community_id=community_id).filter(TourModel.end_km.is_(None)).all()
+    def find_running_by_community(cls, community_id, options=()):
+        return cls.query.options(*options).filter_by(community_id=community_id).filter(TourModel.end_km.is_(None)).all()
 
     @classmethod
-    def find_running_by_user(cls, user_id):
-        return cls.query.filter_by(owner_id=user_id).filter(TourModel.end_km.is_(None)).all()
+    def find_running_by_user(cls, user_id, options=()):
+        return cls.query.options(*options).filter_by(owner_id=user_id).filter(TourModel.end_km.is_(None)).all()
 
     @classmethod
     def find_newest_tour_for_community(cls, community_id):
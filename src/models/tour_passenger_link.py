@@ -1,6 +1,9 @@
 import datetime
 
+from sqlalchemy import func, literal, case, union_all, select
+
 from src.app import db
+from src.models.tour import TourModel
 
 
 class TourPassengerLinkModel(db.Model):
@@ -16,3 +19,51 @@ class TourPassengerLinkModel(db.Model):
     def persist(self):
         db.session.add(self)
         db.session.commit()
+
+    @classmethod
+    def find_by_finished_tours_of_community(cls, community_id):
+        return db.session.query(cls.tour_id, cls.user_id) \
+            .join(TourModel, TourModel.id == cls.tour_id) \
+            .filter(TourModel.community_id == community_id) \
+            .filter(TourModel.end_km.isnot(None)) \
+            .all()
+
+    @classmethod
+    def find_km_totals_by_community_and_end_time(cls, community_id, from_time, to_time, include_to_time=True):
+        """
+        Sums up the km of the finished tours of the community that ended in the given interval per user. The km of a
+        tour are split evenly between its owner and passengers.
+        :param from_time: Start of the interval (inclusive).
+        :param to_time: End of the interval.
+        :param include_to_time: Include tours that ended exactly at the end of the interval.
+        :return: List of (user_id, km, km_accounted_for_passengers) rows.
+        """
+        tour_filters = [
+            TourModel.community_id == community_id,
+            TourModel.end_km.isnot(None),
+            TourModel.end_time >= from_time,
+            TourModel.end_time <= to_time if include_to_time else TourModel.end_time < to_time
+        ]
+        km = (TourModel.end_km - TourModel.start_km).label('km')
+        participants = union_all(
+            select(TourModel.id.label('tour_id'), TourModel.owner_id.label('user_id'), km,
+                   literal(1).label('is_owner'))
+            .where(*tour_filters),
+            select(cls.tour_id, cls.user_id, km, literal(0))
+            .join(TourModel, TourModel.id == cls.tour_id)
+            .where(*tour_filters)
+        ).subquery()
+        shares = select(participants.c.user_id,
+                        participants.c.km,
+                        participants.c.is_owner,
+                        func.count().over(partition_by=participants.c.tour_id).label('number_of_participants')) \
+            .subquery()
+        # Shares are calculated with the precision of the daily statistics
+        km_share = db.cast(shares.c.km, db.DECIMAL(precision=32, scale=20)) / shares.c.number_of_participants
+        return db.session.query(shares.c.user_id,
+                                func.sum(case((shares.c.is_owner == 1, shares.c.km), else_=0),
+                                         type_=db.DECIMAL(precision=12, scale=1)).label('km'),
+                                func.sum(km_share, type_=db.DECIMAL(precision=32, scale=20))
+                                .label('km_accounted_for_passengers')) \
+            .group_by(shares.c.user_id) \
+            .all()
@@ -12,13 +12,13 @@ class UserModel(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(120), unique=True, nullable=False)
     password = db.Column(db.String(120), nullable=False)
-    email = db.Column(db.String(120), nullable=False)
+    email = db.Column(db.String(120), nullable=False, index=True)
     time_created = db.Column(db.DateTime(), default=datetime.datetime.utcnow)
     time_updated = db.Column(db.DateTime(), onupdate=datetime.datetime.utcnow)
     cars = db.relationship("CarModel", back_populates="owner")
     communities = db.relationship("CommunityModel", secondary='community_user_link')
     tours = db.relationship("TourModel", secondary='tour_passenger_link')
-    reset_password_hash = db.Column(db.String(120), nullable=True, default=None)
+    reset_password_hash = db.Column(db.String(120), nullable=True, default=None, index=True)
     reset_password_hash_created = db.Column(db.DateTime(timezone=True), default=None, nullable=True)
 
     def persist(self):
@@ -1,9 +1,9 @@
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from flask_restful import Resource, marshal_with, abort, reqparse
 
 from src.messages.messages import USER_DOESNT_EXIST
 from src.models.acount_settings import AccountSettingsModel
-from src.models.user import UserModel
+from src.util.current_user import get_current_user
 
 parser = reqparse.RequestParser()
 parser.add_argument('auto_load_parking_place_gps_location', help='This field cannot be blank', required=True, type=bool)
@@ -15,7 +15,7 @@ class GetAccountSettings(Resource):
     @jwt_required()
     @marshal_with(AccountSettingsModel.get_marshaller())
     def get(self):
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
         account_settings = AccountSettingsModel.find_by_user_id(user.id)
         if not account_settings:
             abort(404, message=USER_DOESNT_EXIST)
@@ -29,7 +29,7 @@ class UpdateAccountSettings(Resource):
     def put(self):
         data = parser.parse_args()
 
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
         account_settings = AccountSettingsModel.find_by_user_id(user.id)
         if not account_settings:
             abort(404, message=USER_DOESNT_EXIST)
@@ -2,8 +2,7 @@ import re
 from datetime import datetime
 from uuid import uuid4
 
-from flask_jwt_extended import (create_access_token, create_refresh_token, jwt_required,
-                                get_jwt_identity, get_jwt)
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt
 from flask_restful import Resource, reqparse, marshal_with, abort
 
 from src.messages.marshalling_objects import SimpleMessage, AuthResponse
@@ -14,8 +13,10 @@ from src.messages.messages import USER_ALREADY_EXISTS, USER_CREATION_SUCCESS, IN
 from src.models.acount_settings import AccountSettingsModel
 from src.models.revoked_token import RevokedTokenModel
 from src.models.user import UserModel
+from src.util.current_user import get_current_user
 from src.util.email import send_forgot_password_email
 from src.util.regexes import email_regex, username_regex
+from src.util.revoked_tokens import revoked_token_store, get_token_expiry
 
 
 class UserRegistration(Resource):
@@ -92,10 +93,11 @@ class UserLogoutAccess(Resource):
     @jwt_required()
     @marshal_with(SimpleMessage.get_marshaller())
     def post(self):
-        jti = get_jwt()['jti']
+        jwt_payload = get_jwt()
         try:
-            revoked_token = RevokedTokenModel(jti=jti)
+            revoked_token = RevokedTokenModel(jti=jwt_payload['jti'], time_expires=get_token_expiry(jwt_payload))
             revoked_token.persist()
+            revoked_token_store.add(revoked_token)
             return SimpleMessage(ACCESS_TOKEN_REVOKED), 200
         except:
             abort(500, message=INTERNAL_SERVER_ERROR)
@@ -105,10 +107,11 @@ class UserLogoutRefresh(Resource):
     @jwt_required(refresh=True)
     @marshal_with(SimpleMessage.get_marshaller())
     def post(self):
-        jti = get_jwt()['jti']
+        jwt_payload = get_jwt()
         try:
-            revoked_token = RevokedTokenModel(jti=jti)
+            revoked_token = RevokedTokenModel(jti=jwt_payload['jti'], time_expires=get_token_expiry(jwt_payload))
             revoked_token.persist()
+            revoked_token_store.add(revoked_token)
             return SimpleMessage(REFRESH_TOKEN_REVOKED), 200
         except:
             abort(500, message=INTERNAL_SERVER_ERROR)
@@ -118,7 +121,7 @@ class TokenRefresh(Resource):
     @jwt_required(refresh=True)
     @marshal_with(AuthResponse.get_marshaller())
     def post(self):
-        current_user = UserModel.find_by_username(get_jwt_identity())
+        current_user = get_current_user()
         access_token = create_access_token(identity=current_user.username)
         return AuthResponse(LOGIN_SUCCESS, current_user, access_token=access_token), 200
 
@@ -1,11 +1,11 @@
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from flask_restful import Resource, marshal_with, reqparse, abort
 
 from src.exceptions.no_data import NoData
 from src.messages.marshalling_objects import SimpleMessage
 from src.messages.messages import CAR_DELETED, INTERNAL_SERVER_ERROR, CAR_DOESNT_EXIST
 from src.models.car import CarModel
-from src.models.user import UserModel
+from src.util.current_user import get_current_user
 
 parser = reqparse.RequestParser()
 parser.add_argument('name', help='This field cannot be blank', required=True, type=str)
@@ -57,7 +57,7 @@ class AllCars(Resource):
     def post(self):
         data = parser.parse_args()
 
-        owner = UserModel.find_by_username(get_jwt_identity())
+        owner = get_current_user()
 
         new_car = CarModel(
             owner=owner,
@@ -78,5 +78,5 @@ class UserCars(Resource):
     @jwt_required()
     @marshal_with(CarModel.get_marshaller())
     def get(self):
-        user = UserModel.find_by_username(get_jwt_identity())
-        return CarModel.return_all_for_user(user.id), 200
+        user = get_current_user()
+        return CarModel.return_all_for_user(user.id, options=CarModel.get_load_options()), 200
@@ -1,6 +1,6 @@
 from typing import List
 
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from flask_restful import Resource, marshal_with, reqparse, abort
 
 from src.app import db
@@ -16,6 +16,8 @@ from src.models.car import CarModel
 from src.models.community import CommunityModel
 from src.models.community_user_link import CommunityUserLinkModel
 from src.models.user import UserModel
+from src.util.current_user import get_current_user
+from src.util.membership import community_member_required, is_community_member
 
 post_parser = reqparse.RequestParser()
 post_parser.add_argument('car', help='This field cannot be blank', required=True, type=int)
@@ -54,7 +56,10 @@ class AllCommunityInvitations(Resource):
         if not community:
             abort(404, message=COMMUNIY_DOESNT_EXIST)
 
-        if user in community.users:
+        if not is_community_member(get_current_user().id, community.id):
+            abort(401, message=UNAUTHORIZED)
+
+        if is_community_member(user.id, community.id):
             abort(400, message=USER_ALREADY_INVITED)
 
         new_community_user_link = CommunityUserLinkModel(
@@ -76,25 +81,17 @@ class OpenCommunityInvitationsForUser(Resource):
     @jwt_required()
     @marshal_with(CommunityUserLinkModel.get_marshaller())
     def get(self):
-        user = UserModel.find_by_username(get_jwt_identity())
-        return CommunityUserLinkModel.find_open_invitations_by_user(user.id), 200
+        user = get_current_user()
+        return CommunityUserLinkModel.find_open_invitations_by_user(
+            user.id, options=CommunityUserLinkModel.get_load_options()), 200
 
 
 class InvitedUsers(Resource):
 
     @jwt_required()
+    @community_member_required(community_not_found_code=404)
     @marshal_with(UserModel.get_marshaller())
     def get(self, community_id: int):
-
-        user = UserModel.find_by_username(get_jwt_identity())
-        community = CommunityModel.find_by_id(community_id)
-
-        if not community:
-            abort(404, message=COMMUNIY_DOESNT_EXIST)
-
-        if user not in community.users:
-            abort(401, message=UNAUTHORIZED)
-
         invitations = CommunityUserLinkModel.find_open_invitations_by_community(community_id)
         return [i.user for i in invitations], 200
 
@@ -104,7 +101,7 @@ class SingleCommunityInvitation(Resource):
     @jwt_required()
     @marshal_with(SimpleMessage.get_marshaller())
     def put(self, community_id):
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
         invitation = CommunityUserLinkModel.find_by_user_and_community(user.id, community_id)
 
         if not invitation:
@@ -125,7 +122,7 @@ class SingleCommunityInvitation(Resource):
     @jwt_required()
     @marshal_with(SimpleMessage.get_marshaller())
     def delete(self, community_id):
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
         invitation = CommunityUserLinkModel.find_by_user_and_community(user.id, community_id)
 
         if not invitation:
@@ -149,34 +146,27 @@ class SingleCommunityInvitation(Resource):
 class SingleCommunity(Resource):
 
     @jwt_required()
+    @community_member_required(argument='id', community_not_found_code=404)
     @marshal_with(CommunityModel.get_detailed_marshaller())
     def get(self, id):
 
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
 
         community = CommunityModel.find_by_id(id)
-        if not community:
-            abort(404, message=COMMUNIY_DOESNT_EXIST)
-
-        if user not in community.users:
-            abort(401, message=UNAUTHORIZED)
-
-        is_owner = CommunityUserLinkModel.find_by_user_and_community(user.id, community.id).is_owner
+        is_owner = is_community_member(user.id, id, is_owner=True)
         community.is_deletable = is_owner
         community.is_editable = is_owner
 
         return community, 200
 
     @jwt_required()
+    @community_member_required(is_owner=True, argument='id', community_not_found_code=404)
     @marshal_with(CommunityModel.get_marshaller())
     def put(self, id):
         data = put_parser.parse_args()
 
         community = CommunityModel.find_by_id(id)
 
-        if not community:
-            abort(404, message=COMMUNIY_DOESNT_EXIST)
-
         community.name = data['name']
         community.persist()
 
@@ -185,7 +175,7 @@ class SingleCommunity(Resource):
     @jwt_required()
     @marshal_with(SimpleMessage.get_marshaller())
     def delete(self, id):
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
 
         try:
             link = CommunityUserLinkModel.find_by_user_and_community(user.id, id)
@@ -213,7 +203,7 @@ class AllCommunities(Resource):
     def post(self):
         data = post_parser.parse_args()
 
-        founder = UserModel.find_by_username(get_jwt_identity())
+        founder = get_current_user()
         car = CarModel.find_by_id(data['car'])
 
         if not car:
@@ -246,18 +236,19 @@ class UserCommunities(Resource):
     @jwt_required()
     @marshal_with(CommunityModel.add_is_fav_to_marshaller(CommunityModel.get_detailed_marshaller()))
     def get(self):
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
 
-        community_user_links = CommunityUserLinkModel.find_by_user(user.id)
+        community_user_links = CommunityUserLinkModel.find_by_user(
+            user.id, options=CommunityUserLinkModel.get_load_options())
         for cul in community_user_links:
             cul.community.is_favourite = cul.is_favourite
 
-        user_communities = [c.community for c in community_user_links if c.invitation_accepted]
-
-        for c in user_communities:
-            is_owner = CommunityUserLinkModel.find_by_user_and_community(user.id, c.id).is_owner
-            c.is_deletable = is_owner
-            c.is_editable = is_owner
+        user_communities = []
+        for cul in community_user_links:
+            if cul.invitation_accepted:
+                cul.community.is_deletable = cul.is_owner
+                cul.community.is_editable = cul.is_owner
+                user_communities.append(cul.community)
 
         return user_communities, 200
 
@@ -265,14 +256,11 @@ class UserCommunities(Resource):
 class CommunityUsers(Resource):
 
     @jwt_required()
+    @community_member_required()
     @marshal_with(UserModel.get_marshaller())
     def get(self, community_id):
-        user = UserModel.find_by_username(get_jwt_identity())
         community = CommunityModel.find_by_id(community_id)
 
-        if user not in community.users:
-            abort(401, message=UNAUTHORIZED)
-
         return community.users, 200
 
 
@@ -281,15 +269,15 @@ class MarkCommunityAsFavourite(Resource):
     @jwt_required()
     @marshal_with(SimpleMessage.get_marshaller())
     def put(self, community_id):
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
         community_user_links = CommunityUserLinkModel.find_by_user(user.id)
 
-        faved_community_cul = next((cul for cul in community_user_links if cul.community.id == community_id), None)
+        faved_community_cul = next((cul for cul in community_user_links if cul.community_id == community_id), None)
 
         if not faved_community_cul:
             abort(404, message=COMMUNIY_DOESNT_EXIST)
 
-        if user not in faved_community_cul.community.users:
+        if not faved_community_cul.invitation_accepted:
             abort(401, message=UNAUTHORIZED)
 
         try:
@@ -309,7 +297,7 @@ class FavouriteCommunity(Resource):
     @jwt_required()
     @marshal_with(CommunityModel.get_marshaller())
     def get(self):
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
         cul = CommunityUserLinkModel.find_favourite_by_user(user.id)
 
         if not cul:
@@ -1,13 +1,14 @@
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from flask_restful import Resource, marshal_with, reqparse, abort
 
 from src.messages.marshalling_objects import SimpleMessage
-from src.messages.messages import INTERNAL_SERVER_ERROR, COMMUNIY_DOESNT_EXIST, \
+from src.messages.messages import INTERNAL_SERVER_ERROR, \
     UNAUTHORIZED, END_MUST_BE_AFTER_START, EVENT_DOESNT_EXIST, EVENT_DELETED, TO_MUST_BE_AFTER_FROM
-from src.models.community import CommunityModel
 from src.models.event import EventModel
-from src.models.user import UserModel
+from src.util.current_user import get_current_user
+from src.util.membership import community_member_required, is_community_member
 from src.util.parser_types import moment
+from src.util.replica import read_from_replica
 
 parser = reqparse.RequestParser()
 parser.add_argument('title', help='This field cannot be blank', required=True, type=str)
@@ -19,19 +20,12 @@ parser.add_argument('end', help='This field cannot be blank', required=True, typ
 class CreateEvent(Resource):
 
     @jwt_required()
+    @community_member_required()
     @marshal_with(EventModel.get_marshaller())
     def post(self, community_id):
         data = parser.parse_args()
 
-        owner = UserModel.find_by_username(get_jwt_identity())
-        community: CommunityModel = CommunityModel.find_by_id(community_id)
-        community_member_ids = [m.id for m in community.users]
-
-        if not community:
-            abort(400, message=COMMUNIY_DOESNT_EXIST)
-
-        if owner.id not in community_member_ids:
-            abort(401, message=UNAUTHORIZED)
+        owner = get_current_user()
 
         if not data['end'] > data['start']:
             abort(400, message=END_MUST_BE_AFTER_START)
@@ -42,7 +36,7 @@ class CreateEvent(Resource):
             description=data['description'],
             start=data['start'],
             end=data['end'],
-            community_id=community.id
+            community_id=community_id
         )
 
         try:
@@ -59,7 +53,7 @@ class EditEvent(Resource):
     def put(self, event_id):
         data = parser.parse_args()
 
-        owner = UserModel.find_by_username(get_jwt_identity())
+        owner = get_current_user()
         event: EventModel = EventModel.find_by_id(event_id)
 
         if not event:
@@ -86,6 +80,7 @@ class EditEvent(Resource):
 class GetEvent(Resource):
 
     @jwt_required()
+    @read_from_replica
     @marshal_with(EventModel.get_marshaller())
     def get(self, event_id):
 
@@ -94,10 +89,9 @@ class GetEvent(Resource):
         if not event:
             abort(404, message=EVENT_DOESNT_EXIST)
 
-        community_member_ids = [m.id for m in event.community.users]
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
 
-        if user.id not in community_member_ids:
+        if not is_community_member(user.id, event.community_id):
             abort(401, message=UNAUTHORIZED)
 
         return event, 200
@@ -106,26 +100,18 @@ class GetEvent(Resource):
 class GetEvents(Resource):
 
     @jwt_required()
+    @read_from_replica
+    @community_member_required()
     @marshal_with(EventModel.get_marshaller())
     def get(self, community_id, from_datetime, to_datetime):
-
-        owner = UserModel.find_by_username(get_jwt_identity())
-        community: CommunityModel = CommunityModel.find_by_id(community_id)
-        community_member_ids = [m.id for m in community.users]
-
-        if not community:
-            abort(400, message=COMMUNIY_DOESNT_EXIST)
-
-        if owner.id not in community_member_ids:
-            abort(401, message=UNAUTHORIZED)
-
         from_datetime = moment(from_datetime)
         to_datetime = moment(to_datetime)
 
         if not to_datetime > from_datetime:
             abort(400, message=TO_MUST_BE_AFTER_FROM)
 
-        events: EventModel = EventModel.find_by_community(community_id, from_datetime, to_datetime)
+        events: EventModel = EventModel.find_by_community(community_id, from_datetime, to_datetime,
+                                                         options=EventModel.get_load_options())
 
         return events, 200
 
@@ -133,20 +119,12 @@ class GetEvents(Resource):
 class GetNextEvents(Resource):
 
     @jwt_required()
+    @read_from_replica
+    @community_member_required()
     @marshal_with(EventModel.get_marshaller())
     def get(self, community_id, number_of_events):
-
-        owner = UserModel.find_by_username(get_jwt_identity())
-        community: CommunityModel = CommunityModel.find_by_id(community_id)
-        community_member_ids = [m.id for m in community.users]
-
-        if not community:
-            abort(400, message=COMMUNIY_DOESNT_EXIST)
-
-        if owner.id not in community_member_ids:
-            abort(401, message=UNAUTHORIZED)
-
-        events: EventModel = EventModel.find_next_n_by_community(community_id, number_of_events)
+        events: EventModel = EventModel.find_next_n_by_community(community_id, number_of_events,
+                                                                 options=EventModel.get_load_options())
 
         return events, 200
 
@@ -162,10 +140,9 @@ class DeleteEvent(Resource):
         if not event:
             abort(404, message=EVENT_DOESNT_EXIST)
 
-        community_member_ids = [m.id for m in event.community.users]
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
 
-        if user.id not in community_member_ids:
+        if not is_community_member(user.id, event.community_id):
             abort(401, message=UNAUTHORIZED)
 
         try:
@@ -0,0 +1,49 @@
+import hmac
+
+from flask import current_app, request
+from flask_restful import Resource, abort
+
+from src.messages.messages import INSTRUMENTATION_DISABLED, UNAUTHORIZED
+from src.util.current_user import user_cache
+from src.util.instrumentation import instrumentation
+from src.util.revoked_tokens import revoked_token_store
+
+
+def check_instrumentation_access():
+    """
+    Aborts if the instrumentation is disabled or the request doesn't send the static `INSTRUMENTATION_AUTH_TOKEN` as
+    bearer token. The statistics contain statements and pool details, so they stay closed if no token is configured.
+    """
+    if not instrumentation.enabled:
+        abort(404, message=INSTRUMENTATION_DISABLED)
+    token = current_app.config['INSTRUMENTATION_AUTH_TOKEN']
+    if not token or not hmac.compare_digest(request.headers.get('Authorization', ''), 'Bearer ' + token):
+        abort(401, message=UNAUTHORIZED)
+
+
+class InstrumentationStatistics(Resource):
+
+    def get(self):
+        check_instrumentation_access()
+        return instrumentation.get_statistics(), 200
+
+
+class InstrumentationPoolStatistics(Resource):
+
+    def get(self):
+        check_instrumentation_access()
+        return instrumentation.get_pool_statistics(), 200
+
+
+class InstrumentationUserStatistics(Resource):
+
+    def get(self):
+        check_instrumentation_access()
+        return user_cache.get_statistics(), 200
+
+
+class InstrumentationRevokedTokenStatistics(Resource):
+
+    def get(self):
+        check_instrumentation_access()
+        return revoked_token_store.get_statistics(), 200
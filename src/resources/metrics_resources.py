@@ -0,0 +1,19 @@
+import hmac
+
+from flask import current_app, request, Response
+from flask_restful import Resource, abort
+
+from src.messages.messages import METRICS_DISABLED, UNAUTHORIZED
+from src.util.metrics import metrics, CONTENT_TYPE_LATEST
+
+
+class PrometheusMetrics(Resource):
+
+    # Scraped by Prometheus, which authenticates with the static METRICS_AUTH_TOKEN instead of a JWT
+    def get(self):
+        if not metrics.enabled:
+            abort(404, message=METRICS_DISABLED)
+        token = current_app.config['METRICS_AUTH_TOKEN']
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), 'Bearer ' + token):
+            abort(401, message=UNAUTHORIZED)
+        return Response(metrics.generate_latest(), content_type=CONTENT_TYPE_LATEST)
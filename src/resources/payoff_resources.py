@@ -1,200 +1,162 @@
 from collections import OrderedDict
-from typing import List
 
 import numpy as np
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import current_app
+from flask_jwt_extended import jwt_required
 from flask_restful import Resource, marshal_with, abort
 
+from src.app import app, db
 from src.messages.messages import UNAUTHORIZED, CANT_CREATE_PAYOFF_WHEN_UNFINISHED_TOURS_EXIST, \
-    CANT_CREATE_PAYOFF_WITHOUT_NEW_REFUELS_AND_TOURS, COMMUNIY_DOESNT_EXIST, PAYOFF_DOESNT_EXIST, DEBT_DOESNT_EXIST
-from src.models.community import CommunityModel
+    CANT_CREATE_PAYOFF_WITHOUT_NEW_REFUELS_AND_TOURS, PAYOFF_DOESNT_EXIST, DEBT_DOESNT_EXIST, \
+    INTERNAL_SERVER_ERROR
+from src.models.community_ledger import CommunityLedgerModel
 from src.models.debt import DebtModel
 from src.models.payoff import PayoffModel
 from src.models.refuel import RefuelModel
 from src.models.tour import TourModel
-from src.models.user import UserModel
+from src.util.community_version import community_etag
+from src.util.current_user import get_current_user
+from src.util.fast_marshal import fast_marshal_with, compile_marshaller, make_json_response
+from src.util.field_selection import select_fields
+from src.util.membership import community_member_required, is_community_member
+from src.util.metrics import metrics
+from src.util.pagination import get_pagination_args, get_next_cursor_headers
+from src.util.payoff_calculation import calculate_debt_matrix
+from src.util.replica import read_from_replica
 from src.util.simplify_debt_matrix import simplify_debt_matrix
 
 
+def create_payoff(id) -> PayoffModel:
+    """
+    Creates a payoff of the open tours and refuels of a community with the simplified debts between its users and
+    closes the tours, refuels and the ledger. Doesn't commit the session.
+    :param id: Community to create the payoff for.
+    :return: Created payoff.
+    """
+    ledger = CommunityLedgerModel.find_by_community(id)
+    debts = DebtModel.find_amount_sums_by_community(id)
+
+    # Create reference user id to matrix index dict
+    user_ids = list(OrderedDict.fromkeys(
+        [e.user_id for e in ledger] + [d.debtee_id for d in debts] + [d.recepient_id for d in debts]))
+    user_indices = {user_id: index for index, user_id in enumerate(user_ids)}
+
+    km_per_user = np.zeros(len(user_ids))
+    costs_per_user = np.zeros(len(user_ids))
+    for entry in ledger:
+        km_per_user[user_indices[entry.user_id]] = entry.km_accounted_for_passengers
+        costs_per_user[user_indices[entry.user_id]] = float(entry.costs)
+
+    # Create debt matrix (debtee on y axis, recipient on x axis)
+    debt_matrix = calculate_debt_matrix(
+        km_per_user=km_per_user,
+        costs_per_user=costs_per_user,
+        debtee_indices=np.array([user_indices[d.debtee_id] for d in debts], dtype=int),
+        recipient_indices=np.array([user_indices[d.recepient_id] for d in debts], dtype=int),
+        debt_amounts=np.array([float(d.amount) for d in debts], dtype=float)
+    )
+
+    # Simplify debt matrix
+    mode = current_app.config['DEBT_SIMPLIFICATION_MODE']
+    with metrics.timer('debt_simplification_duration', mode):
+        debt_matrix = simplify_debt_matrix(debt_matrix, mode)
+
+    # Create payoff and debts and close all open tours and refuels
+    payoff = PayoffModel()
+    payoff.community_id = id
+    # If there is no resulting debt in the payoff, the payoff is settled
+    payoff.is_settled = not np.any(debt_matrix != 0)
+    db.session.add(payoff)
+    db.session.flush()
+    DebtModel.bulk_insert([{
+        'debtee_id': user_ids[i],
+        'recepient_id': user_ids[j],
+        'amount': round(float(debt_matrix[i, j]), 2),
+        'payoff_id': payoff.id,
+        'community_id': id
+    } for i, j in zip(*np.nonzero(debt_matrix))])
+    TourModel.close_finished_and_open_by_community(id, payoff.id)
+    RefuelModel.close_open_by_community(id, payoff.id)
+    CommunityLedgerModel.close_by_community(id)
+    return payoff
+
+
 class AllPayoffs(Resource):
 
     @jwt_required()
+    @community_member_required(argument='id', community_not_found_code=404)
     @marshal_with(PayoffModel.get_marshaller())
     def post(self, id):
-        community = CommunityModel.find_by_id(id)
-        user = UserModel.find_by_username(get_jwt_identity())
-
-        if not community:
-            abort(404, message=COMMUNIY_DOESNT_EXIST)
-
-        if user.id not in [u.id for u in community.users]:
-            abort(401, message=UNAUTHORIZED)
-
         if TourModel.find_running_by_community(id):
             abort(400, message=CANT_CREATE_PAYOFF_WHEN_UNFINISHED_TOURS_EXIST)
 
-        # tours: List[TourModel] = TourModel.find_finished_and_open_by_community(id)
-        # refuels: List[RefuelModel] = RefuelModel.find_open_by_community(id)
-        tours: List[TourModel] = TourModel.find_finished_by_community(id)
-        refuels: List[RefuelModel] = RefuelModel.find_by_community(id)
-
-        if not [t for t in tours if t.is_open] and not [r for r in refuels if r.is_open]:
+        if not TourModel.exists_finished_and_open_by_community(id) and not RefuelModel.exists_open_by_community(id):
             abort(400, message=CANT_CREATE_PAYOFF_WITHOUT_NEW_REFUELS_AND_TOURS)
 
-        # Calculate some basic statistics
-        total_km = sum(map(lambda t: t.end_km - t.start_km, tours))
-        km_per_user = {}
-        for tour in tours:
-            involved_users = [tour.owner] + tour.passengers
-            km_per_involved_user = (tour.end_km - tour.start_km) / len(involved_users)
-            for involved_user in involved_users:
-                if involved_user.id not in km_per_user:
-                    km_per_user[involved_user.id] = 0
-                km_per_user[involved_user.id] += km_per_involved_user
-        # If there is a user from refuels missing, he has zero costs/kms
-        for refuel in refuels:
-            if refuel.owner.id not in km_per_user:
-                km_per_user[refuel.owner.id] = 0
-        km_fraction_per_user = {}
-        for user_id, km in km_per_user.items():
-            km_fraction_per_user[user_id] = km / total_km
-
-        # Create reference user id to user dict
-        user_dictionary = OrderedDict()
-        for tour in tours:
-            if tour.owner.id not in user_dictionary:
-                user_dictionary[tour.owner.id] = tour.owner
-            for passenger in tour.passengers:
-                if passenger.id not in user_dictionary:
-                    user_dictionary[passenger.id] = passenger
-        for refuel in refuels:
-            if refuel.owner.id not in user_dictionary:
-                user_dictionary[refuel.owner.id] = refuel.owner
-
-        # Create debt matrix (debtee on y axis, recipient on x axis)
-        debt_matrix = np.zeros((len(user_dictionary), len(user_dictionary)))
-        for refuel in refuels:
-            recipient_position = list(user_dictionary.keys()).index(refuel.owner.id)
-            for user_id in user_dictionary.keys():
-                if user_id != refuel.owner.id:
-                    debtee_position = list(user_dictionary.keys()).index(user_id)
-                    debt_amount = refuel.costs * km_fraction_per_user[user_id]
-                    debt_matrix[debtee_position, recipient_position] += float(debt_amount)
-
-        # Include already created debts from previous payoffs
-        debts = DebtModel.find_by_community(id)
-        for debt in debts:
-            recipient_position = list(user_dictionary.keys()).index(debt.recepient_id)
-            debtee_position = list(user_dictionary.keys()).index(debt.debtee_id)
-            debt_matrix[debtee_position, recipient_position] -= float(debt.amount)
-
-        # Simplify debt matrix
-        debt_matrix = simplify_debt_matrix(debt_matrix)
-
-        # Create and persist payoff
-        payoff = PayoffModel()
-        payoff.community_id = id
-        payoff.persist()
-
-        # Create and persist debt objects
-        for i in range(debt_matrix.shape[0]):
-            for j in range(debt_matrix.shape[0]):
-                if debt_matrix[i, j] != 0:
-                    debt = DebtModel()
-                    debt.debtee = list(user_dictionary.values())[i]
-                    debt.recepient = list(user_dictionary.values())[j]
-                    debt.amount = round(debt_matrix[i, j], 2)
-                    debt.payoff_id = payoff.id
-                    debt.community_id = id
-                    debt.persist()
-
-        # If there is no resulting debt in the payoff, the payoff is settled
-        if not np.any(debt_matrix != 0):
-            payoff.is_settled = True
-
-        # Set open tours to non open and add payoff id
-        for tour in tours:
-            if tour.is_open:
-                tour.is_open = False
-                tour.payoff_id = payoff.id
-                tour.persist()
-
-        # Set open refuels to non open and add payoff id
-        for refuel in refuels:
-            if refuel.is_open:
-                refuel.is_open = False
-                refuel.payoff_id = payoff.id
-                refuel.persist()
+        try:
+            with metrics.timer('payoff_duration'):
+                payoff = create_payoff(id)
+            db.session.commit()
+        except Exception:
+            app.logger.exception('Creating the payoff of community {} failed'.format(id))
+            db.session.rollback()
+            abort(500, message=INTERNAL_SERVER_ERROR)
 
         return payoff, 201
 
     @jwt_required()
-    @marshal_with(PayoffModel.get_marshaller())
+    @read_from_replica
+    @community_member_required(argument='id', community_not_found_code=404)
     def get(self, id):
-        community = CommunityModel.find_by_id(id)
-        user = UserModel.find_by_username(get_jwt_identity())
-
-        if not community:
-            abort(404, message=COMMUNIY_DOESNT_EXIST)
+        marshaller = select_fields(PayoffModel.get_summary_marshaller())
+        limit, cursor = get_pagination_args()
+        payoffs = PayoffModel.find_summaries_by_community(id, limit=limit, cursor=cursor)
 
-        if user.id not in [u.id for u in community.users]:
-            abort(401, message=UNAUTHORIZED)
-
-        payoffs = PayoffModel.find_by_community(id)
-
-        return payoffs, 200
+        return make_json_response(compile_marshaller(marshaller)(payoffs), 200,
+                                  get_next_cursor_headers(payoffs, limit, 'time_created'))
 
 
 class SinglePayoff(Resource):
 
     @jwt_required()
-    @marshal_with(PayoffModel.get_marshaller())
     def get(self, id):
+        marshaller = select_fields(PayoffModel.get_marshaller())
 
-        payoff = PayoffModel.find_by_id(id)
+        payoff = PayoffModel.find_by_id(id, options=PayoffModel.get_load_options())
 
         if not payoff:
             abort(404, message=PAYOFF_DOESNT_EXIST)
 
-        community = CommunityModel.find_by_id(payoff.community_id)
-        user = UserModel.find_by_username(get_jwt_identity())
-
-        if not community:
-            abort(404, message=COMMUNIY_DOESNT_EXIST)
+        user = get_current_user()
 
-        if user.id not in [u.id for u in community.users]:
+        if not is_community_member(user.id, payoff.community_id):
             abort(401, message=UNAUTHORIZED)
 
-        return payoff, 200
+        return make_json_response(compile_marshaller(marshaller)(payoff), 200)
 
 
 class CommunityDebts(Resource):
 
     @jwt_required()
-    @marshal_with(DebtModel.get_marshaller())
+    @community_member_required(argument='id', community_not_found_code=404)
+    @community_etag(argument='id')
+    @fast_marshal_with(DebtModel.get_marshaller())
     def get(self, id):
-        community = CommunityModel.find_by_id(id)
-        user = UserModel.find_by_username(get_jwt_identity())
+        limit, cursor = get_pagination_args()
+        debts = DebtModel.find_unsettled_by_community(id, options=DebtModel.get_load_options(), limit=limit,
+                                                      cursor=cursor)
 
-        if not community:
-            abort(404, message=COMMUNIY_DOESNT_EXIST)
-
-        if user.id not in [u.id for u in community.users]:
-            abort(401, message=UNAUTHORIZED)
-
-        debts = DebtModel.find_unsettled_by_community(id)
-
-        return debts, 200
+        return debts, 200, get_next_cursor_headers(debts, limit, 'time_created')
 
 
 class UserDebts(Resource):
 
     @jwt_required()
-    @marshal_with(DebtModel.get_marshaller())
+    @fast_marshal_with(DebtModel.get_marshaller())
     def get(self):
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
 
-        debts = DebtModel.find_unsettled_by_user(user.id)
+        debts = DebtModel.find_unsettled_by_user(user.id, options=DebtModel.get_load_options())
 
         return debts, 200
 
@@ -204,7 +166,7 @@ class SettleDebt(Resource):
     @jwt_required()
     @marshal_with(DebtModel.get_marshaller())
     def put(self, id):
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
         debt = DebtModel.find_by_id(id)
 
         if not debt:
@@ -232,7 +194,7 @@ class UnsettleDebt(Resource):
     @jwt_required()
     @marshal_with(DebtModel.get_marshaller())
     def put(self, id):
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
         debt = DebtModel.find_by_id(id)
 
         if not debt:
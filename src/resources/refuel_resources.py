@@ -1,13 +1,17 @@
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from flask_restful import Resource, marshal_with, reqparse, abort
 
 from src.exceptions.no_data import NoData
 from src.messages.marshalling_objects import SimpleMessage
-from src.messages.messages import INTERNAL_SERVER_ERROR, COMMUNIY_DOESNT_EXIST, UNAUTHORIZED, REFUEL_DELETED, \
+from src.messages.messages import INTERNAL_SERVER_ERROR, UNAUTHORIZED, REFUEL_DELETED, \
     REFUEL_DOESNT_EXIST, CANT_CHANGE_REFUEL_COMMUNITY, CANNOT_DELETE_A_REFUEL_THAT_IS_PART_OF_A_PAYOFF
 from src.models.community import CommunityModel
 from src.models.refuel import RefuelModel
-from src.models.user import UserModel
+from src.util.bookkeeping import book_refuel
+from src.util.current_user import get_current_user
+from src.util.fast_marshal import fast_marshal_with
+from src.util.membership import community_member_required, is_community_member
+from src.util.pagination import get_pagination_args, get_next_cursor_headers
 from src.util.parser_types import float_or_null
 
 parser = reqparse.RequestParser()
@@ -21,13 +25,13 @@ class SingleRefuel(Resource):
     @jwt_required()
     @marshal_with(RefuelModel.get_marshaller())
     def get(self, community_id, id):
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
         refuel = RefuelModel.find_by_id(id)
 
         if not refuel:
             abort(404, message=REFUEL_DOESNT_EXIST)
 
-        if user.id not in [u.id for u in refuel.community.users]:
+        if not is_community_member(user.id, refuel.community_id):
             abort(401, message=UNAUTHORIZED)
 
         return refuel, 200
@@ -38,7 +42,7 @@ class SingleRefuel(Resource):
         data = parser.parse_args()
 
         refuel = RefuelModel.find_by_id(id)
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
 
         if not refuel:
             abort(404, message=REFUEL_DOESNT_EXIST)
@@ -46,12 +50,14 @@ class SingleRefuel(Resource):
         if not user.id == refuel.owner.id:
             abort(401, message=UNAUTHORIZED)
 
-        if not refuel.community.id == community_id:
+        if not refuel.community_id == community_id:
             abort(400, message=CANT_CHANGE_REFUEL_COMMUNITY)
 
+        book_refuel(refuel, -1)
         refuel.costs = round(data['costs'], 2)
         refuel.liters = data['liters']
         refuel.gas_station_name = data['gas_station_name']
+        book_refuel(refuel)
         refuel.persist()
 
         return refuel, 200
@@ -64,7 +70,7 @@ class SingleRefuel(Resource):
         if not refuel:
             abort(404, message=REFUEL_DOESNT_EXIST)
 
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
 
         if not user.id == refuel.owner.id:
             abort(401, message=UNAUTHORIZED)
@@ -73,6 +79,7 @@ class SingleRefuel(Resource):
             abort(401, message=CANNOT_DELETE_A_REFUEL_THAT_IS_PART_OF_A_PAYOFF)
 
         try:
+            book_refuel(refuel, -1)
             RefuelModel.delete_by_id(id)
         except NoData:
             abort(404, message=REFUEL_DOESNT_EXIST)
@@ -82,19 +89,14 @@ class SingleRefuel(Resource):
 class AllRefuels(Resource):
 
     @jwt_required()
+    @community_member_required()
     @marshal_with(RefuelModel.get_marshaller())
     def post(self, community_id):
         data = parser.parse_args()
 
-        owner = UserModel.find_by_username(get_jwt_identity())
+        owner = get_current_user()
         community: CommunityModel = CommunityModel.find_by_id(community_id)
 
-        if not community:
-            abort(400, message=COMMUNIY_DOESNT_EXIST)
-
-        if owner.id not in [u.id for u in community.users]:
-            abort(401, message=UNAUTHORIZED)
-
         new_refuel = RefuelModel(
             owner=owner,
             community=community,
@@ -104,32 +106,29 @@ class AllRefuels(Resource):
         )
 
         try:
+            book_refuel(new_refuel)
             new_refuel.persist()
             return new_refuel, 201
         except:
             abort(500, message=INTERNAL_SERVER_ERROR)
 
     @jwt_required()
-    @marshal_with(RefuelModel.get_marshaller())
+    @community_member_required()
+    @fast_marshal_with(RefuelModel.get_marshaller())
     def get(self, community_id):
-
-        user = UserModel.find_by_username(get_jwt_identity())
-        community: CommunityModel = CommunityModel.find_by_id(community_id)
-
-        if not community:
-            abort(400, message=COMMUNIY_DOESNT_EXIST)
-
-        if user.id not in [u.id for u in community.users]:
-            abort(401, message=UNAUTHORIZED)
-
-        return RefuelModel.find_by_community(community.id), 200
+        limit, cursor = get_pagination_args()
+        refuels = RefuelModel.find_by_community(community_id, options=RefuelModel.get_load_options(), limit=limit,
+                                                cursor=cursor)
+        return refuels, 200, get_next_cursor_headers(refuels, limit, 'time_created')
 
 
 class UserRefuels(Resource):
 
     @jwt_required()
-    @marshal_with(RefuelModel.get_marshaller())
+    @fast_marshal_with(RefuelModel.get_marshaller())
     def get(self):
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
+        limit, cursor = get_pagination_args()
 
-        return RefuelModel.find_by_user(user.id), 200
+        refuels = RefuelModel.find_by_user(user.id, options=RefuelModel.get_load_options(), limit=limit, cursor=cursor)
+        return refuels, 200, get_next_cursor_headers(refuels, limit, 'time_created')
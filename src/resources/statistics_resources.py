@@ -1,58 +1,66 @@
 import datetime
 
 import pytz
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import current_app
+from flask_jwt_extended import jwt_required
 from flask_restful import Resource, marshal_with, abort
 
 from src.messages.messages import COMMUNIY_DOESNT_EXIST, UNAUTHORIZED
 from src.models.community import CommunityModel
-from src.models.community_statistic import CommunityStatisticModel, KmPerUserModel, CostsPerUserModel
+from src.models.community_ledger import CommunityLedgerModel
+from src.models.community_statistic import CommunityStatisticModel
 from src.models.payoff import PayoffModel
-from src.models.refuel import RefuelModel
-from src.models.tour import TourModel
-from src.models.user import UserModel
+from src.util.community_statistic import create_empty_statistic, add_community_statistic
+from src.util.current_user import get_current_user
+from src.util.membership import is_community_member
 from src.util.parser_types import moment
+from src.util.replica import read_from_replica
 
 
-def get_community_statistic(community_id, from_datetime, to_datetime):
+def get_authorized_community(community_id) -> CommunityModel:
+    """
+    Returns the community if the current user is a member of it, aborts otherwise.
+    :param community_id: ID of the community.
+    :return: Community.
+    """
     community: CommunityModel = CommunityModel.find_by_id(community_id)
 
     if not community:
         abort(404, message=COMMUNIY_DOESNT_EXIST)
 
-    user = UserModel.find_by_username(get_jwt_identity())
+    user = get_current_user()
 
-    community_member_ids = [m.id for m in community.users]
-    if user.id not in community_member_ids:
+    if not is_community_member(user.id, community_id):
         abort(401, message=UNAUTHORIZED)
 
-    statistic = CommunityStatisticModel()
-    statistic.community = community
-    statistic.statistic_start = from_datetime
-    statistic.statistic_end = to_datetime
-
-    all_tours = TourModel.find_finished_by_community(community_id)
-    all_costs = RefuelModel.find_by_community(community_id)
-    km_per_user_dict = {}
-    costs_per_user_dict = {}
-    for user in community.users:
-        km_per_user_dict[user.id] = KmPerUserModel()
-        km_per_user_dict[user.id].user = user
-        statistic.km_per_user.append(km_per_user_dict[user.id])
-        costs_per_user_dict[user.id] = CostsPerUserModel()
-        costs_per_user_dict[user.id].user = user
-        statistic.costs_per_user.append(costs_per_user_dict[user.id])
-    for tour in all_tours:
-        if from_datetime <= tour.end_time.astimezone(pytz.utc) <= to_datetime:
-            tour_km = tour.end_km - tour.start_km
-            km_per_user_dict[tour.owner_id].km += tour_km
-            # Divide km of passengers
-            all_passengers_ids = [tour.owner_id] + [passenger.id for passenger in tour.passengers]
-            for passenger_id in all_passengers_ids:
-                km_per_user_dict[passenger_id].km_accounted_for_passengers += tour_km / len(all_passengers_ids)
-    for cost in all_costs:
-        if from_datetime <= cost.time_created.astimezone(pytz.utc) <= to_datetime:
-            costs_per_user_dict[cost.owner_id].costs += cost.costs
+    return community
+
+
+def get_community_statistic(community_id, from_datetime, to_datetime):
+    """
+    Creates the statistic of all tours and refuels in the given interval.
+    """
+    community = get_authorized_community(community_id)
+    statistic, km_per_user_dict, costs_per_user_dict = create_empty_statistic(community, from_datetime, to_datetime)
+
+    add_community_statistic(community_id, km_per_user_dict, costs_per_user_dict, from_datetime, to_datetime,
+                            current_app.config['COMMUNITY_STATISTIC_MODE'])
+
+    return statistic
+
+
+def get_open_community_statistic(community_id, from_datetime, to_datetime):
+    """
+    Creates the statistic of all tours and refuels that are not part of a payoff yet from the community ledger.
+    """
+    community = get_authorized_community(community_id)
+    statistic, km_per_user_dict, costs_per_user_dict = create_empty_statistic(community, from_datetime, to_datetime)
+
+    for entry in CommunityLedgerModel.find_by_community(community_id):
+        if entry.user_id in km_per_user_dict:
+            km_per_user_dict[entry.user_id].km = entry.open_km
+            km_per_user_dict[entry.user_id].km_accounted_for_passengers = entry.open_km_accounted_for_passengers
+            costs_per_user_dict[entry.user_id].costs = entry.open_costs
 
     return statistic
 
@@ -60,6 +68,7 @@ def get_community_statistic(community_id, from_datetime, to_datetime):
 class GetCommunityStatistic(Resource):
 
     @jwt_required()
+    @read_from_replica
     @marshal_with(CommunityStatisticModel.get_marshaller())
     def get(self, community_id, from_datetime, to_datetime):
         return get_community_statistic(community_id, moment(from_datetime), moment(to_datetime)), 200
@@ -68,6 +77,7 @@ class GetCommunityStatistic(Resource):
 class GetCommunityStatisticCurrentPayoffIntervall(Resource):
 
     @jwt_required()
+    @read_from_replica
     @marshal_with(CommunityStatisticModel.get_marshaller())
     def get(self, community_id):
         latest_payoff = PayoffModel.find_latest_by_community(community_id)
@@ -78,4 +88,4 @@ class GetCommunityStatisticCurrentPayoffIntervall(Resource):
             from_datetime = latest_payoff.time_created.astimezone(pytz.utc)
         to_datetime = datetime.datetime.now().astimezone(pytz.utc)
 
-        return get_community_statistic(community_id, from_datetime, to_datetime), 200
+        return get_open_community_statistic(community_id, from_datetime, to_datetime), 200
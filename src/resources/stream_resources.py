@@ -0,0 +1,23 @@
+from flask import current_app, Response
+from flask_jwt_extended import jwt_required
+from flask_restful import Resource
+
+from src.util.community_stream import get_community_channel, generate_community_stream
+from src.util.membership import community_member_required
+from src.util.pubsub import pubsub_hub
+
+
+class CommunityStream(Resource):
+
+    # EventSource can't set headers, so the access token may be passed as `jwt` query parameter
+    @jwt_required(locations=['headers', 'query_string'])
+    @community_member_required()
+    def get(self, community_id):
+        subscription = pubsub_hub.subscribe(get_community_channel(community_id))
+        response = Response(generate_community_stream(subscription,
+                                                      current_app.config['STREAM_KEEPALIVE_INTERVAL'],
+                                                      current_app.config['STREAM_MAX_DURATION']),
+                            mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        response.call_on_close(subscription.close)
+        return response
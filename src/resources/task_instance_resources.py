@@ -1,97 +1,129 @@
+import time
 from datetime import datetime
-from typing import List
+from decimal import Decimal
 
 import pytz
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from flask_restful import Resource, marshal_with, abort
 
-from src.app import app
+from src.app import app, db
 from src.messages.messages import UNAUTHORIZED
-from src.models.community import CommunityModel
 from src.models.task import TaskModel
 from src.models.task_instance import TaskInstanceModel
-from src.models.user import UserModel
+from src.util.background_queue import defer_after_commit
+from src.util.community_version import community_etag
+from src.util.current_user import get_current_user
+from src.util.membership import community_member_required, is_community_member
+
+
+def create_due_km_triggered_task_instances(community_id, km):
+    """
+    Creates one task instance for every recurring km triggered task of the community that is due at the given km clock
+    and advances the next instance km of these tasks. Doesn't commit the session.
+    :param community_id: Community to create the task instances for.
+    :param km: Current km clock.
+    :return: Number of created task instances.
+    """
+    km = Decimal(str(round(float(km), 1)))
+    due_tasks = TaskModel.find_due_km_triggered(community_id, km)
+
+    km_next_instances = {}
+    for task in due_tasks:
+        km_next_instance = task.km_next_instance + task.km_interval
+        km_next_instances[task.id] = km_next_instance if km_next_instance > km else km + 1
+
+    db.session.add_all([TaskInstanceModel(task_id=task.id, community_id=community_id, km_created_at=km, is_open=True)
+                        for task in due_tasks])
+    db.session.flush()
+    TaskModel.update_km_next_instances(km_next_instances)
+    return len(due_tasks)
+
+
+def commit_due_km_triggered_task_instances(community_id, km):
+    create_due_km_triggered_task_instances(community_id, km)
+    db.session.commit()
 
 
 def create_km_triggered_task_instances(community_id, km):
     """
-    Checks if there are new task instances that have to be created and creates them.
+    Creates the task instances of the km triggered tasks that are due at the given km clock in the current transaction.
+    With `KM_TRIGGERED_TASKS_DEFERRED` they are created in the background after the current transaction was committed
+    instead, tasks that are missed this way are caught up on the next finished tour. Doesn't commit the session.
     :param community_id: Community to check the task instance creation for.
     :param km: Current km clock.
     """
-    tasks = TaskModel.find_by_community(community_id)
-
-    # Iterate over all km triggered tasks
-    for task in [t for t in tasks if t.km_interval]:
-
-        try:
-            # If current km are higher then trigger, add a new task instance
-            if km >= task.km_next_instance:
-                # Create and persist task instance
-                new_task_instance = TaskInstanceModel()
-                new_task_instance.task = task
-                new_task_instance.km_created_at = km
-                new_task_instance.is_open = True
-                new_task_instance.community = task.community
-                new_task_instance.persist()
-
-                # Update km trigger and persist task
-                task.km_next_instance += task.km_interval
-                if task.km_next_instance <= km:
-                    task.km_next_instance = km + 1
-                task.persist()
-        except:
-            # Don't fail on all just because one instance is bad
-            pass
+    if app.config['KM_TRIGGERED_TASKS_DEFERRED']:
+        defer_after_commit(commit_due_km_triggered_task_instances, community_id, km)
+    else:
+        create_due_km_triggered_task_instances(community_id, km)
 
 
-def create_time_triggered_task_instances():
+def get_next_instance_time(time_next_instance, time_interval, now):
     """
-    Checks if there are new task instances that have to be created and creates them.
+    Advances the next instance time of a task by as many whole intervals as needed to lie after now, so tasks that are
+    overdue by multiple intervals keep their schedule.
+    :param time_next_instance: Due next instance time.
+    :param time_interval: Interval of the task.
+    :param now: Current UTC time.
+    :return: Tuple of the new next instance time and the number of intervals it was advanced by.
     """
-    with app.app_context():
-        tasks = TaskModel.return_all()
+    intervals = (now - time_next_instance) // time_interval + 1
+    return time_next_instance + intervals * time_interval, intervals
 
-        # Iterate over all time triggered tasks
-        for task in [t for t in tasks if t.time_interval]:
 
-            try:
-                # If current time is higher then trigger, add a new task instance
-                now = datetime.now(pytz.utc)
-                then = task.time_next_instance.replace(tzinfo=pytz.utc)
+def create_due_time_triggered_task_instances(now):
+    """
+    Creates one task instance for every recurring time triggered task that is due and advances the next instance times
+    of these tasks. Tasks that are overdue by multiple intervals get a single instance. Doesn't commit the session.
+    :param now: Current UTC time.
+    :return: Tuple of the number of created instances and the number of skipped intervals of overdue tasks.
+    """
+    due_tasks = TaskModel.find_due_time_triggered(now)
 
-                if now >= then:
-                    # Create and persist task instance
-                    new_task_instance = TaskInstanceModel()
-                    new_task_instance.task = task
-                    new_task_instance.is_open = True
-                    new_task_instance.community = task.community
-                    new_task_instance.persist()
+    time_next_instances = {}
+    skipped_intervals = 0
+    for task in due_tasks:
+        time_next_instances[task.id], intervals = get_next_instance_time(task.time_next_instance, task.time_interval,
+                                                                         now)
+        skipped_intervals += intervals - 1
 
-                    # Update time trigger and persist task
-                    task.time_next_instance = now + task.time_interval
-                    task.persist()
-            except:
-                # Don't fail on all just because one instance is bad
-                pass
+    # The instances are inserted in batches by a single flush
+    db.session.add_all([TaskInstanceModel(task_id=task.id, community_id=task.community_id, is_open=True)
+                        for task in due_tasks])
+    db.session.flush()
+    TaskModel.update_time_next_instances(time_next_instances)
+    return len(due_tasks), skipped_intervals
+
+
+def create_time_triggered_task_instances():
+    """
+    Creates the task instances of all due time triggered tasks.
+    :return: Dict with the number of created instances, skipped intervals and the duration in ms.
+    """
+    with app.app_context():
+        started = time.perf_counter()
+        created_instances, skipped_intervals = create_due_time_triggered_task_instances(datetime.utcnow())
+        db.session.commit()
+
+        result = {
+            'created_instances': created_instances,
+            'skipped_intervals': skipped_intervals,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 1)
+        }
+        app.logger.info('Created {created_instances} time triggered task instances in {duration_ms} ms, skipped '
+                        '{skipped_intervals} intervals of overdue tasks'.format(**result))
+        return result
 
 
 class GetOpenCommunityTaskInstances(Resource):
 
     @jwt_required()
+    @community_member_required()
+    @community_etag()
     @marshal_with(TaskInstanceModel.get_marshaller())
     def get(self, community_id):
-        community: CommunityModel = CommunityModel.find_by_id(community_id)
-        community_member_ids = [m.id for m in community.users]
-        user = UserModel.find_by_username(get_jwt_identity())
-
-        if user.id not in community_member_ids:
-            abort(401, message=UNAUTHORIZED)
-
-        task_instances: List[TaskInstanceModel] = TaskInstanceModel.find_by_community(community_id)
-        open_task_instances = [i for i in task_instances if i.is_open]
-
-        return open_task_instances, 200
+        return TaskInstanceModel.find_open_by_community(
+            community_id, options=TaskInstanceModel.get_load_options()), 200
 
 
 class GetOpenAccountTaskInstances(Resource):
@@ -99,16 +131,9 @@ class GetOpenAccountTaskInstances(Resource):
     @jwt_required()
     @marshal_with(TaskInstanceModel.get_marshaller())
     def get(self):
-        user = UserModel.find_by_username(get_jwt_identity())
-        all_communities = CommunityModel.return_all()
-        user_communities = [c for c in all_communities if user.id in [u.id for u in c.users]]
-
-        task_instances = []
-        for c in user_communities:
-            task_instances += TaskInstanceModel.find_by_community(c.id)
-        open_task_instances = [i for i in task_instances if i.is_open]
+        user = get_current_user()
 
-        return open_task_instances, 200
+        return TaskInstanceModel.find_open_by_user(user.id, options=TaskInstanceModel.get_load_options()), 200
 
 
 class FinishTaskInstances(Resource):
@@ -116,11 +141,10 @@ class FinishTaskInstances(Resource):
     @jwt_required()
     @marshal_with(TaskInstanceModel.get_marshaller())
     def put(self, task_instance_id):
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
         task_instance: TaskInstanceModel = TaskInstanceModel.find_by_id(task_instance_id)
 
-        community_member_ids = [m.id for m in task_instance.community.users]
-        if user.id not in community_member_ids:
+        if not is_community_member(user.id, task_instance.community_id):
             abort(401, message=UNAUTHORIZED)
 
         task_instance.is_open = False
@@ -2,18 +2,19 @@ from datetime import timedelta, datetime
 from typing import List
 
 import pytz
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from flask_restful import Resource, marshal_with, reqparse, abort
 
 from src.messages.marshalling_objects import SimpleMessage
-from src.messages.messages import COMMUNIY_DOESNT_EXIST, UNAUTHORIZED, TASK_MUST_BE_EITHER_TIME_OR_KM_TRIGGERED, \
+from src.messages.messages import UNAUTHORIZED, TASK_MUST_BE_EITHER_TIME_OR_KM_TRIGGERED, \
     INTERNAL_SERVER_ERROR, TASK_DOESNT_EXIST, TASK_DELETED, TASK_KM_NEXT_INSTANCE_MUST_BE_HIGHER_THEN_CURRENT_KM, \
     TASK_TIME_NEXT_INSTANCE_MUST_BE_HIGHER_THEN_CURRENT_TIME, NON_REOCURRENT_TASKS_CANNOT_BE_UPDATED
 from src.models.community import CommunityModel
 from src.models.task import TaskModel
 from src.models.task_instance import TaskInstanceModel
 from src.models.tour import TourModel
-from src.models.user import UserModel
+from src.util.current_user import get_current_user
+from src.util.membership import community_member_required, is_community_member
 from src.util.parser_types import moment
 
 
@@ -26,7 +27,7 @@ def set_km_to_next_instance(tasks):
     if not is_list:
         tasks = [tasks]
     if len(tasks) > 0:
-        latest_tour = TourModel.find_newest_tour_for_community(tasks[0].community.id)
+        latest_tour = TourModel.find_newest_tour_for_community(tasks[0].community_id)
         for task in tasks:
             if task.km_next_instance:
                 task.km_to_next_instance = task.km_next_instance - latest_tour.end_km
@@ -35,6 +36,7 @@ def set_km_to_next_instance(tasks):
 class CreateTask(Resource):
 
     @jwt_required()
+    @community_member_required()
     @marshal_with(TaskModel.get_marshaller())
     def post(self, community_id):
         parser = reqparse.RequestParser()
@@ -47,15 +49,8 @@ class CreateTask(Resource):
         parser.add_argument('is_reocurrent', type=bool, required=True)
         data = parser.parse_args()
 
-        owner = UserModel.find_by_username(get_jwt_identity())
+        owner = get_current_user()
         community: CommunityModel = CommunityModel.find_by_id(community_id)
-        community_member_ids = [m.id for m in community.users]
-
-        if not community:
-            abort(400, message=COMMUNIY_DOESNT_EXIST)
-
-        if owner.id not in community_member_ids:
-            abort(401, message=UNAUTHORIZED)
 
         if data['is_reocurrent'] and (
                 not (data['time_next_instance'] and data['time_interval'] or data['km_interval'] and data[
@@ -125,10 +120,9 @@ class UpdateTask(Resource):
         if not task.is_reocurrent:
             abort(401, message=NON_REOCURRENT_TASKS_CANNOT_BE_UPDATED)
 
-        community_member_ids = [m.id for m in task.community.users]
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
 
-        if user.id not in community_member_ids:
+        if not is_community_member(user.id, task.community_id):
             abort(401, message=UNAUTHORIZED)
 
         if not (data['time_next_instance'] and data['time_interval'] or data['km_interval'] and data[
@@ -166,10 +160,9 @@ class GetTask(Resource):
         if not task:
             abort(404, message=TASK_DOESNT_EXIST)
 
-        community_member_ids = [m.id for m in task.community.users]
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
 
-        if user.id not in community_member_ids:
+        if not is_community_member(user.id, task.community_id):
             abort(401, message=UNAUTHORIZED)
 
         set_km_to_next_instance(task)
@@ -180,16 +173,11 @@ class GetTask(Resource):
 class GetCommunityTasks(Resource):
 
     @jwt_required()
+    @community_member_required()
     @marshal_with(TaskModel.get_marshaller())
     def get(self, community_id):
-        tasks: List[TaskModel] = TaskModel.find_by_community(community_id)
-        community: CommunityModel = CommunityModel.find_by_id(community_id)
-        community_member_ids = [m.id for m in community.users]
-        user = UserModel.find_by_username(get_jwt_identity())
-
-        if user.id not in community_member_ids:
-            abort(401, message=UNAUTHORIZED)
-
+        tasks: List[TaskModel] = TaskModel.find_by_community(
+            community_id, options=TaskModel.get_load_options())
         set_km_to_next_instance(tasks)
 
         return tasks, 200
@@ -206,10 +194,9 @@ class DeleteTask(Resource):
         if not task:
             abort(400, message=TASK_DOESNT_EXIST)
 
-        community_member_ids = [m.id for m in task.community.users]
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
 
-        if user.id not in community_member_ids:
+        if not is_community_member(user.id, task.community_id):
             abort(401, message=UNAUTHORIZED)
 
         try:
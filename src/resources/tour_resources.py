@@ -2,12 +2,12 @@ import datetime
 
 import numpy as np
 import pytz
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from flask_restful import Resource, marshal_with, reqparse, abort
 
 from src.exceptions.no_data import NoData
 from src.messages.marshalling_objects import SimpleMessage
-from src.messages.messages import INTERNAL_SERVER_ERROR, COMMUNIY_DOESNT_EXIST, UNAUTHORIZED, \
+from src.messages.messages import INTERNAL_SERVER_ERROR, UNAUTHORIZED, \
     CANT_START_TOUR_WHEN_HAVING_UNFINISHED_TOURS_IN_COMMUNITY, TOUR_NOT_FOUND, TOUR_HAS_ALREADY_BEEN_FINISHED, \
     CANNOT_UPDATE_SENSITIVE_TOUR_DATA_WHEN_TOUR_IS_ALREADY_PAYED_FOR, \
     TOUR_DELETED, \
@@ -15,8 +15,14 @@ from src.messages.messages import INTERNAL_SERVER_ERROR, COMMUNIY_DOESNT_EXIST,
     PASSENGER_LIST_CANNOT_BE_CHANGED_WHEN_FORCE_FINISHING_A_TOUR, END_KM_MUST_BE_GREATER_START_KM
 from src.models.community import CommunityModel
 from src.models.tour import TourModel
-from src.models.user import UserModel
 from src.resources.task_instance_resources import create_km_triggered_task_instances
+from src.util.bookkeeping import book_tour
+from src.util.community_version import community_etag
+from src.util.current_user import get_current_user
+from src.util.fast_marshal import fast_marshal_with
+from src.util.membership import community_member_required, is_community_member, find_community_members
+from src.util.pagination import get_pagination_args, get_next_cursor_headers
+from src.util.replica import read_from_replica
 
 parser = reqparse.RequestParser()
 parser.add_argument('start_km', help='This field cannot be blank', required=True, type=float)
@@ -47,9 +53,7 @@ class FinishTour(Resource):
         data = finish_tour_parser.parse_args()
 
         tour = TourModel.find_by_id(id)
-        user = UserModel.find_by_username(get_jwt_identity())
-        community: CommunityModel = CommunityModel.find_by_id(community_id)
-        community_member_ids = [m.id for m in community.users]
+        user = get_current_user()
 
         if not tour:
             abort(404, message=TOUR_NOT_FOUND)
@@ -60,22 +64,18 @@ class FinishTour(Resource):
         if tour.end_km:
             abort(400, message=TOUR_HAS_ALREADY_BEEN_FINISHED)
 
-        passengers = []
-        if data['passengers']:
-            for passenger_id in set(data['passengers']):
-                if passenger_id not in community_member_ids:
-                    abort(400, message=PASSENGERS_MUST_BE_COMMUNITY_MEMBERS)
-                else:
-                    passengers.append([u for u in community.users if u.id == passenger_id][0])
+        passengers = find_community_members(community_id, data['passengers'])
+        if passengers is None:
+            abort(400, message=PASSENGERS_MUST_BE_COMMUNITY_MEMBERS)
 
         tour.end_time = datetime.datetime.now(pytz.utc)
         tour.passengers = passengers
         tour.end_km = data['end_km']
         tour.comment = data['comment']
         tour.parking_position = data['parking_position']
-        tour.persist()
-
+        book_tour(tour)
         create_km_triggered_task_instances(community_id, tour.end_km)
+        tour.persist()
 
         return tour, 200
 
@@ -88,7 +88,7 @@ class ForceFinishTour(Resource):
         data = finish_tour_parser.parse_args()
 
         tour = TourModel.find_by_id(id)
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
 
         if not tour:
             abort(404, message=TOUR_NOT_FOUND)
@@ -96,10 +96,10 @@ class ForceFinishTour(Resource):
         if user.id == tour.owner.id:
             abort(401, message=UNAUTHORIZED)
 
-        if community_id != tour.community.id:
+        if community_id != tour.community_id:
             abort(401, message=UNAUTHORIZED)
 
-        if user.id not in [u.id for u in tour.community.users]:
+        if not is_community_member(user.id, tour.community_id):
             abort(401, message=UNAUTHORIZED)
 
         if tour.end_km:
@@ -117,9 +117,9 @@ class ForceFinishTour(Resource):
         tour.parking_position = data['parking_position']
         tour.is_force_finished = True
         tour.force_finished_by = user
-        tour.persist()
-
+        book_tour(tour)
         create_km_triggered_task_instances(community_id, tour.end_km)
+        tour.persist()
 
         return tour, 200
 
@@ -132,9 +132,7 @@ class SingleTour(Resource):
         data = edit_tour_parser.parse_args()
 
         tour = TourModel.find_by_id(id)
-        user = UserModel.find_by_username(get_jwt_identity())
-        community: CommunityModel = CommunityModel.find_by_id(community_id)
-        community_member_ids = [m.id for m in community.users]
+        user = get_current_user()
 
         if not tour:
             abort(404, message=TOUR_NOT_FOUND)
@@ -142,13 +140,9 @@ class SingleTour(Resource):
         if not user.id == tour.owner.id:
             abort(401, message=UNAUTHORIZED)
 
-        passengers = []
-        if data['passengers']:
-            for passenger_id in set(data['passengers']):
-                if passenger_id not in community_member_ids:
-                    abort(400, message=PASSENGERS_MUST_BE_COMMUNITY_MEMBERS)
-                else:
-                    passengers.append([u for u in community.users if u.id == passenger_id][0])
+        passengers = find_community_members(community_id, data['passengers'])
+        if passengers is None:
+            abort(400, message=PASSENGERS_MUST_BE_COMMUNITY_MEMBERS)
 
         tour.comment = data['comment']
         tour.parking_position = data['parking_position']
@@ -158,9 +152,11 @@ class SingleTour(Resource):
         else:
             if data['end_km'] <= data['start_km']:
                 abort(400, message=END_KM_MUST_BE_GREATER_START_KM)
+            book_tour(tour, -1)
             tour.end_km = data['end_km']
             tour.start_km = data['start_km']
             tour.passengers = passengers
+            book_tour(tour)
 
         tour.persist()
 
@@ -171,7 +167,7 @@ class SingleTour(Resource):
     def delete(self, community_id, id):
 
         tour = TourModel.find_by_id(id)
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
 
         if not tour:
             abort(404, message=TOUR_NOT_FOUND)
@@ -180,6 +176,7 @@ class SingleTour(Resource):
             abort(401, message=UNAUTHORIZED)
 
         try:
+            book_tour(tour, -1)
             TourModel.delete_by_id(id)
         except NoData:
             abort(404, message=TOUR_NOT_FOUND)
@@ -190,12 +187,12 @@ class SingleTour(Resource):
     def get(self, community_id, id):
 
         tour = TourModel.find_by_id(id)
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
 
         if not tour:
             abort(404, message=TOUR_NOT_FOUND)
 
-        if user.id not in [u.id for u in tour.community.users]:
+        if not is_community_member(user.id, tour.community_id):
             abort(401, message=UNAUTHORIZED)
 
         return tour, 200
@@ -204,30 +201,20 @@ class SingleTour(Resource):
 class AllTours(Resource):
 
     @jwt_required()
+    @community_member_required()
     @marshal_with(TourModel.get_marshaller())
     def post(self, community_id):
         data = parser.parse_args()
 
-        owner = UserModel.find_by_username(get_jwt_identity())
+        owner = get_current_user()
         community: CommunityModel = CommunityModel.find_by_id(community_id)
-        community_member_ids = [m.id for m in community.users]
-
-        if not community:
-            abort(400, message=COMMUNIY_DOESNT_EXIST)
-
-        if owner.id not in community_member_ids:
-            abort(401, message=UNAUTHORIZED)
 
         if TourModel.find_running_by_community(community_id):
             abort(400, message=CANT_START_TOUR_WHEN_HAVING_UNFINISHED_TOURS_IN_COMMUNITY)
 
-        passengers = []
-        if data['passengers']:
-            for passenger_id in set(data['passengers']):
-                if passenger_id not in community_member_ids:
-                    abort(400, message=PASSENGERS_MUST_BE_COMMUNITY_MEMBERS)
-                else:
-                    passengers.append([u for u in community.users if u.id == passenger_id][0])
+        passengers = find_community_members(community_id, data['passengers'])
+        if passengers is None:
+            abort(400, message=PASSENGERS_MUST_BE_COMMUNITY_MEMBERS)
 
         new_tour = TourModel(
             owner=owner,
@@ -247,63 +234,48 @@ class AllTours(Resource):
 class CommunityTours(Resource):
 
     @jwt_required()
-    @marshal_with(TourModel.get_marshaller())
+    @read_from_replica
+    @community_member_required()
+    @fast_marshal_with(TourModel.get_marshaller())
     def get(self, community_id):
-
-        user = UserModel.find_by_username(get_jwt_identity())
-        community = CommunityModel.find_by_id(community_id)
-
-        if not community:
-            abort(400, message=COMMUNIY_DOESNT_EXIST)
-
-        if user.id not in [u.id for u in community.users]:
-            abort(401, message=UNAUTHORIZED)
-
-        return TourModel.find_finished_by_community(community_id), 200
+        limit, cursor = get_pagination_args()
+        tours = TourModel.find_finished_by_community(community_id, options=TourModel.get_load_options(), limit=limit,
+                                                     cursor=cursor)
+        return tours, 200, get_next_cursor_headers(tours, limit, 'end_time')
 
 
 class RunningCommunityTours(Resource):
 
     @jwt_required()
-    @marshal_with(TourModel.get_marshaller())
+    @read_from_replica
+    @community_member_required()
+    @community_etag()
+    @fast_marshal_with(TourModel.get_marshaller())
     def get(self, community_id):
-
-        user = UserModel.find_by_username(get_jwt_identity())
-        community = CommunityModel.find_by_id(community_id)
-
-        if not community:
-            abort(400, message=COMMUNIY_DOESNT_EXIST)
-
-        if user.id not in [u.id for u in community.users]:
-            abort(401, message=UNAUTHORIZED)
-
-        return TourModel.find_running_by_community(community_id), 200
+        return TourModel.find_running_by_community(community_id, options=TourModel.get_load_options()), 200
 
 
 class UserTours(Resource):
 
     @jwt_required()
-    @marshal_with(TourModel.get_marshaller())
+    @read_from_replica
+    @fast_marshal_with(TourModel.get_marshaller())
     def get(self):
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
+        limit, cursor = get_pagination_args()
 
-        return TourModel.find_finished_by_user(user.id), 200
+        tours = TourModel.find_finished_by_user(user.id, options=TourModel.get_load_options(), limit=limit,
+                                                cursor=cursor)
+        return tours, 200, get_next_cursor_headers(tours, limit, 'end_time')
 
 
 class LatestTour(Resource):
 
     @jwt_required()
+    @community_member_required()
+    @community_etag()
     @marshal_with(TourModel.get_marshaller())
     def get(self, community_id):
-        user = UserModel.find_by_username(get_jwt_identity())
-        community = CommunityModel.find_by_id(community_id)
-
-        if not community:
-            abort(400, message=COMMUNIY_DOESNT_EXIST)
-
-        if user.id not in [u.id for u in community.users]:
-            abort(401, message=UNAUTHORIZED)
-
         tour = TourModel.find_newest_tour_for_community(community_id)
 
         if not tour:
@@ -315,8 +287,9 @@ class LatestTour(Resource):
 class RunningUserTours(Resource):
 
     @jwt_required()
-    @marshal_with(TourModel.get_marshaller())
+    @read_from_replica
+    @fast_marshal_with(TourModel.get_marshaller())
     def get(self):
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
 
-        return TourModel.find_running_by_user(user.id), 200
+        return TourModel.find_running_by_user(user.id, options=TourModel.get_load_options()), 200
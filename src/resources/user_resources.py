@@ -7,6 +7,9 @@ from src.messages.messages import NO_COMMUNITY_ID_GIVEN, COMMUNIY_DOESNT_EXIST,
 from src.models.community import CommunityModel
 from src.models.community_user_link import CommunityUserLinkModel
 from src.models.user import UserModel
+from src.util.current_user import get_current_user
+from src.util.membership import is_community_member
+from src.util.replica import read_from_replica
 
 parser = reqparse.RequestParser()
 parser.add_argument('username', help='This field cannot be blank', required=True, type=str)
@@ -26,6 +29,7 @@ class AllUsers(Resource):
 
 class UserSearch(Resource):
     @jwt_required()
+    @read_from_replica
     @marshal_with(UserModel.get_marshaller())
     def get(self):
         data = search_parser.parse_args()
@@ -37,11 +41,10 @@ class UserSearch(Resource):
             if not data['community']:
                 abort(400, message=NO_COMMUNITY_ID_GIVEN)
 
-            community = CommunityModel.find_by_id(data['community'])
-            if not community:
+            if not CommunityModel.exists_by_id(data['community']):
                 abort(404, message=COMMUNIY_DOESNT_EXIST)
 
-            if username not in [u.username for u in community.users]:
+            if not is_community_member(get_current_user().id, data['community']):
                 abort(401, message=UNAUTHORIZED)
 
             invitations = CommunityUserLinkModel.find_by_community(data['community'])
@@ -56,7 +59,7 @@ class ChangePassword(Resource):
         password_parser.add_argument('old_password', help='This field cannot be blank', required=True, type=str)
         password_parser.add_argument('new_password', help='This field cannot be blank', required=True, type=str)
         data = password_parser.parse_args()
-        user = UserModel.find_by_username(get_jwt_identity())
+        user = get_current_user()
         if UserModel.verify_hash(data['old_password'], user.password):
             if len(data['new_password']) < 8:
                 abort(400, message=PASSWORD_TOO_SHORT)
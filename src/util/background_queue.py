@@ -0,0 +1,66 @@
+import queue
+import threading
+
+from sqlalchemy import event
+
+from src.app import app, db
+
+
+class BackgroundQueue:
+    """
+    Runs functions one after another in a daemon thread with their own app context. Functions are lost if the process
+    ends before they ran, so only work that is repeated anyways may be deferred.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def put(self, function, *args):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='background-queue', daemon=True)
+                self._thread.start()
+        self._queue.put((function, args))
+
+    def join(self):
+        """
+        Blocks until all functions that were put into the queue ran.
+        """
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            function, args = self._queue.get()
+            with app.app_context():
+                try:
+                    function(*args)
+                except Exception:
+                    app.logger.exception('Background function {} failed'.format(function.__name__))
+                    db.session.rollback()
+            self._queue.task_done()
+
+
+background_queue = BackgroundQueue()
+
+
+def defer_after_commit(function, *args):
+    """
+    Runs the function in the background queue once the current transaction was committed. Nothing is run if the
+    transaction is rolled back.
+    :param function: Function to run.
+    :param args: Arguments of the function.
+    """
+    db.session.info.setdefault('deferred_functions', []).append((function, args))
+
+
+@event.listens_for(db.session, 'after_commit')
+def put_deferred_functions(session):
+    for function, args in session.info.pop('deferred_functions', []):
+        background_queue.put(function, *args)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def discard_deferred_functions(session, previous_transaction):
+    session.info.pop('deferred_functions', None)
@@ -0,0 +1,217 @@
+import datetime
+from collections import defaultdict, OrderedDict
+from decimal import Decimal
+
+import numpy as np
+
+from src.app import db
+from src.models.community_daily_statistic import CommunityDailyStatisticModel
+from src.models.community_ledger import CommunityLedgerModel
+from src.models.refuel import RefuelModel
+from src.models.tour import TourModel
+from src.models.tour_passenger_link import TourPassengerLinkModel
+from src.util.payoff_calculation import calculate_km_per_user
+
+
+def get_tour_bookings(tour: TourModel) -> dict:
+    """
+    Splits the km of a finished tour between its participants.
+    :param tour: Finished tour.
+    :return: Dict of user id to a tuple of driven km and km accounted for passengers.
+    """
+    km = Decimal(str(round(float(tour.end_km) - float(tour.start_km), 1)))
+    participant_ids = [tour.owner_id] + [p.id for p in tour.passengers]
+    km_per_participant = float(km) / len(participant_ids)
+
+    bookings = defaultdict(lambda: (Decimal(0), 0.0))
+    for participant_id in participant_ids:
+        driven_km, km_accounted_for_passengers = bookings[participant_id]
+        bookings[participant_id] = (driven_km, km_accounted_for_passengers + km_per_participant)
+    bookings[tour.owner_id] = (km, bookings[tour.owner_id][1])
+    return bookings
+
+
+def get_naive_local_time(value: datetime.datetime) -> datetime.datetime:
+    """
+    Converts aware datetimes to naive local time, the time the community statistic compares stored timestamps in.
+    Naive datetimes are returned as they are.
+    :param value: Datetime to convert.
+    :return: Naive datetime.
+    """
+    if value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+
+def get_tour_statistic_bookings(owner_id, km: Decimal, passenger_ids) -> dict:
+    """
+    Splits the km of a finished tour between its participants like the community statistic does, with decimal km
+    shares.
+    :param owner_id: Owner of the tour.
+    :param km: Driven km.
+    :param passenger_ids: Ids of the passengers.
+    :return: Dict of user id to a tuple of driven km and km accounted for passengers.
+    """
+    participant_ids = [owner_id] + list(passenger_ids)
+    km_per_participant = km / len(participant_ids)
+
+    bookings = defaultdict(lambda: (Decimal(0), Decimal(0)))
+    for participant_id in participant_ids:
+        driven_km, km_accounted_for_passengers = bookings[participant_id]
+        bookings[participant_id] = (driven_km, km_accounted_for_passengers + km_per_participant)
+    bookings[owner_id] = (km, bookings[owner_id][1])
+    return bookings
+
+
+def book_tour(tour: TourModel, sign: int = 1):
+    """
+    Books the km of a finished tour into the community ledger and daily statistics. Running tours are ignored. Has to
+    be called with sign -1 before a booked tour gets changed or deleted and with sign 1 after it was finished or
+    changed. Doesn't commit the session.
+    :param tour: Tour to book.
+    :param sign: 1 to add the tour, -1 to remove it.
+    """
+    if tour.end_km is None:
+        return
+    db.session.add(tour)
+    db.session.flush()
+
+    for user_id, (km, km_accounted_for_passengers) in get_tour_bookings(tour).items():
+        CommunityLedgerModel.book(
+            tour.community_id,
+            user_id,
+            km=sign * km,
+            km_accounted_for_passengers=sign * km_accounted_for_passengers,
+            is_open=bool(tour.is_open)
+        )
+
+    if tour.end_time is None:
+        return
+    end_time = tour.end_time
+    if end_time.tzinfo is not None:
+        # The column drops the time zone of aware values, the statistic modes compare the stored value
+        end_time = TourModel.find_end_time(tour.id)
+    day = end_time.date()
+    tour_km = Decimal(str(round(float(tour.end_km) - float(tour.start_km), 1)))
+    for user_id, (km, km_accounted_for_passengers) in \
+            get_tour_statistic_bookings(tour.owner_id, tour_km, [p.id for p in tour.passengers]).items():
+        CommunityDailyStatisticModel.book(
+            tour.community_id,
+            user_id,
+            day,
+            km=sign * km,
+            km_accounted_for_passengers=sign * km_accounted_for_passengers
+        )
+
+
+def book_refuel(refuel: RefuelModel, sign: int = 1):
+    """
+    Books the costs of a refuel into the community ledger and daily statistics. Has to be called with sign -1 before a
+    booked refuel gets changed or deleted and with sign 1 after it was created or changed. Doesn't commit the session.
+    :param refuel: Refuel to book.
+    :param sign: 1 to add the refuel, -1 to remove it.
+    """
+    db.session.add(refuel)
+    db.session.flush()
+
+    costs = sign * Decimal(str(round(float(refuel.costs), 2)))
+    CommunityLedgerModel.book(refuel.community_id, refuel.owner_id, costs=costs, is_open=bool(refuel.is_open))
+    CommunityDailyStatisticModel.book(refuel.community_id, refuel.owner_id,
+                                      get_naive_local_time(refuel.time_created).date(), costs=costs)
+
+
+def rebuild_community_ledger(community_id):
+    """
+    Rebuilds the ledger of a community from all its finished tours and refuels. Doesn't commit the session.
+    :param community_id: Community to rebuild the ledger for.
+    """
+    tours = TourModel.find_finished_km_by_community(community_id)
+    passenger_links = TourPassengerLinkModel.find_by_finished_tours_of_community(community_id)
+    refuels = RefuelModel.find_costs_by_community(community_id)
+
+    user_ids = list(OrderedDict.fromkeys(
+        [t.owner_id for t in tours] + [p.user_id for p in passenger_links] + [r.owner_id for r in refuels]))
+    user_indices = {user_id: index for index, user_id in enumerate(user_ids)}
+    tour_indices = {t.id: index for index, t in enumerate(tours)}
+
+    # Every tour owner and every passenger takes part in a tour
+    participant_tour_indices = np.array(
+        list(range(len(tours))) + [tour_indices[p.tour_id] for p in passenger_links], dtype=int)
+    participant_user_indices = np.array(
+        [user_indices[t.owner_id] for t in tours] + [user_indices[p.user_id] for p in passenger_links], dtype=int)
+    tour_km = np.array([float(t.km) for t in tours], dtype=float)
+    open_tour_km = np.where(np.array([bool(t.is_open) for t in tours], dtype=bool), tour_km, 0)
+    km_accounted_for_passengers = calculate_km_per_user(
+        len(user_ids), tour_km, participant_tour_indices, participant_user_indices)
+    open_km_accounted_for_passengers = calculate_km_per_user(
+        len(user_ids), open_tour_km, participant_tour_indices, participant_user_indices)
+
+    entries = [CommunityLedgerModel(
+        community_id=community_id,
+        user_id=user_id,
+        km=Decimal(0),
+        km_accounted_for_passengers=float(km_accounted_for_passengers[index]),
+        costs=Decimal(0),
+        open_km=Decimal(0),
+        open_km_accounted_for_passengers=float(open_km_accounted_for_passengers[index]),
+        open_costs=Decimal(0)
+    ) for index, user_id in enumerate(user_ids)]
+
+    for tour in tours:
+        entry = entries[user_indices[tour.owner_id]]
+        entry.km += tour.km
+        if tour.is_open:
+            entry.open_km += tour.km
+
+    for refuel in refuels:
+        entry = entries[user_indices[refuel.owner_id]]
+        entry.costs += refuel.costs
+        if refuel.is_open:
+            entry.open_costs += refuel.costs
+
+    CommunityLedgerModel.delete_by_community(community_id)
+    db.session.add_all(entries)
+
+
+def rebuild_community_daily_statistics(community_id):
+    """
+    Rebuilds the daily statistics of a community from all its finished tours and refuels. Doesn't commit the session.
+    :param community_id: Community to rebuild the daily statistics for.
+    """
+    passenger_ids = defaultdict(list)
+    for passenger_link in TourPassengerLinkModel.find_by_finished_tours_of_community(community_id):
+        passenger_ids[passenger_link.tour_id].append(passenger_link.user_id)
+
+    entries = {}
+
+    def get_entry(user_id, day) -> CommunityDailyStatisticModel:
+        if (user_id, day) not in entries:
+            entries[(user_id, day)] = CommunityDailyStatisticModel(
+                community_id=community_id,
+                user_id=user_id,
+                day=day,
+                km=Decimal(0),
+                km_accounted_for_passengers=Decimal(0),
+                costs=Decimal(0)
+            )
+        return entries[(user_id, day)]
+
+    for tour in TourModel.find_finished_km_by_community(community_id):
+        if tour.end_time is None:
+            continue
+        day = get_naive_local_time(tour.end_time).date()
+        tour_km = Decimal(str(round(float(tour.km), 1)))
+        for user_id, (km, km_accounted_for_passengers) in \
+                get_tour_statistic_bookings(tour.owner_id, tour_km, passenger_ids[tour.id]).items():
+            entry = get_entry(user_id, day)
+            entry.km += km
+            entry.km_accounted_for_passengers += km_accounted_for_passengers
+
+    for refuel in RefuelModel.find_costs_by_community(community_id):
+        if refuel.time_created is None:
+            continue
+        entry = get_entry(refuel.owner_id, get_naive_local_time(refuel.time_created).date())
+        entry.costs += Decimal(str(round(float(refuel.costs), 2)))
+
+    CommunityDailyStatisticModel.delete_by_community(community_id)
+    db.session.add_all(entries.values())
@@ -0,0 +1,135 @@
+import datetime
+
+from sqlalchemy.orm import selectinload
+
+from src.models.community_daily_statistic import CommunityDailyStatisticModel
+from src.models.community_statistic import CommunityStatisticModel, KmPerUserModel, CostsPerUserModel
+from src.models.refuel import RefuelModel
+from src.models.tour import TourModel
+from src.models.tour_passenger_link import TourPassengerLinkModel
+from src.util.bookkeeping import get_naive_local_time
+
+STATISTIC_MODE_ROLLUP = 'rollup'
+STATISTIC_MODE_SQL = 'sql'
+STATISTIC_MODE_PYTHON = 'python'
+
+
+def create_empty_statistic(community, from_datetime, to_datetime):
+    """
+    Creates a statistic with zero km and costs for every community member.
+    :return: Tuple of the statistic, a user id to KmPerUserModel dict and a user id to CostsPerUserModel dict.
+    """
+    statistic = CommunityStatisticModel()
+    statistic.community = community
+    statistic.statistic_start = from_datetime
+    statistic.statistic_end = to_datetime
+
+    km_per_user_dict = {}
+    costs_per_user_dict = {}
+    for user in community.users:
+        km_per_user_dict[user.id] = KmPerUserModel()
+        km_per_user_dict[user.id].user = user
+        statistic.km_per_user.append(km_per_user_dict[user.id])
+        costs_per_user_dict[user.id] = CostsPerUserModel()
+        costs_per_user_dict[user.id].user = user
+        statistic.costs_per_user.append(costs_per_user_dict[user.id])
+
+    return statistic, km_per_user_dict, costs_per_user_dict
+
+
+def add_community_statistic(community_id, km_per_user_dict, costs_per_user_dict, from_datetime, to_datetime,
+                            mode: str = STATISTIC_MODE_ROLLUP):
+    """
+    Adds the km and costs of all finished tours and refuels of the community in the given interval to the statistic.
+    Tours and refuels of users that aren't members of the community anymore are ignored.
+    :param community_id: Community to create the statistic for.
+    :param km_per_user_dict: User id to KmPerUserModel dict of the statistic.
+    :param costs_per_user_dict: User id to CostsPerUserModel dict of the statistic.
+    :param from_datetime: Start of the interval (inclusive).
+    :param to_datetime: End of the interval (inclusive).
+    :param mode: Implementation to use. Either `rollup` (default) to sum up the daily statistics, `sql` to aggregate
+                 the tours and refuels in the database or `python` to load and sum up all tours and refuels.
+    """
+    # Stored timestamps are naive, so the interval is converted instead of every timestamp
+    from_time = get_naive_local_time(from_datetime)
+    to_time = get_naive_local_time(to_datetime)
+
+    if mode == STATISTIC_MODE_ROLLUP:
+        add_daily_statistic_totals(community_id, km_per_user_dict, costs_per_user_dict, from_time, to_time)
+    elif mode == STATISTIC_MODE_SQL:
+        add_tour_and_refuel_totals(community_id, km_per_user_dict, costs_per_user_dict, from_time, to_time, True)
+    elif mode == STATISTIC_MODE_PYTHON:
+        add_tours_and_refuels(community_id, km_per_user_dict, costs_per_user_dict, from_time, to_time, True)
+    else:
+        raise ValueError('Unknown community statistic mode: {}'.format(mode))
+
+
+def add_daily_statistic_totals(community_id, km_per_user_dict, costs_per_user_dict, from_time, to_time):
+    """
+    Adds the km and costs of the community in the given interval to the statistic. Full days are summed up from the
+    daily statistics, the partial days at the edges of the interval from the tours and refuels themselves.
+    :param from_time: Start of the interval (inclusive) in naive local time.
+    :param to_time: End of the interval (inclusive) in naive local time.
+    """
+    first_day = from_time.date()
+    if from_time.time() != datetime.time.min:
+        first_day += datetime.timedelta(days=1)
+    last_day = to_time.date()
+
+    if first_day >= last_day:
+        add_tours_and_refuels(community_id, km_per_user_dict, costs_per_user_dict, from_time, to_time, True)
+        return
+
+    for totals in CommunityDailyStatisticModel.find_totals_by_community(community_id, first_day, last_day):
+        if totals.user_id in km_per_user_dict:
+            km_per_user_dict[totals.user_id].km += totals.km
+            km_per_user_dict[totals.user_id].km_accounted_for_passengers += totals.km_accounted_for_passengers
+            costs_per_user_dict[totals.user_id].costs += totals.costs
+    add_tours_and_refuels(community_id, km_per_user_dict, costs_per_user_dict,
+                          from_time, datetime.datetime.combine(first_day, datetime.time.min), False)
+    add_tours_and_refuels(community_id, km_per_user_dict, costs_per_user_dict,
+                          datetime.datetime.combine(last_day, datetime.time.min), to_time, True)
+
+
+def add_tour_and_refuel_totals(community_id, km_per_user_dict, costs_per_user_dict, from_time, to_time,
+                               include_to_time):
+    """
+    Adds the km and costs of the tours and refuels of the community in the given interval to the statistic. The sums
+    per user are calculated by the database.
+    :param from_time: Start of the interval (inclusive) in naive local time.
+    :param to_time: End of the interval in naive local time.
+    :param include_to_time: Include tours and refuels exactly at the end of the interval.
+    """
+    for totals in TourPassengerLinkModel.find_km_totals_by_community_and_end_time(community_id, from_time, to_time,
+                                                                                  include_to_time):
+        if totals.user_id in km_per_user_dict:
+            km_per_user_dict[totals.user_id].km += totals.km
+            km_per_user_dict[totals.user_id].km_accounted_for_passengers += totals.km_accounted_for_passengers
+    for totals in RefuelModel.find_cost_totals_by_community_and_time_created(community_id, from_time, to_time,
+                                                                            include_to_time):
+        if totals.owner_id in costs_per_user_dict:
+            costs_per_user_dict[totals.owner_id].costs += totals.costs
+
+
+def add_tours_and_refuels(community_id, km_per_user_dict, costs_per_user_dict, from_time, to_time, include_to_time):
+    """
+    Adds the km and costs of the tours and refuels of the community in the given interval to the statistic. All
+    tours and refuels are loaded and summed up one by one.
+    :param from_time: Start of the interval (inclusive) in naive local time.
+    :param to_time: End of the interval in naive local time.
+    :param include_to_time: Include tours and refuels exactly at the end of the interval.
+    """
+    tours = TourModel.find_finished_by_community_and_end_time(community_id, from_time, to_time, include_to_time,
+                                                              options=[selectinload(TourModel.passengers)])
+    for tour in tours:
+        tour_km = tour.end_km - tour.start_km
+        if tour.owner_id in km_per_user_dict:
+            km_per_user_dict[tour.owner_id].km += tour_km
+        # Divide km of passengers
+        all_passengers_ids = [tour.owner_id] + [passenger.id for passenger in tour.passengers]
+        for passenger_id in all_passengers_ids:
+            if passenger_id in km_per_user_dict:
+                km_per_user_dict[passenger_id].km_accounted_for_passengers += tour_km / len(all_passengers_ids)
+    for cost in RefuelModel.find_by_community_and_time_created(community_id, from_time, to_time, include_to_time):
+        if cost.owner_id in costs_per_user_dict:
+            costs_per_user_dict[cost.owner_id].costs += cost.costs
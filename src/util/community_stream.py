@@ -0,0 +1,129 @@
+import json
+import time
+
+from sqlalchemy import event, inspect
+
+from src.app import app, db
+from src.models.payoff import PayoffModel
+from src.models.refuel import RefuelModel
+from src.models.task_instance import TaskInstanceModel
+from src.models.tour import TourModel
+from src.util.pubsub import pubsub_hub, Subscription
+
+TOUR_STARTED = 'tour_started'
+TOUR_FINISHED = 'tour_finished'
+REFUEL_ADDED = 'refuel_added'
+PAYOFF_CREATED = 'payoff_created'
+TASK_INSTANCE_CREATED = 'task_instance_created'
+TASK_INSTANCE_FINISHED = 'task_instance_finished'
+
+
+def get_community_channel(community_id) -> str:
+    return 'communities/{}'.format(community_id)
+
+
+def get_changed_value(instance, attribute):
+    """
+    Returns the previous and the new value of a changed attribute.
+    :param instance: Mapped instance.
+    :param attribute: Name of the attribute.
+    :return: Tuple of the previous and the new value, None if the attribute wasn't changed.
+    """
+    history = inspect(instance).attrs[attribute].history
+    if not history.added:
+        return None
+    return history.deleted[0] if history.deleted else None, history.added[0]
+
+
+def get_community_events(session):
+    """
+    Collects the community events of the instances that are about to be flushed.
+    :return: List of (instance, event type) tuples.
+    """
+    community_events = []
+    for instance in session.new:
+        if isinstance(instance, TourModel):
+            event_type = TOUR_STARTED if instance.end_km is None else TOUR_FINISHED
+        elif isinstance(instance, RefuelModel):
+            event_type = REFUEL_ADDED
+        elif isinstance(instance, PayoffModel):
+            event_type = PAYOFF_CREATED
+        elif isinstance(instance, TaskInstanceModel):
+            event_type = TASK_INSTANCE_CREATED
+        else:
+            continue
+        community_events.append((instance, event_type))
+
+    for instance in session.dirty:
+        if isinstance(instance, TourModel):
+            end_km = get_changed_value(instance, 'end_km')
+            if end_km and end_km[0] is None and end_km[1] is not None:
+                community_events.append((instance, TOUR_FINISHED))
+        elif isinstance(instance, TaskInstanceModel):
+            is_open = get_changed_value(instance, 'is_open')
+            if is_open and is_open[0] and not is_open[1]:
+                community_events.append((instance, TASK_INSTANCE_FINISHED))
+    return community_events
+
+
+@event.listens_for(db.session, 'before_flush')
+def collect_community_events(session, flush_context, instances):
+    """
+    Remembers the community events of the instances that are about to be flushed. Their ids are only known after the
+    flush.
+    """
+    session.info['flushed_community_events'] = get_community_events(session)
+
+
+@event.listens_for(db.session, 'after_flush')
+def store_community_events(session, flush_context):
+    """
+    Stores the community events of the flushed instances until the transaction is committed.
+    """
+    community_events = [(instance.community_id, event_type, instance.id)
+                        for instance, event_type in session.info.pop('flushed_community_events', [])]
+    if community_events:
+        session.info.setdefault('community_events', []).extend(community_events)
+
+
+@event.listens_for(db.session, 'after_commit')
+def publish_community_events(session):
+    """
+    Publishes the community events of the committed transaction to the community channels.
+    """
+    for community_id, event_type, instance_id in session.info.pop('community_events', []):
+        try:
+            pubsub_hub.publish(get_community_channel(community_id),
+                               {'type': event_type, 'community_id': community_id, 'id': instance_id})
+        except Exception:
+            # Events are only hints for the clients, committed changes must not fail because of them
+            app.logger.exception('Publishing community event failed')
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def discard_community_events(session, previous_transaction):
+    session.info.pop('flushed_community_events', None)
+    session.info.pop('community_events', None)
+
+
+def format_server_sent_event(event_type, data) -> str:
+    return 'event: {}\ndata: {}\n\n'.format(event_type, json.dumps(data))
+
+
+def generate_community_stream(subscription: Subscription, keepalive_interval, max_duration):
+    """
+    Generates server-sent events from the community events of a subscription. A comment is sent if there were no
+    events for `keepalive_interval` seconds. The stream ends after `max_duration` seconds or when the subscription
+    was closed because the client fell behind, clients reconnect automatically and should reload the current state.
+    """
+    yield 'retry: 5000\n\n'
+    end_time = time.monotonic() + max_duration
+    while not subscription.is_closed:
+        remaining_time = end_time - time.monotonic()
+        if remaining_time <= 0:
+            return
+        message = subscription.get(min(keepalive_interval, remaining_time))
+        if message is None:
+            yield ': keepalive\n\n'
+        else:
+            yield format_server_sent_event(message['type'], message)
@@ -0,0 +1,112 @@
+from functools import wraps
+from itertools import chain
+
+from flask import request
+from flask_restful import unpack
+from sqlalchemy import event, inspect, update, select, or_
+from werkzeug.http import quote_etag
+from werkzeug.wrappers import Response
+
+from src.app import db
+from src.models.car import CarModel
+from src.models.community import CommunityModel
+from src.models.community_user_link import CommunityUserLinkModel
+from src.models.debt import DebtModel
+from src.models.event import EventModel
+from src.models.payoff import PayoffModel
+from src.models.refuel import RefuelModel
+from src.models.task import TaskModel
+from src.models.task_instance import TaskInstanceModel
+from src.models.tour import TourModel
+from src.models.user import UserModel
+
+# Models whose changes increment the version of the community they belong to
+COMMUNITY_DATA_MODELS = (TourModel, RefuelModel, PayoffModel, DebtModel, TaskModel, TaskInstanceModel, EventModel,
+                         CommunityUserLinkModel)
+
+
+def get_attribute_values(instance, attribute) -> set:
+    """
+    Returns the current and the previous value of an attribute without loading it.
+    :param instance: Mapped instance.
+    :param attribute: Name of the attribute.
+    :return: Set of values.
+    """
+    history = inspect(instance).attrs[attribute].history
+    return set(chain(history.added, history.unchanged, history.deleted))
+
+
+@event.listens_for(db.session, 'after_flush')
+def increment_changed_community_versions(session, flush_context):
+    """
+    Increments the versions of all communities whose data was changed by the flush in the same transaction. Besides
+    the community data itself, changes of cars and users that are part of marshalled community data are taken into
+    account.
+    """
+    community_ids, car_ids, user_ids = set(), set(), set()
+    # The session collections are computed on every access, so they are only accessed once
+    new, dirty = session.new, session.dirty
+    for instance in chain(new, dirty, session.deleted):
+        if instance in dirty and not session.is_modified(instance):
+            continue
+        if isinstance(instance, COMMUNITY_DATA_MODELS):
+            community_ids.update(get_attribute_values(instance, 'community_id'))
+        elif isinstance(instance, CommunityModel) and instance not in new:
+            community_ids.update(get_attribute_values(instance, 'id'))
+        elif isinstance(instance, CarModel) and instance not in new:
+            car_ids.update(get_attribute_values(instance, 'id'))
+        elif isinstance(instance, UserModel) and instance not in new:
+            user_ids.update(get_attribute_values(instance, 'id'))
+    community_ids.discard(None)
+    car_ids.discard(None)
+    user_ids.discard(None)
+
+    conditions = []
+    if community_ids:
+        conditions.append(CommunityModel.id.in_(community_ids))
+    if car_ids:
+        conditions.append(CommunityModel.car_id.in_(car_ids))
+    if user_ids:
+        conditions.append(CommunityModel.id.in_(select(CommunityUserLinkModel.community_id)
+                                                .where(CommunityUserLinkModel.user_id.in_(user_ids))))
+    if not conditions:
+        return
+
+    # time_updated is set explicitly so its onupdate default doesn't change the marshalled community
+    session.connection().execute(update(CommunityModel)
+                                 .where(or_(*conditions))
+                                 .values(version=CommunityModel.version + 1,
+                                         time_updated=CommunityModel.time_updated))
+
+
+def community_etag(argument='community_id'):
+    """
+    Decorator for community scoped resource methods that adds an ETag based on the community version to the response.
+    Requests with a matching `If-None-Match` header are answered with 304 without calling the resource method. Has to
+    be applied below the membership check and above the marshalling decorator.
+    :param argument: Name of the resource method argument that holds the community id.
+    """
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            community_id = kwargs[argument]
+            etag = '{}-{}'.format(community_id, CommunityModel.find_version(community_id))
+            headers = {'ETag': quote_etag(etag), 'Cache-Control': 'private, no-cache'}
+
+            if request.if_none_match.contains_weak(etag):
+                return Response(status=304, headers=headers)
+
+            resp = fn(*args, **kwargs)
+            if isinstance(resp, Response):
+                if resp.status_code == 200:
+                    resp.headers.extend(headers)
+                return resp
+            data, code, resp_headers = unpack(resp)
+            if code == 200:
+                resp_headers = dict(resp_headers or {}, **headers)
+            return data, code, resp_headers
+
+        return wrapper
+
+    return decorator
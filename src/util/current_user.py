@@ -0,0 +1,126 @@
+import threading
+import time
+
+from flask import current_app
+from flask_jwt_extended import get_current_user as get_loaded_user
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from src.app import db
+from src.models.user import UserModel
+from src.util.instrumentation import instrumentation
+
+
+class UserCache:
+    """
+    Short TTL process local cache of the column values of authenticated users, keyed by JWT identity.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.cache_hits = 0
+        self.accesses = 0
+
+    def get(self, identity, ttl):
+        """
+        Returns the cached column values of the user or None if there is no valid entry.
+        :param identity: JWT identity (username).
+        :param ttl: Max age of the entry in seconds.
+        """
+        with self._lock:
+            entry = self._entries.get(identity)
+        if entry and time.monotonic() - entry[0] < ttl:
+            return entry[1]
+        return None
+
+    def put(self, identity, user: UserModel):
+        """
+        Caches the column values of the user.
+        :param identity: JWT identity (username).
+        :param user: Loaded user.
+        """
+        values = {c.key: getattr(user, c.key) for c in inspect(UserModel).column_attrs}
+        with self._lock:
+            self._entries[identity] = (time.monotonic(), values)
+
+    def invalidate(self, identity):
+        with self._lock:
+            self._entries.pop(identity, None)
+
+    def count_lookup(self, cache_hit):
+        with self._lock:
+            self.lookups += 1
+            self.cache_hits += cache_hit
+
+    def count_access(self):
+        with self._lock:
+            self.accesses += 1
+
+    def get_statistics(self):
+        """
+        Returns how many users were loaded, how many of them were served from the cache and how often the resources
+        accessed the current user. Every access used to be a query of the user by the JWT identity, so the saved
+        queries are the accesses minus the queries of the loader. They are negative if more users are loaded than
+        accessed, e.g. by resources that only need the JWT identity.
+        """
+        with self._lock:
+            queries = self.lookups - self.cache_hits
+            return {
+                'lookups': self.lookups,
+                'cache_hits': self.cache_hits,
+                'queries': queries,
+                'accesses': self.accesses,
+                'saved_queries': self.accesses - queries
+            }
+
+
+user_cache = UserCache()
+
+
+def load_current_user(identity):
+    """
+    Loads the authenticated user. Gets called by flask-jwt-extended once per request, the result is available through
+    `get_current_user()` afterwards. If `CURRENT_USER_CACHE_TTL` is set, users are served from a process local cache
+    and merged into the session without a query.
+    :param identity: JWT identity (username).
+    :return: User or None if there is no user with this username.
+    """
+    ttl = current_app.config['CURRENT_USER_CACHE_TTL']
+
+    if ttl:
+        values = user_cache.get(identity, ttl)
+        if values:
+            user_cache.count_lookup(cache_hit=True)
+            user = UserModel(**values)
+            make_transient_to_detached(user)
+            return db.session.merge(user, load=False)
+
+    user_cache.count_lookup(cache_hit=False)
+    request_metrics = instrumentation.get_request_metrics()
+    if request_metrics is not None:
+        request_metrics.user_queries += 1
+    user = UserModel.find_by_username(identity)
+    if user and ttl:
+        user_cache.put(identity, user)
+    return user
+
+
+def get_current_user():
+    """
+    Returns the user loaded by `load_current_user` for the current request. Use this instead of the function of
+    flask-jwt-extended, so the accesses are counted for the instrumentation.
+    :return: Authenticated user.
+    """
+    user_cache.count_access()
+    request_metrics = instrumentation.get_request_metrics()
+    if request_metrics is not None:
+        request_metrics.user_accesses += 1
+    return get_loaded_user()
+
+
+@event.listens_for(UserModel, 'after_update')
+@event.listens_for(UserModel, 'after_delete')
+def invalidate_cached_user(mapper, connection, target: UserModel):
+    user_cache.invalidate(target.username)
@@ -0,0 +1,87 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+# Key of the read replica in `SQLALCHEMY_BINDS`
+REPLICA_BIND_KEY = 'replica'
+
+
+def uses_queue_pool(database_uri) -> bool:
+    """
+    Checks if the engine of a database uses a queue pool by default, e.g. Postgres and SQLite files, but not SQLite
+    in memory databases.
+    :param database_uri: Database URI.
+    :return: True if the default pool class of the dialect is a queue pool.
+    """
+    url = make_url(database_uri)
+    return issubclass(url.get_dialect().get_pool_class(url), QueuePool)
+
+
+def get_upsert_insert(dialect):
+    """
+    Returns the insert construct of a dialect that supports `on_conflict_do_update`.
+    :param dialect: Dialect of the database, e.g. `db.engine.dialect`.
+    :return: `insert` function of the Postgres or SQLite dialect.
+    """
+    if dialect.name == 'postgresql':
+        return postgresql.insert
+    if dialect.name == 'sqlite':
+        return sqlite.insert
+    raise NotImplementedError('Upserts are not supported for {}'.format(dialect.name))
+
+
+def configure_engine_options(app):
+    """
+    Maps the `DATABASE_*` config options to the `SQLALCHEMY_ENGINE_OPTIONS` of the app. Options that are already set in
+    `SQLALCHEMY_ENGINE_OPTIONS` take precedence. If `REPLICA_DATABASE_URI` is set, the replica is added to the
+    `SQLALCHEMY_BINDS` with the same options. Has to be called before the database is initialized.
+    :param app: Flask app.
+    """
+    config = app.config
+    add_engine_options(config, config['SQLALCHEMY_DATABASE_URI'], config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    if config['REPLICA_DATABASE_URI']:
+        replica_options = {'url': config['REPLICA_DATABASE_URI']}
+        add_engine_options(config, config['REPLICA_DATABASE_URI'], replica_options)
+        config.setdefault('SQLALCHEMY_BINDS', {})[REPLICA_BIND_KEY] = replica_options
+
+
+def add_engine_options(config, database_uri, engine_options):
+    """
+    Adds the `DATABASE_*` config options to the engine options of a database, unless they are already set.
+    :param config: App config.
+    :param database_uri: URI of the database.
+    :param engine_options: Engine options of the database, are changed in place.
+    """
+    engine_options.setdefault('pool_pre_ping', config['DATABASE_POOL_PRE_PING'])
+    engine_options.setdefault('pool_recycle', config['DATABASE_POOL_RECYCLE'])
+    if uses_queue_pool(database_uri):
+        engine_options.setdefault('pool_size', config['DATABASE_POOL_SIZE'])
+        engine_options.setdefault('max_overflow', config['DATABASE_MAX_OVERFLOW'])
+        engine_options.setdefault('pool_timeout', config['DATABASE_POOL_TIMEOUT'])
+
+    statement_timeout = config['DATABASE_STATEMENT_TIMEOUT']
+    if statement_timeout and make_url(database_uri).get_backend_name() == 'postgresql':
+        connect_args = engine_options.setdefault('connect_args', {})
+        options = connect_args.get('options')
+        timeout_option = '-c statement_timeout={}'.format(int(statement_timeout * 1000))
+        connect_args['options'] = '{} {}'.format(options, timeout_option) if options else timeout_option
+
+
+def get_pool_status(engine) -> dict:
+    """
+    Returns the usage of the connection pool of an engine.
+    :param engine: SQLAlchemy engine.
+    :return: Dict with the pool class and, for queue pools, the size, maximum overflow and the number of checked out,
+        idle and overflow connections.
+    """
+    pool = engine.pool
+    status = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'checked_out': pool.checkedout(),
+            'idle': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0),
+        })
+    return status
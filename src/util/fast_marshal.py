@@ -0,0 +1,193 @@
+import datetime
+from functools import wraps, partial
+
+from flask import current_app
+from flask_restful import marshal, fields, unpack
+from flask_restful.fields import MarshallingException, is_indexable_but_not_string
+from flask_restful.representations.json import output_json
+
+from src.util.instrumentation import instrumentation
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_DAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+_MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+def _format_rfc822(value):
+    """
+    Formats datetimes like `fields.DateTime` does with the default rfc822 format, without the detour over a timestamp.
+    :param value: Datetime to format. Naive datetimes are treated as UTC.
+    :return: RFC 822 formatted date string.
+    """
+    if type(value) is not datetime.datetime:
+        return fields._rfc822(value)
+    offset = value.utcoffset()
+    if offset is not None:
+        value = value - offset
+    return '{}, {:02d} {} {:04d} {:02d}:{:02d}:{:02d} -0000'.format(
+        _DAY_NAMES[value.weekday()], value.day, _MONTH_NAMES[value.month - 1], value.year, value.hour, value.minute,
+        value.second)
+
+
+# Formatters that replace the `format` method of exactly these field classes. Subclasses keep their own `format`.
+_FORMATTERS = {
+    fields.String: str,
+    fields.Integer: int,
+    fields.Float: float,
+    fields.Boolean: bool
+}
+
+
+def compile_marshaller(marshaller: dict):
+    """
+    Compiles a flask_restful marshaller into a function that produces the same output as `flask_restful.marshal`.
+    Field instances, attribute names and formatters are resolved once here instead of for every marshalled object.
+    Other fields with custom `output` methods (Url, FormattedString, ...) and dotted or callable attributes use the
+    regular field output.
+    :param marshaller: Dict of fields, as returned by the `get_marshaller` methods of the models.
+    :return: Function that takes an object, a list of objects or None and returns the marshalled data.
+    """
+    return instrumentation.time_marshalling(_compile_marshaller(marshaller))
+
+
+def _compile_marshaller(marshaller: dict):
+    outputs = [(key, _compile_field(key, field)) for key, field in marshaller.items()]
+
+    def serialize(data):
+        if isinstance(data, (list, tuple)):
+            return [serialize(item) for item in data]
+        if is_indexable_but_not_string(data):
+            # Dicts and other indexable objects need the key lookups of flask_restful
+            return marshal(data, marshaller)
+        return {key: output(data) for key, output in outputs}
+
+    return serialize
+
+
+def _compile_field(key, field):
+    """
+    Compiles a single field into a function that takes the marshalled object and returns the field value.
+    :param key: Key of the field in the marshaller.
+    :param field: Field class, field instance or nested marshaller dict.
+    """
+    if isinstance(field, dict):
+        return _compile_marshaller(field)
+    if isinstance(field, type):
+        field = field()
+
+    attribute = key if field.attribute is None else field.attribute
+    if not isinstance(attribute, str) or '.' in attribute:
+        return partial(field.output, key)
+
+    if type(field) is fields.Nested:
+        serialize = _compile_marshaller(field.nested)
+        allow_null = field.allow_null
+        default = field.default
+
+        def output_nested(obj):
+            value = getattr(obj, attribute, None)
+            if value is None:
+                if allow_null:
+                    return None
+                if default is not None:
+                    return default
+            return serialize(value)
+
+        return output_nested
+
+    if type(field) is fields.List and type(field.container) is fields.Nested and field.container.attribute is None:
+        serialize = _compile_marshaller(field.container.nested)
+        allow_null = field.container.allow_null
+        item_default = field.container.default
+        default = field.default
+
+        def output_item(item):
+            if item is None:
+                if allow_null:
+                    return None
+                if item_default is not None:
+                    return item_default
+            return serialize(item)
+
+        def output_list(obj):
+            value = getattr(obj, attribute, None)
+            if value is None:
+                return default
+            if isinstance(value, dict):
+                return [serialize(value)]
+            if not is_indexable_but_not_string(value):
+                return field.output(key, obj)
+            return [output_item(item) for item in value]
+
+        return output_list
+
+    if type(field).output is not fields.Raw.output:
+        return partial(field.output, key)
+
+    if type(field) is fields.DateTime and field.dt_format == 'rfc822':
+        format_value = _format_rfc822
+    else:
+        format_value = _FORMATTERS.get(type(field), field.format)
+    default = field.default
+
+    def output(obj):
+        value = getattr(obj, attribute, None)
+        if value is None:
+            return default
+        try:
+            return format_value(value)
+        except ValueError as e:
+            raise MarshallingException(e)
+
+    return output
+
+
+@instrumentation.time_marshalling
+def make_json_response(data, code=200, headers=None):
+    """
+    Creates a JSON response for already marshalled data. Uses orjson if it is installed and falls back to the
+    flask_restful JSON representation otherwise, in debug mode and if `RESTFUL_JSON` settings are configured.
+    :param data: Marshalled data.
+    :param code: HTTP status code.
+    :param headers: Additional response headers.
+    :return: Response.
+    """
+    if orjson is None or current_app.debug or current_app.config.get('RESTFUL_JSON'):
+        return output_json(data, code, headers)
+    response = current_app.response_class(
+        orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE),
+        status=code,
+        mimetype='application/json'
+    )
+    response.headers.extend(headers or {})
+    return response
+
+
+class fast_marshal_with:
+    """
+    Drop in replacement for `flask_restful.marshal_with` for hot endpoints. The marshaller is compiled once when the
+    resource method is decorated and the marshalled data is encoded right away, see `compile_marshaller` and
+    `make_json_response`.
+    """
+
+    def __init__(self, marshaller: dict):
+        """
+        :param marshaller: Dict of fields, as returned by the `get_marshaller` methods of the models.
+        """
+        self.serialize = compile_marshaller(marshaller)
+
+    def __call__(self, f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            resp = f(*args, **kwargs)
+            if isinstance(resp, tuple):
+                data, code, headers = unpack(resp)
+            else:
+                data, code, headers = resp, 200, None
+            return make_json_response(self.serialize(data), code, headers)
+
+        return wrapper
@@ -0,0 +1,23 @@
+from flask_restful import reqparse, abort
+
+from src.messages.messages import INVALID_FIELD_SELECTION
+
+field_selection_parser = reqparse.RequestParser()
+field_selection_parser.add_argument('fields', type=str, location='args')
+
+
+def select_fields(marshaller: dict) -> dict:
+    """
+    Restricts the marshaller to the fields given in the comma separated `fields` query param of the current request.
+    Aborts with 400 if an unknown field is requested.
+    :param marshaller: Marshaller with all available fields.
+    :return: Marshaller with the selected fields or the given marshaller if no fields were selected.
+    """
+    selected_fields = field_selection_parser.parse_args()['fields']
+    if not selected_fields:
+        return marshaller
+
+    field_names = [f.strip() for f in selected_fields.split(',') if f.strip()]
+    if not field_names or any(f not in marshaller for f in field_names):
+        abort(400, message=INVALID_FIELD_SELECTION)
+    return {f: marshaller[f] for f in field_names}
@@ -0,0 +1,259 @@
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from src.util.database import get_pool_status
+
+# Length statements are shortened to in the endpoint statistics and logs
+MAX_STATEMENT_LENGTH = 500
+
+
+class RequestMetrics:
+    """
+    Timings of a single request.
+    """
+    __slots__ = ('started', 'query_count', 'query_time', 'slowest_query_time', 'slowest_statement', 'marshal_time',
+                 'user_accesses', 'user_queries')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.query_time = 0.0
+        self.slowest_query_time = 0.0
+        self.slowest_statement = None
+        self.marshal_time = 0.0
+        self.user_accesses = 0
+        self.user_queries = 0
+
+
+class EndpointStatistic:
+    """
+    Timings of all requests of an endpoint, aggregated since the process was started.
+    """
+
+    def __init__(self, resource, method):
+        self.resource = resource
+        self.method = method
+        self.requests = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.query_count = 0
+        self.max_query_count = 0
+        self.query_time = 0.0
+        self.marshal_time = 0.0
+        self.slowest_query_time = 0.0
+        self.slowest_statement = None
+        self.user_accesses = 0
+        self.user_queries = 0
+
+    def add(self, metrics: RequestMetrics, total_time):
+        self.requests += 1
+        self.total_time += total_time
+        self.max_time = max(self.max_time, total_time)
+        self.query_count += metrics.query_count
+        self.max_query_count = max(self.max_query_count, metrics.query_count)
+        self.query_time += metrics.query_time
+        self.marshal_time += metrics.marshal_time
+        self.user_accesses += metrics.user_accesses
+        self.user_queries += metrics.user_queries
+        if metrics.slowest_query_time > self.slowest_query_time:
+            self.slowest_query_time = metrics.slowest_query_time
+            self.slowest_statement = metrics.slowest_statement
+
+    def as_dict(self) -> dict:
+        return {
+            'resource': self.resource,
+            'method': self.method,
+            'requests': self.requests,
+            'mean_ms': self.total_time / self.requests * 1000,
+            'max_ms': self.max_time * 1000,
+            'mean_queries': self.query_count / self.requests,
+            'max_queries': self.max_query_count,
+            'mean_db_ms': self.query_time / self.requests * 1000,
+            'mean_marshal_ms': self.marshal_time / self.requests * 1000,
+            'slowest_query_ms': self.slowest_query_time * 1000,
+            'slowest_statement': self.slowest_statement,
+            'mean_user_accesses': self.user_accesses / self.requests,
+            'mean_saved_user_queries': (self.user_accesses - self.user_queries) / self.requests,
+        }
+
+
+def get_resource_name() -> str:
+    """
+    Returns the name of the resource class handling the current request, as registered in `configure_api`.
+    """
+    if request.url_rule is None:
+        return '<unmatched>'
+    view_function = current_app.view_functions.get(request.endpoint)
+    view_class = getattr(view_function, 'view_class', None)
+    return view_class.__name__ if view_class else request.endpoint
+
+
+class Instrumentation:
+    """
+    Records the query count, database time, slowest statement, marshalling time and current user accesses of every
+    request. They are sent in the `Server-Timing` header of the response and aggregated per resource and method.
+    Statements slower than `INSTRUMENTATION_SLOW_QUERY_THRESHOLD` seconds are logged. Nothing is registered unless
+    `INSTRUMENTATION_ENABLED` is set or request handlers were added, so it doesn't cost anything when disabled. When
+    enabled, the checkouts and the peak number of checked out connections of the connection pools are counted as well.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_query_threshold = None
+        self._logger = None
+        self._lock = threading.Lock()
+        self._statistics = {}
+        self._request_handlers = []
+        self._engines = {}
+        self._pool_checkouts = {}
+        self._pool_peaks = {}
+
+    def add_request_handler(self, handler):
+        """
+        Adds a function that is called with the resource name, method, status code, `RequestMetrics` and total time
+        in seconds after every request. Has to be called before `init_app`.
+        """
+        self._request_handlers.append(handler)
+
+    def init_app(self, app, db):
+        self.enabled = app.config['INSTRUMENTATION_ENABLED']
+        if not self.enabled and not self._request_handlers:
+            return
+        self.slow_query_threshold = app.config['INSTRUMENTATION_SLOW_QUERY_THRESHOLD']
+        self._logger = app.logger
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        with app.app_context():
+            self._engines = dict(db.engines)
+        for bind_key, engine in self._engines.items():
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+            if self.enabled:
+                self._pool_checkouts[bind_key] = 0
+                self._pool_peaks[bind_key] = 0
+                event.listen(engine, 'checkout', self._create_checkout_listener(bind_key, engine))
+
+    @staticmethod
+    def get_request_metrics():
+        """
+        Returns the metrics of the current request, None outside of requests.
+        """
+        return g.get('request_metrics') if has_request_context() else None
+
+    def time_marshalling(self, function):
+        """
+        Decorates a function that marshals or encodes response data to add its run time to the marshalling time of
+        the current request.
+        """
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return function(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                metrics = self.get_request_metrics()
+                if metrics is not None:
+                    metrics.marshal_time += time.perf_counter() - started
+
+        return wrapper
+
+    def get_statistics(self):
+        """
+        Returns the aggregated timings per resource and method.
+        :return: List of dicts, ordered by the total time spent in the endpoint.
+        """
+        with self._lock:
+            statistics = sorted(self._statistics.values(), key=lambda s: s.total_time, reverse=True)
+            return [statistic.as_dict() for statistic in statistics]
+
+    def get_pool_statistics(self):
+        """
+        Returns the current usage of the connection pools together with the checkouts and the peak number of checked
+        out connections since the process was started.
+        :return: List of dicts, one per database bind.
+        """
+        pool_statistics = []
+        with self._lock:
+            for bind_key, engine in self._engines.items():
+                pool_statistic = {
+                    'bind': bind_key or 'default',
+                    'checkouts': self._pool_checkouts[bind_key],
+                    'peak_checked_out': self._pool_peaks[bind_key],
+                }
+                pool_statistic.update(get_pool_status(engine))
+                pool_statistics.append(pool_statistic)
+        return pool_statistics
+
+    def reset_statistics(self):
+        with self._lock:
+            self._statistics = {}
+            for bind_key in self._engines:
+                self._pool_checkouts[bind_key] = 0
+                self._pool_peaks[bind_key] = 0
+
+    @staticmethod
+    def _start_request():
+        g.request_metrics = RequestMetrics()
+
+    def _finish_request(self, response):
+        metrics = self.get_request_metrics()
+        if metrics is None:
+            return response
+        total_time = time.perf_counter() - metrics.started
+        resource_name = get_resource_name()
+        for handler in self._request_handlers:
+            handler(resource_name, request.method, response.status_code, metrics, total_time)
+        if not self.enabled:
+            return response
+
+        response.headers['Server-Timing'] = ', '.join([
+            'db;dur={:.2f};desc="{} queries"'.format(metrics.query_time * 1000, metrics.query_count),
+            'db-slowest;dur={:.2f}'.format(metrics.slowest_query_time * 1000),
+            'marshal;dur={:.2f}'.format(metrics.marshal_time * 1000),
+            'user;desc="{} accesses, {} saved queries"'.format(metrics.user_accesses,
+                                                               metrics.user_accesses - metrics.user_queries),
+            'app;dur={:.2f}'.format(total_time * 1000),
+        ])
+        key = (resource_name, request.method)
+        with self._lock:
+            if key not in self._statistics:
+                self._statistics[key] = EndpointStatistic(*key)
+            self._statistics[key].add(metrics, total_time)
+        return response
+
+    def _create_checkout_listener(self, bind_key, engine):
+        def checkout(dbapi_connection, connection_record, connection_proxy):
+            checked_out = get_pool_status(engine).get('checked_out', 0)
+            with self._lock:
+                self._pool_checkouts[bind_key] += 1
+                self._pool_peaks[bind_key] = max(self._pool_peaks[bind_key], checked_out)
+
+        return checkout
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start_times', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info['query_start_times'].pop()
+        metrics = self.get_request_metrics()
+        if metrics is not None:
+            metrics.query_count += 1
+            metrics.query_time += duration
+            if duration > metrics.slowest_query_time:
+                metrics.slowest_query_time = duration
+                metrics.slowest_statement = statement[:MAX_STATEMENT_LENGTH]
+        if duration > self.slow_query_threshold:
+            self._logger.warning('Slow query ({:.1f} ms{}): {}'.format(
+                duration * 1000, ', {} {}'.format(request.method, request.path) if has_request_context() else '',
+                statement[:MAX_STATEMENT_LENGTH]))
+
+
+instrumentation = Instrumentation()
@@ -0,0 +1,67 @@
+from functools import wraps
+
+from flask import g
+from flask_restful import abort
+
+from src.messages.messages import COMMUNIY_DOESNT_EXIST, UNAUTHORIZED
+from src.models.community import CommunityModel
+from src.models.community_user_link import CommunityUserLinkModel
+from src.util.current_user import get_current_user
+
+
+def is_community_member(user_id, community_id, is_owner=False):
+    """
+    Checks if the user is an accepted member of the community with an indexed existence query. Results are cached for
+    the current request.
+    :param user_id: User to check.
+    :param community_id: Community to check.
+    :param is_owner: Additionally require the user to be an owner of the community.
+    :return: True if the user is a member.
+    """
+    if 'community_memberships' not in g:
+        g.community_memberships = {}
+    key = (user_id, community_id, is_owner)
+    if key not in g.community_memberships:
+        g.community_memberships[key] = CommunityUserLinkModel.exists_member(user_id, community_id, is_owner)
+    return g.community_memberships[key]
+
+
+def community_member_required(is_owner=False, argument='community_id', community_not_found_code=400):
+    """
+    Decorator for community scoped resource methods. Aborts if the community doesn't exist and with 401 if the current
+    user is not a member of it. Has to be applied below `jwt_required`.
+    :param is_owner: Additionally require the current user to be an owner of the community.
+    :param argument: Name of the resource method argument that holds the community id.
+    :param community_not_found_code: Status code to abort with if the community doesn't exist.
+    """
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            community_id = kwargs[argument]
+            if not is_community_member(get_current_user().id, community_id, is_owner):
+                # Only failed checks need to distinguish between missing communities and missing memberships
+                if not CommunityModel.exists_by_id(community_id):
+                    abort(community_not_found_code, message=COMMUNIY_DOESNT_EXIST)
+                abort(401, message=UNAUTHORIZED)
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def find_community_members(community_id, user_ids):
+    """
+    Loads the users with the given ids if all of them are members of the community.
+    :param community_id: Community the users have to be members of.
+    :param user_ids: Ids of the users to load. Duplicates are ignored.
+    :return: List of users or None if at least one of them is not a member.
+    """
+    user_ids = set(user_ids or [])
+    if not user_ids:
+        return []
+    members = CommunityUserLinkModel.find_members_by_user_ids(community_id, user_ids)
+    if len(members) != len(user_ids):
+        return None
+    return members
@@ -0,0 +1,178 @@
+import os
+import time
+import weakref
+from contextlib import contextmanager
+
+from sqlalchemy.pool import QueuePool
+
+from src.util.database import uses_queue_pool
+from src.util.instrumentation import instrumentation
+
+try:
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+    from prometheus_client import CONTENT_TYPE_LATEST
+except ImportError:
+    Histogram = None
+    CONTENT_TYPE_LATEST = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds of the buckets of the queries per request histogram
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 20, 50, 100, 200, 500)
+
+# Upper bounds of the buckets of the pool checkout wait histogram in seconds
+POOL_CHECKOUT_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30)
+
+# Upper bounds of the buckets of the scheduled job duration histogram in seconds
+JOB_DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+
+
+class Metrics:
+    """
+    Prometheus metrics of requests, the connection pool, payoffs and scheduled jobs. Needs the `prometheus_client`
+    package and `METRICS_ENABLED`, otherwise nothing is recorded. With multiple worker processes the
+    `PROMETHEUS_MULTIPROC_DIR` environment variable has to point to a directory shared by the workers, the values are
+    then kept in memory mapped files there and the exposition collects the values of all processes. The pool gauges
+    are summed over the live processes, so they show the connections of all workers to the database.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._pools = weakref.WeakSet()
+        if Histogram is None:
+            return
+        self.request_duration = Histogram('carbulator_request_duration_seconds', 'Duration of requests',
+                                          ['resource', 'method'])
+        self.request_queries = Histogram('carbulator_request_queries', 'SQL queries per request',
+                                         ['resource', 'method'], buckets=QUERY_COUNT_BUCKETS)
+        self.requests = Counter('carbulator_requests', 'Finished requests', ['resource', 'method', 'status'])
+        self.pool_checkout_wait = Histogram('carbulator_db_pool_checkout_wait_seconds',
+                                            'Time waited for a connection of the pool',
+                                            buckets=POOL_CHECKOUT_WAIT_BUCKETS)
+        self.pool_checked_out = Gauge('carbulator_db_pool_checked_out', 'Connections checked out of the pool',
+                                      multiprocess_mode='livesum')
+        self.pool_idle = Gauge('carbulator_db_pool_idle', 'Idle connections in the pool', multiprocess_mode='livesum')
+        self.pool_capacity = Gauge('carbulator_db_pool_capacity', 'Maximum number of connections of the pool',
+                                   multiprocess_mode='livesum')
+        self.payoff_duration = Histogram('carbulator_payoff_duration_seconds', 'Duration of payoff calculations')
+        self.debt_simplification_duration = Histogram('carbulator_debt_simplification_duration_seconds',
+                                                      'Duration of debt simplifications', ['mode'])
+        self.job_duration = Histogram('carbulator_job_duration_seconds', 'Duration of scheduled job runs', ['job'],
+                                      buckets=JOB_DURATION_BUCKETS)
+        self.job_runs = Counter('carbulator_job_runs', 'Scheduled job runs', ['job', 'outcome'])
+
+    def init_app(self, app):
+        """
+        Enables the metrics if configured. Has to be called before the database is initialized, as the connection
+        pool gets replaced to measure checkout waits and the pool usage.
+        """
+        if not app.config['METRICS_ENABLED']:
+            return
+        if Histogram is None:
+            raise RuntimeError('METRICS_ENABLED needs the prometheus_client package')
+        self.enabled = True
+        instrumentation.add_request_handler(self.observe_request)
+
+        config = app.config
+        engine_options = [(config['SQLALCHEMY_DATABASE_URI'], config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {}))]
+        engine_options += [(options['url'], options) for options in config.get('SQLALCHEMY_BINDS', {}).values()
+                           if isinstance(options, dict)]
+        for database_uri, options in engine_options:
+            if 'poolclass' not in options and uses_queue_pool(database_uri):
+                options['poolclass'] = TimedQueuePool
+
+    def observe(self, name, value, *label_values):
+        """
+        Adds a value to a histogram.
+        :param name: Attribute name of the histogram.
+        :param value: Observed value.
+        :param label_values: Values of the labels of the histogram.
+        """
+        if self.enabled:
+            histogram = getattr(self, name)
+            (histogram.labels(*label_values) if label_values else histogram).observe(value)
+
+    @contextmanager
+    def timer(self, name, *label_values):
+        """
+        Observes the duration of the block in seconds in a histogram.
+        :param name: Attribute name of the histogram.
+        :param label_values: Values of the labels of the histogram.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, *label_values)
+
+    def observe_request(self, resource_name, method, status_code, request_metrics, total_time):
+        """
+        Request handler of the instrumentation, observes the duration and queries of a finished request.
+        """
+        self.request_duration.labels(resource_name, method).observe(total_time)
+        self.request_queries.labels(resource_name, method).observe(request_metrics.query_count)
+        self.requests.labels(resource_name, method, str(status_code)).inc()
+
+    def observe_job_run(self, job_name, duration, failed):
+        """
+        Observes the duration and outcome of a scheduled job run.
+        :param job_name: Name of the job.
+        :param duration: Duration of the run in seconds.
+        :param failed: Whether the job raised an error.
+        """
+        if self.enabled:
+            self.job_duration.labels(job_name).observe(duration)
+            self.job_runs.labels(job_name, 'failure' if failed else 'success').inc()
+
+    def add_pool(self, pool: QueuePool):
+        """
+        Adds a pool to the pool gauges. Pools are only weakly referenced, so disposed pools drop out of the gauges.
+        """
+        if self.enabled:
+            self._pools.add(pool)
+            self.observe_pools()
+
+    def observe_pools(self):
+        """
+        Sets the pool gauges to the current usage of all pools of this process.
+        """
+        if self.enabled:
+            pools = list(self._pools)
+            self.pool_checked_out.set(sum(pool.checkedout() for pool in pools))
+            self.pool_idle.set(sum(pool.checkedin() for pool in pools))
+            self.pool_capacity.set(sum(pool.size() + max(pool._max_overflow, 0) for pool in pools))
+
+    @staticmethod
+    def generate_latest() -> bytes:
+        """
+        Returns the metrics of this process, or of all processes in multiprocess mode, in the Prometheus text format.
+        """
+        if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return generate_latest(registry)
+
+
+metrics = Metrics()
+
+
+class TimedQueuePool(QueuePool):
+    """
+    Queue pool that observes how long checkouts wait for a free connection and how many connections are in use.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        metrics.add_pool(self)
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe('pool_checkout_wait', time.perf_counter() - started)
+            metrics.observe_pools()
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        metrics.observe_pools()
@@ -0,0 +1,97 @@
+import base64
+from datetime import datetime
+
+from flask import current_app
+from flask_restful import reqparse, abort
+from sqlalchemy import tuple_
+
+from src.messages.messages import INVALID_PAGINATION_CURSOR, INVALID_PAGINATION_LIMIT
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+pagination_parser = reqparse.RequestParser()
+pagination_parser.add_argument('limit', type=int, location='args')
+pagination_parser.add_argument('cursor', type=str, location='args')
+
+
+def encode_cursor(time, id):
+    """
+    Encodes the sort key of the last item of a page into an opaque cursor.
+    :param time: Timestamp of the item.
+    :param id: ID of the item.
+    :return: URL safe cursor.
+    """
+    return base64.urlsafe_b64encode('{}|{}'.format(time.isoformat(), id).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor created by `encode_cursor`.
+    :param cursor: Cursor to decode.
+    :return: Tuple of timestamp and id.
+    :raises ValueError: If the cursor is invalid.
+    """
+    try:
+        time, id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(time), int(id)
+    except (TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def get_pagination_args():
+    """
+    Parses the `limit` and `cursor` query params of the current request. Limits above `PAGINATION_MAX_LIMIT` are
+    capped.
+    :return: Tuple of limit and decoded cursor. Both are None if the request isn't paginated.
+    """
+    args = pagination_parser.parse_args()
+    limit = args['limit']
+    cursor = None
+
+    if args['cursor']:
+        try:
+            cursor = decode_cursor(args['cursor'])
+        except ValueError:
+            abort(400, message=INVALID_PAGINATION_CURSOR)
+        if limit is None:
+            limit = current_app.config['PAGINATION_DEFAULT_LIMIT']
+
+    if limit is not None:
+        if limit < 1:
+            abort(400, message=INVALID_PAGINATION_LIMIT)
+        limit = min(limit, current_app.config['PAGINATION_MAX_LIMIT'])
+
+    return limit, cursor
+
+
+def paginate(query, time_column, id_column, limit=None, cursor=None):
+    """
+    Orders the query newest first by `(time_column, id_column)` and restricts it to the page after the cursor. Needs a
+    composite index on the filter columns followed by both sort columns to only read the rows of the page.
+    :param query: Query to paginate.
+    :param time_column: Timestamp column to sort by.
+    :param id_column: ID column to make the order unique.
+    :param limit: Page size. The query isn't limited if this is None.
+    :param cursor: Decoded cursor of the last item of the previous page.
+    :return: Ordered and paginated query.
+    """
+    query = query.order_by(time_column.desc(), id_column.desc())
+    if cursor:
+        query = query.filter(tuple_(time_column, id_column) < tuple_(*cursor))
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def get_next_cursor_headers(items, limit, time_attribute):
+    """
+    Creates the response headers that point to the next page.
+    :param items: Items of the current page.
+    :param limit: Page size or None if the request isn't paginated.
+    :param time_attribute: Name of the timestamp attribute the items are sorted by.
+    :return: Dict with the `X-Next-Cursor` header if the page is full, an empty dict otherwise.
+    """
+    if limit is None or len(items) < limit:
+        return {}
+    last_item = items[-1]
+    return {NEXT_CURSOR_HEADER: encode_cursor(getattr(last_item, time_attribute), last_item.id)}
@@ -0,0 +1,70 @@
+import numpy as np
+
+
+def calculate_km_per_user(number_of_users: int, tour_km: np.ndarray, participant_tour_indices: np.ndarray,
+                          participant_user_indices: np.ndarray) -> np.ndarray:
+    """
+    Calculates the km every user is accounted for. The km of a tour are split evenly between all its participants
+    (owner and passengers).
+    :param number_of_users: Number of users involved in the payoff.
+    :param tour_km: Driven km per tour.
+    :param participant_tour_indices: Tour index of every tour participant.
+    :param participant_user_indices: User index of every tour participant.
+    :return: Accounted km per user.
+    """
+    participants_per_tour = np.bincount(participant_tour_indices, minlength=len(tour_km))
+    km_per_participant = tour_km[participant_tour_indices] / participants_per_tour[participant_tour_indices]
+    km_per_user = np.zeros(number_of_users)
+    np.add.at(km_per_user, participant_user_indices, km_per_participant)
+    return km_per_user
+
+
+def calculate_costs_per_user(number_of_users: int, refuel_costs: np.ndarray,
+                             refuel_owner_indices: np.ndarray) -> np.ndarray:
+    """
+    Calculates the refuel costs every user has paid.
+    :param number_of_users: Number of users involved in the payoff.
+    :param refuel_costs: Costs per refuel.
+    :param refuel_owner_indices: User index of every refuel owner.
+    :return: Paid costs per user.
+    """
+    return np.bincount(refuel_owner_indices, weights=refuel_costs, minlength=number_of_users).astype(float)
+
+
+def calculate_debt_matrix(km_per_user: np.ndarray, costs_per_user: np.ndarray, debtee_indices: np.ndarray,
+                          recipient_indices: np.ndarray, debt_amounts: np.ndarray) -> np.ndarray:
+    """
+    Calculates the debt matrix (debtee on y axis, recipient on x axis). Every user owes every refueling user his km
+    fraction of the refuel costs. Debts that were already created in previous payoffs are subtracted.
+    :param km_per_user: Accounted km per user.
+    :param costs_per_user: Paid refuel costs per user.
+    :param debtee_indices: User index of the debtee of every previously created debt.
+    :param recipient_indices: User index of the recipient of every previously created debt.
+    :param debt_amounts: Amount of every previously created debt.
+    :return: Debt matrix.
+    """
+    total_km = km_per_user.sum()
+    if total_km:
+        km_fraction_per_user = km_per_user / total_km
+    else:
+        # Without driven km nobody can be charged for refuels
+        km_fraction_per_user = np.zeros(len(km_per_user))
+
+    debt_matrix = np.outer(km_fraction_per_user, costs_per_user)
+    np.fill_diagonal(debt_matrix, 0)
+    np.subtract.at(debt_matrix, (debtee_indices, recipient_indices), debt_amounts)
+    return debt_matrix
+
+
+def calculate_payoff_debt_matrix(number_of_users: int, tour_km: np.ndarray, participant_tour_indices: np.ndarray,
+                                 participant_user_indices: np.ndarray, refuel_costs: np.ndarray,
+                                 refuel_owner_indices: np.ndarray, debtee_indices: np.ndarray,
+                                 recipient_indices: np.ndarray, debt_amounts: np.ndarray) -> np.ndarray:
+    """
+    Calculates the debt matrix of a payoff from flat tour, refuel and debt arrays. All user references are indices
+    into the list of users involved in the payoff.
+    :return: Debt matrix (debtee on y axis, recipient on x axis).
+    """
+    km_per_user = calculate_km_per_user(number_of_users, tour_km, participant_tour_indices, participant_user_indices)
+    costs_per_user = calculate_costs_per_user(number_of_users, refuel_costs, refuel_owner_indices)
+    return calculate_debt_matrix(km_per_user, costs_per_user, debtee_indices, recipient_indices, debt_amounts)
@@ -0,0 +1,188 @@
+import json
+import queue
+import select
+import threading
+import time
+from collections import defaultdict
+
+from flask import current_app
+from sqlalchemy import text
+
+from src.app import app, db
+
+PUBSUB_BACKEND_MEMORY = 'memory'
+PUBSUB_BACKEND_POSTGRES = 'postgres'
+
+# Postgres channel all messages are sent on, the hub channels are part of the payload
+POSTGRES_NOTIFY_CHANNEL = 'carbulator_pubsub'
+
+
+class Subscription:
+    """
+    Queue of the messages published to a channel since subscribing. A subscription that falls behind by more than its
+    queue size is closed, the subscriber has to subscribe again and reload the current state.
+    """
+
+    def __init__(self, hub, channel, max_size):
+        self.hub = hub
+        self.channel = channel
+        self.queue = queue.Queue(max_size)
+        self.is_closed = False
+
+    def put(self, message):
+        if self.is_closed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            self.close()
+
+    def get(self, timeout):
+        """
+        Waits for the next message.
+        :param timeout: Seconds to wait.
+        :return: Next message or None if there was no message within the timeout.
+        """
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.is_closed = True
+        self.hub.unsubscribe(self)
+
+
+class MemoryBackend:
+    """
+    Delivers messages to the subscribers of the current process only. Sufficient for a single worker and for tests.
+    """
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def publish(self, payload):
+        self.hub.dispatch(payload)
+
+    def listen(self):
+        pass
+
+
+class PostgresBackend:
+    """
+    Delivers messages to the subscribers of all processes connected to the same database via LISTEN/NOTIFY. Every
+    process listens on a dedicated connection once the first subscription was made, published messages are delivered
+    to the local subscribers by this listener as well.
+    """
+
+    def __init__(self, hub, engine):
+        self.hub = hub
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def publish(self, payload):
+        with self.engine.connect() as connection:
+            connection.execute(text('SELECT pg_notify(:channel, :payload)'),
+                               {'channel': POSTGRES_NOTIFY_CHANNEL, 'payload': payload})
+            connection.commit()
+
+    def listen(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='pubsub-listener', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self._listen()
+            except Exception:
+                app.logger.exception('Postgres pub/sub listener failed, reconnecting')
+                time.sleep(1)
+
+    def _listen(self):
+        # The connection is detached from the pool as it is blocked by the listener for the lifetime of the process
+        connection = self.engine.raw_connection()
+        connection.detach()
+        dbapi_connection = connection.dbapi_connection
+        try:
+            dbapi_connection.autocommit = True
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute('LISTEN {}'.format(POSTGRES_NOTIFY_CHANNEL))
+            while True:
+                select.select([dbapi_connection], [], [], 60)
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    self.hub.dispatch(dbapi_connection.notifies.pop(0).payload)
+        finally:
+            connection.close()
+
+
+class PubSubHub:
+    """
+    Publish/subscribe hub for JSON serializable messages on named channels. Messages are delivered by the backend
+    configured with `PUBSUB_BACKEND`, either `memory` (default) or `postgres`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+        self._backend = None
+
+    def get_backend(self):
+        with self._lock:
+            if self._backend is None:
+                self._backend = create_backend(self, current_app.config['PUBSUB_BACKEND'])
+            return self._backend
+
+    def subscribe(self, channel) -> Subscription:
+        """
+        Subscribes to the messages of a channel. The subscription has to be closed by the subscriber.
+        :param channel: Channel to subscribe to.
+        :return: Subscription.
+        """
+        self.get_backend().listen()
+        subscription = Subscription(self, channel, current_app.config['PUBSUB_QUEUE_SIZE'])
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def publish(self, channel, message):
+        """
+        Publishes a message to all subscribers of a channel.
+        :param channel: Channel to publish to.
+        :param message: JSON serializable message.
+        """
+        self.get_backend().publish(json.dumps({'channel': channel, 'message': message}))
+
+    def dispatch(self, payload):
+        """
+        Delivers a message received by the backend to the subscribers of the current process.
+        :param payload: Serialized message.
+        """
+        data = json.loads(payload)
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(data['channel'], ()))
+        for subscription in subscriptions:
+            subscription.put(data['message'])
+
+
+def create_backend(hub, backend):
+    if backend == PUBSUB_BACKEND_MEMORY:
+        return MemoryBackend(hub)
+    elif backend == PUBSUB_BACKEND_POSTGRES:
+        return PostgresBackend(hub, db.engine)
+    else:
+        raise ValueError('Unknown pub/sub backend: {}'.format(backend))
+
+
+pubsub_hub = PubSubHub()
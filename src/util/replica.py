@@ -0,0 +1,115 @@
+from functools import wraps
+
+from flask import g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+from src.util.database import REPLICA_BIND_KEY
+
+# Request methods that don't change data
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+# Header and cookie carrying the token of the last write of a user
+READ_YOUR_WRITES_HEADER = 'X-Read-Your-Writes'
+READ_YOUR_WRITES_COOKIE = 'read_your_writes'
+
+# Salt of the token, so it can't be confused with other values signed with the SECRET_KEY
+READ_YOUR_WRITES_SALT = 'read-your-writes'
+
+
+class RoutingSession(Session):
+    """
+    Session that sends the queries of resource methods decorated with `read_from_replica` to the replica. Flushes
+    always go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_request_context() and g.get('read_from_replica'):
+            return self._db.engines[REPLICA_BIND_KEY]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouting:
+    """
+    Routes the queries of read only resource methods to the replica configured with `REPLICA_DATABASE_URI`. After a
+    successful write request of a user, the reads of this user go to the primary for
+    `REPLICA_READ_YOUR_WRITES_WINDOW` seconds, so users see their own changes while the replica lags behind. The write
+    is recorded in a token signed with the `SECRET_KEY`, which is sent back in the `X-Read-Your-Writes` header and a
+    cookie, so every worker can check it without a database query.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.window = None
+        self._serializer = None
+
+    def init_app(self, app):
+        if not app.config['REPLICA_DATABASE_URI']:
+            return
+        self.enabled = True
+        self.window = app.config['REPLICA_READ_YOUR_WRITES_WINDOW']
+        self._serializer = URLSafeTimedSerializer(app.config['SECRET_KEY'], salt=READ_YOUR_WRITES_SALT)
+        app.after_request(self._record_request)
+
+    def create_token(self, identity) -> str:
+        """
+        Creates the token that sends the reads of a user to the primary for the read-your-writes window.
+        :param identity: JWT identity (username).
+        :return: Signed token with the identity and the current time.
+        """
+        return self._serializer.dumps(identity)
+
+    def wrote_recently(self, identity) -> bool:
+        """
+        Checks if the reads of a user have to go to the primary, by the token in the `X-Read-Your-Writes` header or
+        the cookie of the current request.
+        :param identity: JWT identity (username).
+        :return: True if the request has a valid token of the user that is younger than the read-your-writes window.
+        """
+        token = request.headers.get(READ_YOUR_WRITES_HEADER) or request.cookies.get(READ_YOUR_WRITES_COOKIE)
+        if not token:
+            return False
+        try:
+            return self._serializer.loads(token, max_age=self.window) == identity
+        except BadSignature:
+            # Also raised for expired tokens
+            return False
+
+    def _record_request(self, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            try:
+                identity = get_jwt_identity()
+            except RuntimeError:
+                # Unauthenticated requests, e.g. the registration, have no identity to route by
+                return response
+            if identity is not None:
+                token = self.create_token(identity)
+                response.headers[READ_YOUR_WRITES_HEADER] = token
+                response.set_cookie(READ_YOUR_WRITES_COOKIE, token, max_age=self.window, path='/api',
+                                    secure=request.is_secure, httponly=True, samesite='Lax')
+        return response
+
+
+replica_routing = ReplicaRouting()
+
+
+def read_from_replica(fn):
+    """
+    Decorator for read only resource methods that sends their queries to the replica, unless the current user wrote
+    within the read-your-writes window. Has to be applied below `jwt_required` and above the membership check, the
+    ETag and the marshalling decorators, so they read from the same database.
+    """
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not replica_routing.enabled or replica_routing.wrote_recently(get_jwt_identity()):
+            return fn(*args, **kwargs)
+        g.read_from_replica = True
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            g.read_from_replica = False
+
+    wrapper.reads_from_replica = True
+    return wrapper
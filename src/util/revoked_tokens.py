@@ -0,0 +1,180 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from src.app import app
+from src.models.revoked_token import RevokedTokenModel
+
+
+class BloomFilter:
+    """
+    Bloom filter for strings. Answers `False` only for strings that were definitely never added.
+    """
+
+    def __init__(self, capacity, error_rate):
+        """
+        :param capacity: Number of strings the filter is sized for.
+        :param error_rate: False positive rate at full capacity.
+        """
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.number_of_hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.number_of_hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class RevokedTokenStore:
+    """
+    Process local view of the revoked tokens table. A bloom filter of all revoked JTIs answers the common case (token
+    not revoked) without a database round trip, a LRU of confirmed JTIs answers repeated checks of revoked tokens. The
+    filter is refreshed incrementally every `REVOKED_TOKEN_REFRESH_INTERVAL` seconds and rebuilt completely every
+    `REVOKED_TOKEN_REBUILD_INTERVAL` seconds, so tokens revoked by other workers are picked up with at most this delay.
+
+    The incremental refresh reads the tokens created since the newest known one, minus `REVOKED_TOKEN_REFRESH_OVERLAP`
+    seconds. The creation time is the start of the revoking transaction, which becomes visible on commit, so a
+    revocation whose transaction took longer than the overlap can be missed until the next rebuild.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom_filter = None
+        self._revoked_jtis = OrderedDict()
+        self._watermark = None
+        self._time_refreshed = 0
+        self._time_rebuilt = 0
+        self.checks = 0
+        self.bloom_filter_negatives = 0
+        self.lru_hits = 0
+        self.database_checks = 0
+
+    def is_revoked(self, jti):
+        """
+        Checks if the token with the given jti was revoked.
+        :param jti: JTI of the token.
+        :return: True if the token was revoked.
+        """
+        self.refresh()
+
+        with self._lock:
+            self.checks += 1
+            if jti not in self._bloom_filter:
+                self.bloom_filter_negatives += 1
+                return False
+            if jti in self._revoked_jtis:
+                self._revoked_jtis.move_to_end(jti)
+                self.lru_hits += 1
+                return True
+
+            # Either a false positive or a revoked token that was evicted from the LRU
+            self.database_checks += 1
+
+        is_revoked = RevokedTokenModel.is_jti_blacklisted(jti)
+        if is_revoked:
+            with self._lock:
+                self._remember(jti)
+        return is_revoked
+
+    def add(self, revoked_token: RevokedTokenModel):
+        """
+        Adds a token that was revoked in this process, so it is known immediately without waiting for the next refresh.
+        :param revoked_token: Persisted revoked token.
+        """
+        self.refresh()
+        with self._lock:
+            self._bloom_filter.add(revoked_token.jti)
+            self._remember(revoked_token.jti)
+
+    def refresh(self, force_rebuild=False):
+        """
+        Loads tokens that were revoked since the last refresh if the refresh interval elapsed.
+        :param force_rebuild: Reload all revoked tokens into a new bloom filter.
+        """
+        config = current_app.config
+        now = time.monotonic()
+        rebuild = force_rebuild \
+            or self._bloom_filter is None \
+            or now - self._time_rebuilt >= config['REVOKED_TOKEN_REBUILD_INTERVAL'] \
+            or self._bloom_filter.count >= config['REVOKED_TOKEN_BLOOM_CAPACITY']
+        if not rebuild and now - self._time_refreshed < config['REVOKED_TOKEN_REFRESH_INTERVAL']:
+            return
+
+        # Revocations are not necessarily committed in the order of their creation times, so the tokens created
+        # shortly before the watermark are read again
+        since = None
+        if not rebuild and self._watermark is not None:
+            since = self._watermark - timedelta(seconds=config['REVOKED_TOKEN_REFRESH_OVERLAP'])
+        rows = RevokedTokenModel.find_jtis_since(since)
+
+        with self._lock:
+            if rebuild:
+                self._bloom_filter = BloomFilter(config['REVOKED_TOKEN_BLOOM_CAPACITY'],
+                                                 config['REVOKED_TOKEN_BLOOM_ERROR_RATE'])
+                self._revoked_jtis.clear()
+                self._watermark = None
+                self._time_rebuilt = now
+            for row in rows:
+                # Tokens read again within the overlap must not count against the capacity of the filter
+                if row.jti not in self._bloom_filter:
+                    self._bloom_filter.add(row.jti)
+                if self._watermark is None or row.time_created > self._watermark:
+                    self._watermark = row.time_created
+            self._time_refreshed = now
+
+    def _remember(self, jti):
+        self._revoked_jtis[jti] = True
+        self._revoked_jtis.move_to_end(jti)
+        while len(self._revoked_jtis) > current_app.config['REVOKED_TOKEN_LRU_SIZE']:
+            self._revoked_jtis.popitem(last=False)
+
+    def get_statistics(self):
+        """
+        Returns how many checks were made and how they were answered.
+        """
+        with self._lock:
+            return {
+                'checks': self.checks,
+                'bloom_filter_negatives': self.bloom_filter_negatives,
+                'lru_hits': self.lru_hits,
+                'database_checks': self.database_checks,
+                'revoked_tokens': self._bloom_filter.count if self._bloom_filter else 0
+            }
+
+
+revoked_token_store = RevokedTokenStore()
+
+
+def get_token_expiry(jwt_payload: dict):
+    """
+    Returns the expiry time of a token as naive UTC datetime or None if the token doesn't expire.
+    :param jwt_payload: Decoded token.
+    """
+    if 'exp' not in jwt_payload:
+        return None
+    return datetime.utcfromtimestamp(jwt_payload['exp'])
+
+
+def purge_expired_revoked_tokens():
+    """
+    Deletes revoked tokens that are expired anyways and can't be used for authentication anymore.
+    """
+    with app.app_context():
+        RevokedTokenModel.delete_expired(datetime.utcnow())
+        revoked_token_store.refresh(force_rebuild=True)
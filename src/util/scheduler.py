@@ -1,52 +1,188 @@
+import datetime
+import json
 import threading
 import time
+import traceback
 
-import schedule
+from sqlalchemy import text
 
+from src.app import app, db
+from src.models.scheduled_job import ScheduledJobModel
 from src.resources.task_instance_resources import create_time_triggered_task_instances
+from src.util.metrics import metrics
+from src.util.revoked_tokens import purge_expired_revoked_tokens
+
+# Key of the Postgres advisory lock the scheduler leader holds
+SCHEDULER_LOCK_KEY = 0x63617262
+
+
+class Job:
+    """
+    Function that is run by the scheduler either every `interval` or daily at the local time `at` (HH:MM). A JSON
+    serializable return value is stored as result of the run.
+    """
+
+    def __init__(self, name, function, interval: datetime.timedelta = None, at: str = None):
+        if (interval is None) == (at is None):
+            raise ValueError('Job {} needs either an interval or a time'.format(name))
+        self.name = name
+        self.function = function
+        self.interval = interval
+        self.at = datetime.datetime.strptime(at, '%H:%M').time() if at else None
+
+    def get_next_run_time(self, now: datetime.datetime) -> datetime.datetime:
+        """
+        Calculates the time of the next run after a run at the given time.
+        :param now: Naive UTC time of the run.
+        :return: Naive UTC time of the next run.
+        """
+        if self.interval is not None:
+            return now + self.interval
+        local_now = now.replace(tzinfo=datetime.timezone.utc).astimezone()
+        next_date = local_now.date()
+        if local_now.time() >= self.at:
+            next_date += datetime.timedelta(days=1)
+        # Naive datetimes are interpreted as local time, which takes daylight saving time of the next date into account
+        next_run_time = datetime.datetime.combine(next_date, self.at).astimezone(datetime.timezone.utc)
+        return next_run_time.replace(tzinfo=None)
+
+
+class AdvisoryLock:
+    """
+    Session level Postgres advisory lock held on a dedicated connection as long as the connection is alive. On other
+    databases the lock is always granted, so only a single process may run the scheduler there.
+    """
+
+    def __init__(self, engine, key):
+        self.engine = engine
+        self.key = key
+        self._connection = None
+
+    def acquire(self) -> bool:
+        """
+        Tries to acquire the lock without waiting. Checks that the connection holding the lock is still alive if the
+        lock is already held.
+        :return: True if the lock is held.
+        """
+        if self.engine.dialect.name != 'postgresql':
+            return True
+        try:
+            if self._connection is not None:
+                self._connection.execute(text('SELECT 1'))
+                return True
+            self._connection = self.engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+            if self._connection.execute(text('SELECT pg_try_advisory_lock(:key)'), {'key': self.key}).scalar():
+                return True
+        except Exception:
+            self.release()
+            raise
+        self.release()
+        return False
+
+    def release(self):
+        """
+        Releases the lock by closing its connection.
+        """
+        if self._connection is not None:
+            try:
+                # Invalidating instead of returning the connection to the pool ends the session holding the lock
+                self._connection.invalidate()
+                self._connection.close()
+            finally:
+                self._connection = None
 
 
 class Scheduler:
     """
-    Starts scheduled jobs on initialization.
+    Runs jobs at the next run times stored in the `scheduled_jobs` table. Every process may start a scheduler, but only
+    the one holding the advisory lock (the leader) runs jobs, and every run is claimed in the database before it is
+    started. Runs missed while no scheduler was running are caught up once when a scheduler becomes leader.
     """
 
-    def __init__(self):
-        self.start_time_triggered_tasks()
-        self.run_continuously()
+    def __init__(self, jobs):
+        self.jobs = {job.name: job for job in jobs}
+        self._lock = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """
+        Starts running jobs in a daemon thread. Calling it again has no effect.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run_forever, name='scheduler', daemon=True)
+            self._thread.start()
 
-        # Run all jobs - maybe the server was down for maintainance during regular run time at 00:01
-        schedule.run_all()
+    def stop(self):
+        self._stopped.set()
 
-    def start_time_triggered_tasks(self):
+    def wait(self):
         """
-        Checks for time triggered tasks that have to be started.
+        Blocks until the scheduler thread was stopped.
         """
-        schedule.every().day.at('18:16').do(create_time_triggered_task_instances)
+        while self._thread is not None and self._thread.is_alive():
+            self._thread.join(1)
 
-    def run_continuously(self, interval=1):
-        """Continuously run, while executing pending jobs at each elapsed
-        time interval.
-        @return cease_continuous_run: threading.Event which can be set to
-        cease continuous run.
-        Please note that it is *intended behavior that run_continuously()
-        does not run missed jobs*. For example, if you've registered a job
-        that should run every minute and you set a continuous run interval
-        of one hour then your job won't be run 60 times at each interval but
-        only once.
+    def run_forever(self):
+        with app.app_context():
+            self._lock = AdvisoryLock(db.engine, SCHEDULER_LOCK_KEY)
+        while not self._stopped.is_set():
+            with app.app_context():
+                try:
+                    self.run_pending()
+                except Exception:
+                    app.logger.exception('Scheduler failed, giving up leadership')
+                    db.session.rollback()
+                    self._lock.release()
+            self._stopped.wait(app.config['SCHEDULER_POLL_INTERVAL'])
+        self._lock.release()
+
+    def run_pending(self):
+        """
+        Runs all due jobs if this scheduler is the leader. Has to be called within an app context.
         """
-        cease_continuous_run = threading.Event()
+        if not self._lock.acquire():
+            return
+        self.create_missing_jobs()
 
-        class ScheduleThread(threading.Thread):
-            @classmethod
-            def run(cls):
-                while not cease_continuous_run.is_set():
-                    schedule.run_pending()
-                    time.sleep(interval)
+        for scheduled_job in ScheduledJobModel.find_due(datetime.datetime.utcnow()):
+            job = self.jobs.get(scheduled_job.name)
+            if job is None:
+                continue
+            # Missed runs are caught up with a single run, the next run is scheduled relative to now
+            run_time = datetime.datetime.utcnow()
+            if ScheduledJobModel.claim(job.name, scheduled_job.next_run_time, job.get_next_run_time(run_time)):
+                self.run_job(job, run_time)
+
+    def create_missing_jobs(self):
+        """
+        Creates the rows of jobs that were never run before. They are due immediately.
+        """
+        existing_names = {scheduled_job.name for scheduled_job in ScheduledJobModel.find_all()}
+        missing_names = [name for name in self.jobs if name not in existing_names]
+        if missing_names:
+            now = datetime.datetime.utcnow()
+            db.session.add_all([ScheduledJobModel(name=name, next_run_time=now) for name in missing_names])
+            db.session.commit()
 
-        continuous_thread = ScheduleThread()
-        continuous_thread.daemon = True
+    def run_job(self, job: Job, run_time):
+        started = time.perf_counter()
+        error = None
+        result = None
+        try:
+            result = job.function()
+        except Exception:
+            app.logger.exception('Scheduled job {} failed'.format(job.name))
+            error = traceback.format_exc()
+            db.session.rollback()
+        duration = time.perf_counter() - started
+        metrics.observe_job_run(job.name, duration, error is not None)
+        ScheduledJobModel.finish(job.name, run_time, duration, error,
+                                 json.dumps(result) if result is not None else None)
 
-        continuous_thread.start()
 
-        return cease_continuous_run
+scheduler = Scheduler([
+    Job('time_triggered_task_instances', create_time_triggered_task_instances,
+        at=app.config['TIME_TRIGGERED_TASKS_TIME']),
+    Job('revoked_token_purge', purge_expired_revoked_tokens, interval=datetime.timedelta(hours=1)),
+])
@@ -1,8 +1,67 @@
 import networkx as nx
 import numpy as np
 
+SIMPLIFICATION_MODE_NET_BALANCE = 'net_balance'
+SIMPLIFICATION_MODE_CYCLES = 'cycles'
 
-def simplify_debt_matrix(debt_matrix: np.ndarray) -> np.ndarray:
+
+def simplify_debt_matrix(debt_matrix: np.ndarray, mode: str = SIMPLIFICATION_MODE_NET_BALANCE) -> np.ndarray:
+    """
+    Simplifies a debt matrix (debtee on y axis, recipient on x axis) so that less transfers are needed to settle it.
+    :param debt_matrix: Debt matrix to simplify.
+    :param mode: Simplification algorithm to use. Either `net_balance` (default) or `cycles`.
+    :return: Simplified debt matrix with all amounts rounded to two decimals.
+    """
+    if mode == SIMPLIFICATION_MODE_NET_BALANCE:
+        return settle_net_balances(debt_matrix)
+    if mode == SIMPLIFICATION_MODE_CYCLES:
+        return cancel_debt_cycles(debt_matrix)
+    raise ValueError('Unknown debt simplification mode: {}'.format(mode))
+
+
+def settle_net_balances(debt_matrix: np.ndarray) -> np.ndarray:
+    """
+    Settles the debt matrix based on the net balance of every user. Users that owe money in total pay to users that
+    get money in total, matching the biggest debtors with the biggest recipients first. This produces at most n - 1
+    transfers in O(n log n).
+    :param debt_matrix: Debt matrix to settle. Negative entries are treated as debts in the opposite direction.
+    :return: Settled debt matrix with all amounts rounded to two decimals.
+    """
+    # Work in integer cents so the balances add up to exactly zero
+    balances = np.rint((debt_matrix.sum(axis=0) - debt_matrix.sum(axis=1)) * 100).astype(np.int64)
+    if balances.size:
+        # Distribute the rounding residue to the user with the biggest balance
+        balances[np.argmax(np.abs(balances))] -= balances.sum()
+
+    debtors = np.flatnonzero(balances < 0)
+    debtors = debtors[np.argsort(balances[debtors], kind='stable')]
+    recipients = np.flatnonzero(balances > 0)
+    recipients = recipients[np.argsort(-balances[recipients], kind='stable')]
+
+    settled_matrix = np.zeros(debt_matrix.shape)
+    open_debts = -balances[debtors]
+    open_claims = balances[recipients]
+    i = j = 0
+    while i < len(debtors) and j < len(recipients):
+        amount = min(open_debts[i], open_claims[j])
+        settled_matrix[debtors[i], recipients[j]] = amount / 100
+        open_debts[i] -= amount
+        open_claims[j] -= amount
+        if open_debts[i] == 0:
+            i += 1
+        if open_claims[j] == 0:
+            j += 1
+
+    return settled_matrix
+
+
+def cancel_debt_cycles(debt_matrix: np.ndarray) -> np.ndarray:
+    """
+    Simplifies the debt matrix by cancelling out cycles in the debt graph. Keeps the pairwise structure of the debts
+    but is exponential on dense graphs.
+    :param debt_matrix: Debt matrix to simplify.
+    :return: Simplified debt matrix with all amounts rounded to two decimals.
+    """
     debt_graph = nx.DiGraph()
 
     for i in range(debt_matrix.shape[0]):
@@ -20,32 +79,36 @@ def simplify_debt_matrix(debt_matrix: np.ndarray) -> np.ndarray:
 
 
 def simplify_debt_graph(debt_graph: nx.DiGraph) -> nx.DiGraph:
-    # I can only examine one cycle at a time because I delete edges
-    try:
-        cycle = next(nx.simple_cycles(debt_graph))
-    except StopIteration:
-        return debt_graph
-
-    # Get all edges of cycle
-    edges = []
-    for i in range(len(cycle)):
-        if i == len(cycle) - 1:
-            edges.append(debt_graph[cycle[i]][cycle[0]])
-        else:
-            edges.append(debt_graph[cycle[i]][cycle[i + 1]])
-
-    # Find min edge weight
-    min_edge_weight = min([e['weight'] for e in edges])
-
-    # Subtract edge min weight
-    for edge in edges:
-        edge['weight'] -= min_edge_weight
-
-    # Delete edge(s) with weight zero
-    ebunch = []
-    for u, v, data in debt_graph.edges(data=True):
-        if data['weight'] == 0:
-            ebunch.append((u, v))
-    debt_graph.remove_edges_from(ebunch)
+    """
+    Cancels out cycles in the debt graph until no cycle is left.
+    :param debt_graph: Debt graph to simplify. Gets modified in place.
+    :return: Simplified debt graph.
+    """
+    while True:
+        # I can only examine one cycle at a time because I delete edges
+        try:
+            cycle = next(nx.simple_cycles(debt_graph))
+        except StopIteration:
+            return debt_graph
+
+        # Get all edges of cycle
+        edges = []
+        for i in range(len(cycle)):
+            if i == len(cycle) - 1:
+                edges.append(debt_graph[cycle[i]][cycle[0]])
+            else:
+                edges.append(debt_graph[cycle[i]][cycle[i + 1]])
+
+        # Find min edge weight
+        min_edge_weight = min([e['weight'] for e in edges])
+
+        # Subtract edge min weight
+        for edge in edges:
+            edge['weight'] -= min_edge_weight
 
-    return simplify_debt_graph(debt_graph)
+        # Delete edge(s) with weight zero
+        ebunch = []
+        for u, v, data in debt_graph.edges(data=True):
+            if data['weight'] == 0:
+                ebunch.append((u, v))
+        debt_graph.remove_edges_from(ebunch)
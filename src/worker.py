@@ -0,0 +1,18 @@
+"""
+Runs the scheduled jobs in the foreground, so web workers can be started with `SCHEDULER_ENABLED = False`. Run from the
+repository root, e.g. `CARBULATOR_CONFIG=... python -m src.worker`. Multiple workers may run at the same time, only one
+of them runs the jobs.
+"""
+from src.app import scheduler
+
+
+def main():
+    scheduler.start()
+    try:
+        scheduler.wait()
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+
+if __name__ == '__main__':
+    main()